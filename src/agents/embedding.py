@@ -1,25 +1,371 @@
+import asyncio
+import hashlib
+import logging
 import os
+import threading
+import weakref
+from collections import OrderedDict
+from datetime import datetime, timezone
 from typing import List
 
+from sqlalchemy import delete, select
+from sqlalchemy.dialects.postgresql import insert
+
 from src.agents.ark import arkClient
+from src.database.index import asession
+from src.database.models import EmbeddingCache
+
+
+logger = logging.getLogger(__name__)
 
 # 全局单例
 _ark_client = arkClient()
 
+_EMBEDDING_DIMENSIONS = 1024
+# 每写入多少条持久化缓存检查一次是否需要淘汰
+_PERSISTENT_PRUNE_INTERVAL = 256
+
+# 进程内 LRU：(模型, 维度, 文本 sha256) -> 向量
+_embedding_memory_cache: "OrderedDict[tuple[str, int, str], list[float]]" = (
+    OrderedDict()
+)
+_embedding_cache_lock = threading.Lock()
+_embedding_cache_stats = {
+    "memory_hits": 0,
+    "persistent_hits": 0,
+    "misses": 0,
+    "memory_evictions": 0,
+    "persistent_evictions": 0,
+    "persistent_errors": 0,
+}
+_persistent_writes_since_prune = 0
+
+
+def _embeddingCacheKey(model: str, text: str) -> tuple[str, int, str]:
+    return (
+        model,
+        _EMBEDDING_DIMENSIONS,
+        hashlib.sha256(text.encode("utf-8")).hexdigest(),
+    )
+
+
+def _isPersistentCacheEnabled() -> bool:
+    return (os.getenv("EMBEDDING_CACHE_PERSISTENT") or "true").lower() == "true"
+
+
+def _countStat(name: str, n: int = 1) -> None:
+    with _embedding_cache_lock:
+        _embedding_cache_stats[name] += n
+
+
+def _getMemoryEmbedding(key: tuple[str, int, str]) -> list[float] | None:
+    with _embedding_cache_lock:
+        vector = _embedding_memory_cache.get(key)
+        if vector is not None:
+            _embedding_memory_cache.move_to_end(key)
+        return vector
+
+
+def _putMemoryEmbedding(key: tuple[str, int, str], vector: list[float]) -> None:
+    max_entries = int(os.getenv("EMBEDDING_CACHE_MAX_ENTRIES") or 2048)
+    with _embedding_cache_lock:
+        _embedding_memory_cache[key] = vector
+        _embedding_memory_cache.move_to_end(key)
+        while len(_embedding_memory_cache) > max_entries:
+            _embedding_memory_cache.popitem(last=False)
+            _embedding_cache_stats["memory_evictions"] += 1
+
+
+async def _getPersistentEmbeddings(
+    keys: list[tuple[str, int, str]],
+) -> dict[tuple[str, int, str], list[float]]:
+    """
+    一次查询批量读取持久化缓存
+    """
+    shas_by_model: dict[tuple[str, int], list[str]] = {}
+    for model, dimensions, text_sha256 in keys:
+        shas_by_model.setdefault((model, dimensions), []).append(text_sha256)
+    vectors = {}
+    try:
+        async with asession() as db:
+            for (model, dimensions), shas in shas_by_model.items():
+                rows = (
+                    await db.execute(
+                        select(
+                            EmbeddingCache.text_sha256, EmbeddingCache.embedding
+                        ).where(
+                            EmbeddingCache.model_name == model,
+                            EmbeddingCache.dimensions == dimensions,
+                            EmbeddingCache.text_sha256.in_(shas),
+                        )
+                    )
+                ).all()
+                for text_sha256, vector in rows:
+                    vectors[(model, dimensions, text_sha256)] = [
+                        float(x) for x in vector
+                    ]
+    except Exception as e:
+        _countStat("persistent_errors")
+        logger.warning(f"Read embedding cache failed: {str(e)}")
+        return {}
+    return vectors
+
+
+async def _putPersistentEmbeddings(
+    vectors: dict[tuple[str, int, str], list[float]],
+) -> None:
+    """
+    一次写入批量持久化缓存
+    """
+    global _persistent_writes_since_prune
+    now = datetime.now(timezone.utc).replace(tzinfo=None)
+    try:
+        async with asession() as db:
+            await db.execute(
+                insert(EmbeddingCache)
+                .values(
+                    [
+                        {
+                            "model_name": model,
+                            "dimensions": dimensions,
+                            "text_sha256": text_sha256,
+                            "embedding": vector,
+                            "created_at": now,
+                        }
+                        for (model, dimensions, text_sha256), vector in vectors.items()
+                    ]
+                )
+                .on_conflict_do_nothing()
+            )
+            await db.commit()
+    except Exception as e:
+        _countStat("persistent_errors")
+        logger.warning(f"Write embedding cache failed: {str(e)}")
+        return
+
+    with _embedding_cache_lock:
+        _persistent_writes_since_prune += len(vectors)
+        if _persistent_writes_since_prune < _PERSISTENT_PRUNE_INTERVAL:
+            return
+        _persistent_writes_since_prune = 0
+    await _prunePersistentEmbeddings()
+
+
+async def _prunePersistentEmbeddings() -> None:
+    """
+    持久化缓存超过上限时，按创建时间淘汰最旧的记录
+    """
+    max_rows = int(os.getenv("EMBEDDING_CACHE_MAX_ROWS") or 100000)
+    try:
+        async with asession() as db:
+            cutoff = await db.scalar(
+                select(EmbeddingCache.created_at)
+                .order_by(EmbeddingCache.created_at.desc())
+                .offset(max_rows)
+                .limit(1)
+            )
+            if cutoff is None:
+                return
+            res = await db.execute(
+                delete(EmbeddingCache).where(EmbeddingCache.created_at <= cutoff)
+            )
+            await db.commit()
+    except Exception as e:
+        _countStat("persistent_errors")
+        logger.warning(f"Prune embedding cache failed: {str(e)}")
+        return
+    _countStat("persistent_evictions", res.rowcount or 0)
+
+
+def getEmbeddingCacheStats() -> dict:
+    """
+    获取向量缓存命中 / 未命中 / 淘汰统计
+    """
+    with _embedding_cache_lock:
+        stats = dict(_embedding_cache_stats)
+        stats["memory_entries"] = len(_embedding_memory_cache)
+    lookups = stats["memory_hits"] + stats["persistent_hits"] + stats["misses"]
+    stats["hit_rate"] = (
+        (stats["memory_hits"] + stats["persistent_hits"]) / lookups if lookups else 0.0
+    )
+    return stats
+
+
+class _EmbeddingBatcher:
+    """
+    同一事件循环内的微批合并：
+    时间窗口内的并发调用合并为一批，一次查询持久化缓存，
+    未命中的文本去重后并发调用 API（限制在途请求数），结果按 key 分发给各调用方
+    """
+
+    def __init__(self, loop: asyncio.AbstractEventLoop):
+        self._loop = loop
+        self._pending: dict[tuple[str, int, str], tuple[str, asyncio.Future]] = {}
+        self._inflight: dict[tuple[str, int, str], asyncio.Future] = {}
+        self._flush_handle: asyncio.TimerHandle | None = None
+        self._semaphore = asyncio.Semaphore(
+            int(os.getenv("EMBEDDING_MAX_CONCURRENCY") or 8)
+        )
+        # 持有批任务引用，避免被 GC 提前回收
+        self._tasks: set[asyncio.Task] = set()
+
+    def submit(
+        self, items: dict[tuple[str, int, str], str]
+    ) -> dict[tuple[str, int, str], asyncio.Future]:
+        futures = {}
+        for key, text in items.items():
+            # 相同文本已在排队或请求中：直接复用
+            future = self._inflight.get(key)
+            if future is None and key in self._pending:
+                future = self._pending[key][1]
+            if future is None:
+                future = self._loop.create_future()
+                self._pending[key] = (text, future)
+            futures[key] = future
+
+        max_batch_size = int(os.getenv("EMBEDDING_BATCH_MAX_SIZE") or 64)
+        if len(self._pending) >= max_batch_size:
+            self._flush()
+        elif self._pending and self._flush_handle is None:
+            window_seconds = int(os.getenv("EMBEDDING_BATCH_WINDOW_MS") or 10) / 1000
+            self._flush_handle = self._loop.call_later(window_seconds, self._flush)
+        return futures
+
+    def _flush(self) -> None:
+        if self._flush_handle is not None:
+            self._flush_handle.cancel()
+            self._flush_handle = None
+        batch, self._pending = self._pending, {}
+        if not batch:
+            return
+        for key, (_, future) in batch.items():
+            self._inflight[key] = future
+        task = self._loop.create_task(self._runBatch(batch))
+        self._tasks.add(task)
+        task.add_done_callback(self._tasks.discard)
+
+    async def _runBatch(
+        self, batch: dict[tuple[str, int, str], tuple[str, asyncio.Future]]
+    ) -> None:
+        try:
+            persistent_enabled = _isPersistentCacheEnabled()
+            hits = (
+                await _getPersistentEmbeddings(list(batch))
+                if persistent_enabled
+                else {}
+            )
+            for key, vector in hits.items():
+                _putMemoryEmbedding(key, vector)
+                _setFutureResult(batch[key][1], vector)
+            _countStat("persistent_hits", len(hits))
+
+            misses = [key for key in batch if key not in hits]
+            _countStat("misses", len(misses))
+            results = await asyncio.gather(
+                *[self._embedOne(key, batch[key][0]) for key in misses],
+                return_exceptions=True,
+            )
+            new_vectors = {}
+            for key, res in zip(misses, results):
+                future = batch[key][1]
+                if isinstance(res, BaseException):
+                    if not future.done():
+                        future.set_exception(res)
+                    continue
+                if isinstance(res, list) and res:
+                    _putMemoryEmbedding(key, res)
+                    new_vectors[key] = res
+                _setFutureResult(future, res)
+            if persistent_enabled and new_vectors:
+                await _putPersistentEmbeddings(new_vectors)
+        except Exception as e:
+            logger.error(f"Embedding batch failed: {str(e)}")
+            for _, future in batch.values():
+                if not future.done():
+                    future.set_exception(e)
+        finally:
+            for key in batch:
+                self._inflight.pop(key, None)
+
+    async def _embedOne(self, key: tuple[str, int, str], text: str) -> list[float]:
+        model, dimensions, _ = key
+        async with self._semaphore:
+            resp = await _ark_client.multimodal_embeddings.create(
+                model=model,
+                input=[
+                    {"type": "text", "text": text},
+                ],
+                dimensions=dimensions,
+            )
+        return resp.data.embedding
+
+
+def _setFutureResult(future: asyncio.Future, result) -> None:
+    if not future.done():
+        future.set_result(result)
+
+
+# 每个事件循环一个 batcher（Future / Semaphore 不能跨事件循环使用）
+_batchers: "weakref.WeakKeyDictionary[asyncio.AbstractEventLoop, _EmbeddingBatcher]" = (
+    weakref.WeakKeyDictionary()
+)
+
+
+def _getBatcher() -> _EmbeddingBatcher:
+    loop = asyncio.get_running_loop()
+    with _embedding_cache_lock:
+        batcher = _batchers.get(loop)
+        if batcher is None:
+            batcher = _EmbeddingBatcher(loop)
+            _batchers[loop] = batcher
+        return batcher
+
 
 # 注意⚠️：多模态向量化能力模型不支持 OpenAI API，使用Ark SDK调用
+# 多模态接口会把一次请求内的多个 input 融合为一个向量，无法在单个请求里打包多条文本，
+# 因此批量向量化通过「微批合并 + 去重 + 缓存批量读写 + 有界并发」实现
+async def vectorizeTexts(texts: list[str]) -> list[list[float]]:
+    """
+    批量向量化文本，结果顺序与输入一致
+    按 内存 LRU -> 持久化缓存 -> Ark API 的顺序获取，相同文本只调用一次 API
+    """
+    if not texts:
+        return []
+    model = os.getenv("EMBEDDING_MODEL", "")
+    keys = [_embeddingCacheKey(model, text) for text in texts]
+
+    vectors_by_key: dict[tuple[str, int, str], list[float]] = {}
+    missing: dict[tuple[str, int, str], str] = {}
+    for key, text in zip(keys, texts):
+        if key in vectors_by_key or key in missing:
+            continue
+        vector = _getMemoryEmbedding(key)
+        if vector is not None:
+            _countStat("memory_hits")
+            vectors_by_key[key] = vector
+        else:
+            missing[key] = text
+
+    if missing:
+        futures = _getBatcher().submit(missing)
+        # shield：某个调用方被取消时，不影响共享同一 Future 的其他调用方
+        results = await asyncio.gather(
+            *[asyncio.shield(future) for future in futures.values()],
+            return_exceptions=True,
+        )
+        for key, res in zip(futures, results):
+            if isinstance(res, BaseException):
+                raise res
+            vectors_by_key[key] = res
+
+    return [vectors_by_key[key] for key in keys]
+
+
 async def vectorizeText(text: str) -> list[float]:
     """
     向量化文本
     """
-    resp = await _ark_client.multimodal_embeddings.create(
-        model=os.getenv("EMBEDDING_MODEL", ""),
-        input=[
-            {"type": "text", "text": text},
-        ],
-        dimensions=1024,
-    )
-    return resp.data.embedding
+    return (await vectorizeTexts([text]))[0]
 
 
 # 向量化图片
@@ -1,24 +1,24 @@
+import asyncio
+import json
 import logging
 import os
+import time
 from datetime import datetime
 from typing import List
 import uuid
 from langchain_core.messages import AIMessage, SystemMessage, HumanMessage, BaseMessage
+from langgraph.config import get_stream_writer
 from langgraph.graph.message import RemoveMessage
 
 from src.agents.graphs.ConversationGraph.state import (
     ConversationGraphOutput,
     ConversationGraphState,
 )
-from src.agents.llm import arkAinvoke, prepareLLM
+from src.agents.llm import arkAinvoke, arkAstream, prepareLLM
 from src.agents.prompt import getPrompt
 from src.database.enums import FineGrainedFeedDimension
 from src.services.fine_grained_feed import recallFineGrainedFeeds
-from src.services.figure_and_relation import (
-    buildFigurePersonaMarkdown,
-    getFigureAndRelation,
-)
-from src.services.user import getUserById
+from src.services.figure_and_relation import getFRConversationContext
 from src.utils.index import (
     ainvokeJsonWithRetry,
     stringifyValue,
@@ -211,6 +211,250 @@ def _recalledFeeds2Markdown(items: list[dict]) -> str:
     return "\n\n".join(lines)
 
 
+class _MessagesToSendStreamParser:
+    """
+    增量解析 LLM 输出中的 "messages_to_send" 字符串数组：每闭合一个字符串元素就返回该条消息
+    """
+
+    __slots__ = ("_buffer", "_pos", "_in_array", "_done")
+
+    _KEY = '"messages_to_send"'
+
+    def __init__(self) -> None:
+        self._buffer = ""
+        self._pos = 0  # 下一个待扫描位置
+        self._in_array = False
+        self._done = False
+
+    def feed(self, delta: str) -> list[str]:
+        """
+        追加一段输出，返回本段新闭合的消息
+        """
+        if self._done or not delta:
+            return []
+        self._buffer += delta
+        completed: list[str] = []
+
+        if not self._in_array:
+            key_index = self._buffer.find(self._KEY)
+            if key_index < 0:
+                return completed
+            # 键与 "[" 之间只允许空白和冒号；值不是数组时不再流式解析，交给非流式路径处理
+            index = key_index + len(self._KEY)
+            while index < len(self._buffer) and (
+                self._buffer[index].isspace() or self._buffer[index] == ":"
+            ):
+                index += 1
+            if index >= len(self._buffer):
+                return completed
+            if self._buffer[index] != "[":
+                self._done = True
+                return completed
+            self._in_array = True
+            self._pos = index + 1
+
+        while self._pos < len(self._buffer):
+            char = self._buffer[self._pos]
+            if char == "," or char.isspace():
+                self._pos += 1
+                continue
+            if char != '"':
+                # "]" 为数组结束；对象、嵌套数组等非字符串元素不流式推送，停止解析
+                self._done = True
+                break
+            end = self._findStringEnd(self._pos + 1)
+            if end < 0:
+                # 字符串尚未闭合，等待后续输出
+                break
+            try:
+                message = json.loads(self._buffer[self._pos : end + 1])
+            except ValueError:
+                message = None
+            if isinstance(message, str):
+                completed.append(message)
+            self._pos = end + 1
+        return completed
+
+    def _findStringEnd(self, start: int) -> int:
+        index = start
+        while index < len(self._buffer):
+            char = self._buffer[index]
+            if char == "\\":
+                index += 2
+                continue
+            if char == '"':
+                return index
+            index += 1
+        return -1
+
+
+async def _streamMessagesToSend(
+    messages: List[BaseMessage],
+) -> tuple[str, str, list[str], Exception | None]:
+    """
+    流式调用 LLM：messages_to_send 中每闭合一条消息，立即通过 custom stream 推送给调用方
+    返回 (完整输出, 推理内容, 已推送的消息, 流式中断的异常)；
+    中途出错时不抛出，已推送的消息仍然返回，避免调用方重复回复
+    """
+    writer = get_stream_writer()
+    parser = _MessagesToSendStreamParser()
+    output_chunks: list[str] = []
+    reasoning_chunks: list[str] = []
+    emitted: list[str] = []
+    start_time = time.perf_counter()
+
+    try:
+        async for chunk in arkAstream(
+            model="LITE_MODEL",
+            messages=messages,
+            model_options={
+                "temperature": 0.3,
+                "reasoning_effort": "low",
+            },
+        ):
+            if chunk["type"] == "reasoning":
+                reasoning_chunks.append(chunk["delta"])
+                continue
+            output_chunks.append(chunk["delta"])
+            for message in parser.feed(chunk["delta"]):
+                if not emitted:
+                    logger.info(
+                        f"First message streamed in {time.perf_counter() - start_time:.2f}s"
+                    )
+                emitted.append(message)
+                writer({"message_to_send": message})
+    except Exception as e:
+        logger.warning(
+            f"Streaming interrupted after {len(emitted)} message(s): {e}",
+            exc_info=True,
+        )
+        return "".join(output_chunks), "".join(reasoning_chunks), emitted, e
+
+    return "".join(output_chunks), "".join(reasoning_chunks), emitted, None
+
+
+def _conversationRecallScope() -> list[dict]:
+    """
+    对话场景的召回范围
+    """
+    return [
+        # 重大改动：完全不从 db 召回这两个低语境依赖的信息，避免和 persona 重复注入
+        # {
+        #     "scope": FineGrainedFeedDimension.PERSONALITY,
+        #     "top_k": int(
+        #         os.getenv("TOP_K_PERSONALITY_FEEDS_FOR_CONVERSATION", "3")
+        #     ),
+        # },
+        # {
+        #     "scope": FineGrainedFeedDimension.INTERACTION_STYLE,
+        #     "top_k": int(
+        #         os.getenv("TOP_K_INTERACTION_FEEDS_FOR_CONVERSATION", "3")
+        #     ),
+        # },
+        {
+            "scope": FineGrainedFeedDimension.PROCEDURAL_INFO,
+            "top_k": int(os.getenv("TOP_K_PROCEDURAL_FEEDS_FOR_CONVERSATION", "10")),
+        },
+        {
+            "scope": FineGrainedFeedDimension.MEMORY,
+            "top_k": int(os.getenv("TOP_K_MEMORY_FEEDS_FOR_CONVERSATION", "10")),
+        },
+    ]
+
+
+def _buildRecallQuery(messages_received: list) -> str:
+    """
+    由本轮消息拼接召回 query（投机召回与 nodeRecallFeedsFromDB 必须一致才能命中）
+    """
+    if not isinstance(messages_received, list):
+        return ""
+    return ". ".join([item for item in messages_received if isinstance(item, str)])
+
+
+# 投机召回缓存：(user_id, fr_id, query) -> (创建时间, 召回 task)，仅在同一事件循环内复用
+_speculative_recall_cache: dict[tuple[int, int, str], tuple[float, asyncio.Task]] = {}
+
+
+def _pruneSpeculativeRecallCache(now: float) -> None:
+    ttl_seconds = float(os.getenv("SPECULATIVE_RECALL_TTL_SECONDS") or 60)
+    for key, (created_at, _) in list(_speculative_recall_cache.items()):
+        if now - created_at > ttl_seconds:
+            _speculative_recall_cache.pop(key, None)
+    # 兜底上限，按创建时间淘汰最早的
+    overflow = len(_speculative_recall_cache) - 256
+    if overflow > 0:
+        for key, _ in sorted(
+            _speculative_recall_cache.items(), key=lambda item: item[1][0]
+        )[:overflow]:
+            _speculative_recall_cache.pop(key, None)
+
+
+async def speculateConversationRecall(
+    user_id: int, fr_id: int, messages_received: list[str]
+) -> None:
+    """
+    防抖窗口内投机召回：按当前已收到的消息（前缀）提前完成 embedding + 向量召回并缓存，
+    窗口结束时若本轮消息未再变化，nodeRecallFeedsFromDB 直接复用结果
+    """
+    query = _buildRecallQuery(messages_received)
+    if query.strip() == "":
+        return
+    loop = asyncio.get_running_loop()
+    key = (user_id, fr_id, query)
+    now = time.monotonic()
+    _pruneSpeculativeRecallCache(now)
+    entry = _speculative_recall_cache.get(key)
+    if entry is not None and entry[1].get_loop() is loop:
+        return
+    task = loop.create_task(
+        recallFineGrainedFeeds(
+            user_id=user_id,
+            fr_id=fr_id,
+            scope=_conversationRecallScope(),
+            query=query,
+        )
+    )
+    _speculative_recall_cache[key] = (now, task)
+    try:
+        # 投机召回失败时移出缓存，正式召回时重新执行
+        res = await asyncio.shield(task)
+        if res.get("status") != 200:
+            _speculative_recall_cache.pop(key, None)
+    except asyncio.CancelledError:
+        raise
+    except Exception as e:
+        logger.warning(f"Speculative recall failed: {e}")
+        _speculative_recall_cache.pop(key, None)
+
+
+async def _recallConversationFeeds(user_id: int, fr_id: int, query: str) -> dict:
+    """
+    对话召回：优先复用投机召回结果（含仍在进行中的召回），否则实时召回
+    """
+    entry = _speculative_recall_cache.pop((user_id, fr_id, query), None)
+    if entry is not None:
+        created_at, task = entry
+        ttl_seconds = float(os.getenv("SPECULATIVE_RECALL_TTL_SECONDS") or 60)
+        if (
+            task.get_loop() is asyncio.get_running_loop()
+            and time.monotonic() - created_at <= ttl_seconds
+        ):
+            try:
+                res = await task
+                if res.get("status") == 200:
+                    logger.info("Speculative recall hit")
+                    return res
+            except Exception as e:
+                logger.warning(f"Speculative recall task failed: {e}")
+
+    return await recallFineGrainedFeeds(
+        user_id=user_id,
+        fr_id=fr_id,
+        scope=_conversationRecallScope(),
+        query=query,
+    )
+
+
 def nodeLoadFRAndPersona(state: ConversationGraphState) -> dict:
     """
     加载当前 figure_and_relation 及其人物画像
@@ -223,26 +467,12 @@ def nodeLoadFRAndPersona(state: ConversationGraphState) -> dict:
     user_id = request["user_id"]
     fr_id = request["fr_id"]
 
-    user = getUserById(user_id).get("user")
-    if user is None:
-        logger.error("User not found")
-        raise ValueError("User not found")
-
-    fr = getFigureAndRelation(user_id, fr_id).get("figure_and_relation")
-    if fr is None:
-        logger.error("Figure and relation not found")
-        raise ValueError("Figure and relation not found")
-
-    figure_persona = buildFigurePersonaMarkdown(
-        fr=fr,
-        exclude_fields=[
-            "words_figure2user",
-            "words_user2figure",
-            "core_procedural_info",
-            "core_memory",
-        ],  # 不包含在其他部分被注入的字段
-    )
-    words_to_user = fr.get("words_figure2user", [])
+    # 画像与用户展示名走进程内缓存，FR 更新时主动失效
+    res = getFRConversationContext(user_id, fr_id)
+    if res.get("status") != 200:
+        logger.error(res.get("message", "Load FR context failed"))
+        raise ValueError(res.get("message", "Load FR context failed"))
+    context = res["context"]
     # 追加节点执行日志，保留上游日志链路
     logs = state.get("logs") or []
     logs += [
@@ -252,18 +482,16 @@ def nodeLoadFRAndPersona(state: ConversationGraphState) -> dict:
             "detail": "FigureAndRelation loaded",
             "data": {
                 "fr_id": request["fr_id"],
-                "figure_role": fr.get("figure_role"),
+                "figure_role": context["figure_role"],
             },
         }
     ]
-    username = user.get("username")
-    nickname = user.get("nickname", username)
     logger.info("nodeLoadFRAndPersona executed finished\n")
     return {
         "round_uuid": round_uuid,
-        "user_name": f"{username}({nickname})" if username != nickname else username,
-        "figure_persona": figure_persona,
-        "words_to_user": ", ".join(words_to_user),
+        "user_name": context["user_name"],
+        "figure_persona": context["figure_persona"],
+        "words_to_user": ", ".join(context["words_to_user"]),
         "logs": logs,
     }
 
@@ -280,10 +508,7 @@ async def nodeRecallFeedsFromDB(state: ConversationGraphState) -> dict:
     request = state["request"]
     user_id = request["user_id"]
     fr_id = request["fr_id"]
-    messages_received = request["messages_received"]
-    if not isinstance(messages_received, list):
-        messages_received = []
-    query = ". ".join([item for item in messages_received if isinstance(item, str)])
+    query = _buildRecallQuery(request["messages_received"])
 
     if not isinstance(query, str) or query.strip() == "":
         warning_message = f"Messages_received is empty"
@@ -306,36 +531,7 @@ async def nodeRecallFeedsFromDB(state: ConversationGraphState) -> dict:
             "logs": logs,
         }
 
-    recalled = await recallFineGrainedFeeds(
-        user_id=user_id,
-        fr_id=fr_id,
-        scope=[
-            # 重大改动：完全不从 db 召回这两个低语境依赖的信息，避免和 persona 重复注入
-            # {
-            #     "scope": FineGrainedFeedDimension.PERSONALITY,
-            #     "top_k": int(
-            #         os.getenv("TOP_K_PERSONALITY_FEEDS_FOR_CONVERSATION", "3")
-            #     ),
-            # },
-            # {
-            #     "scope": FineGrainedFeedDimension.INTERACTION_STYLE,
-            #     "top_k": int(
-            #         os.getenv("TOP_K_INTERACTION_FEEDS_FOR_CONVERSATION", "3")
-            #     ),
-            # },
-            {
-                "scope": FineGrainedFeedDimension.PROCEDURAL_INFO,
-                "top_k": int(
-                    os.getenv("TOP_K_PROCEDURAL_FEEDS_FOR_CONVERSATION", "10")
-                ),
-            },
-            {
-                "scope": FineGrainedFeedDimension.MEMORY,
-                "top_k": int(os.getenv("TOP_K_MEMORY_FEEDS_FOR_CONVERSATION", "10")),
-            },
-        ],
-        query=query,
-    )
+    recalled = await _recallConversationFeeds(user_id, fr_id, query)
     if recalled.get("status") != 200:
         error_message = f"Recall failed: {recalled.get('message', 'Unknown error')}"
         logger.warning(f"Recall failed: {recalled}")
@@ -545,6 +741,57 @@ async def nodeCallLLM(state: ConversationGraphState) -> ConversationGraphOutput:
     output = ""
     reasoning_content = ""
 
+    # 流式模式：边生成边推送已闭合的消息；未推送出任何消息时退回非流式调用（带 JSON 重试）
+    # 已推送过消息时即使流中途出错也不再退回，避免用户收到两份混合的回复
+    if (os.getenv("CONVERSATION_STREAMING") or "true").lower() == "true":
+        try:
+            output, reasoning_content, streamed_messages, stream_error = (
+                await _streamMessagesToSend(messages_to_send)
+            )
+        except Exception as e:
+            logger.warning(f"nodeCallLLM streaming failed: {e}", exc_info=True)
+            streamed_messages = []
+            stream_error = e
+        if streamed_messages:
+            if stream_error is not None:
+                warning_message = (
+                    "nodeCallLLM: streaming interrupted, keep streamed messages"
+                )
+                warnings += [warning_message]
+                logs += [
+                    {
+                        "step": "nodeCallLLM",
+                        "status": "error",
+                        "detail": "Streaming interrupted after partial messages",
+                        "data": {
+                            "streamed_count": len(streamed_messages),
+                            "error": str(stream_error),
+                        },
+                    }
+                ]
+            else:
+                # 解析器遇到非字符串元素时会提前停止：以完整输出为准补齐未推送的消息
+                try:
+                    parsed_messages = json.loads(output).get("messages_to_send")
+                except (ValueError, AttributeError):
+                    parsed_messages = None
+                if isinstance(parsed_messages, list):
+                    parsed_messages = [m for m in parsed_messages if isinstance(m, str)]
+                    if parsed_messages[: len(streamed_messages)] == streamed_messages:
+                        streamed_messages = parsed_messages
+            return _buildCallLLMOutput(
+                state=state,
+                messages=messages,
+                figure_messages_this_round=streamed_messages,
+                reasoning_content=reasoning_content,
+                warnings=warnings,
+                errors=errors,
+                logs=logs,
+                streamed=True,
+            )
+        output = ""
+        reasoning_content = ""
+
     async def _invokeContent(retry_messages: List[BaseMessage]) -> str:
         nonlocal output, reasoning_content
         resp = await arkAinvoke(
@@ -621,6 +868,35 @@ async def nodeCallLLM(state: ConversationGraphState) -> ConversationGraphOutput:
     else:
         figure_messages_this_round = []
 
+    return _buildCallLLMOutput(
+        state=state,
+        messages=messages,
+        figure_messages_this_round=figure_messages_this_round,
+        reasoning_content=reasoning_content,
+        warnings=warnings,
+        errors=errors,
+        logs=logs,
+        streamed=False,
+    )
+
+
+def _buildCallLLMOutput(
+    state: ConversationGraphState,
+    messages: List[BaseMessage],
+    figure_messages_this_round: list[str],
+    reasoning_content: str,
+    warnings: list[str],
+    errors: list[str],
+    logs: list[dict],
+    streamed: bool,
+) -> ConversationGraphOutput:
+    """
+    组装 nodeCallLLM 的返回：写入 llm_output，并把本轮 AIMessage 追加到短期记忆
+    """
+    llm_output = state.get("llm_output") or {
+        "messages_to_send": [],
+        "reasoning_content": "",
+    }
     llm_output["messages_to_send"] = figure_messages_this_round
     llm_output["reasoning_content"] = reasoning_content or ""
 
@@ -640,6 +916,7 @@ async def nodeCallLLM(state: ConversationGraphState) -> ConversationGraphOutput:
             "detail": "LLM response generated",
             "data": {
                 "messages_to_send_count": len(figure_messages_this_round),
+                "streamed": streamed,
             },
         }
     ]
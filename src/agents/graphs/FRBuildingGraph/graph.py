@@ -1,7 +1,9 @@
 import asyncio
+import inspect
 import logging
+import os
 from contextlib import asynccontextmanager
-from typing import AsyncIterator
+from typing import AsyncIterator, Awaitable, Callable
 from langgraph.graph import StateGraph, START, END
 from langgraph.graph.state import CompiledStateGraph
 
@@ -71,27 +73,96 @@ def buildFRBuildingGraph() -> CompiledStateGraph:
 
 # 全局单例：在模块导入时执行一次，进程内后续都复用同一个对象
 FRBuildingGraph = buildFRBuildingGraph()
-# 限制并发任务数量（同一时刻最多 1 个任务在跑）
-_frBuildingGraphSemaphore = asyncio.Semaphore(1)
+# 全局并发上限：不同 FR 的任务可并行执行
+_frBuildingGraphSemaphore = asyncio.Semaphore(
+    max(1, int(os.getenv("FR_BUILDING_MAX_CONCURRENCY") or 2))
+)
+# 等待全局并发名额的任务数
+_global_waiting_count = 0
+# 每个 fr_id 一把锁：同一 FR 的任务按到达顺序排队执行
+_fr_locks: dict[int, asyncio.Lock] = {}
+# 每个 fr_id 当前排队 + 运行中的任务数
+_fr_queue_length: dict[int, int] = {}
+
+
+async def _notifyQueued(
+    on_queued: Callable[[int, str], Awaitable[None] | None] | None,
+    position: int,
+    reason: str,
+) -> None:
+    """
+    通知排队位置，回调异常不影响任务本身
+    """
+    if on_queued is None:
+        return
+    try:
+        res = on_queued(position, reason)
+        if inspect.isawaitable(res):
+            await res
+    except Exception as e:
+        logger.warning(f"Fail to notify queue position: {e}", exc_info=True)
 
 
 @asynccontextmanager
-async def getFRBuildingGraph() -> AsyncIterator[CompiledStateGraph]:
+async def getFRBuildingGraph(
+    fr_id: int | None = None,
+    on_queued: Callable[[int, str], Awaitable[None] | None] | None = None,
+) -> AsyncIterator[CompiledStateGraph]:
     """
     获取 FRBuildingGraph 的异步上下文管理器。
 
-    - 通过 asyncio.Semaphore(1) 保证同一时刻仅一个任务占用 Graph，避免
-      `+=` 这种非原子操作在多协程下计数错乱的问题；
-    - 若当前已有任务在跑则直接抛 RuntimeError，保持原有“拒绝并发”的语义；
-    - 通过 `async with` 保证异常路径也能正确释放信号量，避免计数泄漏。
+    - 同一 fr_id 的任务通过 per-FR 锁按顺序排队，不再直接失败；
+    - 不同 fr_id 的任务并行执行，总数受 FR_BUILDING_MAX_CONCURRENCY 限制；
+    - 需要排队时调用 on_queued(position, reason)：reason 为 "fr" 表示前面有
+      position 个同一 FR 的任务，为 "global" 表示在等待全局并发名额；
+    - 同一 FR 排队数超过 FR_BUILDING_MAX_QUEUE_PER_FR 时抛 RuntimeError；
+    - 不传 fr_id 时仅受全局并发限制。
 
     使用方式:
-        async with getFRBuildingGraph() as graph:
+        async with getFRBuildingGraph(fr_id) as graph:
             res = await graph.ainvoke(init_state)
     """
-    if _frBuildingGraphSemaphore.locked():
-        raise RuntimeError(
-            "FRBuildingGraph is running, please wait until it finishes"
-        )
-    async with _frBuildingGraphSemaphore:
-        yield FRBuildingGraph
+    global _global_waiting_count
+
+    fr_lock = None
+    if fr_id is not None:
+        ahead = _fr_queue_length.get(fr_id, 0)
+        max_queue = int(os.getenv("FR_BUILDING_MAX_QUEUE_PER_FR") or 5)
+        if ahead >= max_queue:
+            raise RuntimeError(
+                f"FRBuildingGraph queue is full for fr_id={fr_id}, please wait until it finishes"
+            )
+        _fr_queue_length[fr_id] = ahead + 1
+        fr_lock = _fr_locks.setdefault(fr_id, asyncio.Lock())
+        if ahead > 0:
+            await _notifyQueued(on_queued, ahead, "fr")
+
+    try:
+        if fr_lock is not None:
+            await fr_lock.acquire()
+        try:
+            if _frBuildingGraphSemaphore.locked():
+                _global_waiting_count += 1
+                await _notifyQueued(on_queued, _global_waiting_count, "global")
+                try:
+                    await _frBuildingGraphSemaphore.acquire()
+                finally:
+                    _global_waiting_count -= 1
+            else:
+                await _frBuildingGraphSemaphore.acquire()
+            try:
+                yield FRBuildingGraph
+            finally:
+                _frBuildingGraphSemaphore.release()
+        finally:
+            if fr_lock is not None:
+                fr_lock.release()
+    finally:
+        if fr_id is not None:
+            remaining = _fr_queue_length.get(fr_id, 1) - 1
+            if remaining <= 0:
+                # 无任务排队时回收锁，避免字典无限增长
+                _fr_queue_length.pop(fr_id, None)
+                _fr_locks.pop(fr_id, None)
+            else:
+                _fr_queue_length[fr_id] = remaining
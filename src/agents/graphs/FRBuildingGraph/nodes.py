@@ -2,6 +2,7 @@ import asyncio
 import json
 import logging
 import os
+import time
 from typing import List, Literal
 from langchain_core.messages import BaseMessage, HumanMessage, SystemMessage
 
@@ -31,11 +32,10 @@ from src.services.figure_and_relation import (
     updateFigureAndRelation,
 )
 from src.services.fine_grained_feed import (
-    addFineGrainedFeed,
-    addFineGrainedFeedConflict,
     addOriginalSource,
+    buildFeedEmbeddingText,
+    bulkUpsertFineGrainedFeeds,
     recallFineGrainedFeeds,
-    updateFineGrainedFeed,
 )
 from src.services.user import getUserById
 from src.utils.index import (
@@ -101,6 +101,96 @@ async def _compareFieldViaLLM(
     }
 
 
+_COMPARE_TAGS = {"irrelevant", "supplementary", "equivalent", "new_adopted", "conflictive"}
+
+# 批量对比时追加的输出格式说明，覆盖单对对比 prompt 中的输出格式
+_COMPARE_FIELD_BATCH_INSTRUCTION = """You will receive ONE new_value and SEVERAL old_value candidates, each with a pair_id.
+Judge every (old_value, new_value) pair independently, applying all the rules above to each pair exactly as if it were compared alone.
+
+Output only a single JSON object in the following format, with exactly one result per pair_id:
+{
+"results": [
+{
+"pair_id": int,
+"tag": "irrelevant" | "supplementary" | "equivalent" | "new_adopted" | "conflictive",
+"final_value": string | string[] | null,
+"conflict_status": "pending | resolved_keep_old | resolved_accept_new | resolved_merge | resolved_rewrite" | null,
+"detail": string
+}
+]
+}"""
+
+
+async def _compareFieldBatchViaLLM(
+    field_name: str,
+    field_type: Literal["string", "list"],
+    old_values: list[str],
+    new_value: str,
+) -> list[dict | None]:
+    """
+    通过一次 LLM 调用，把 new_value 与多个 old_value 逐对对照
+    返回与 old_values 顺序一致的结果；某一对缺失或不合法时对应位置为 None，由调用方逐对兜底
+    """
+    llm = prepareLLM(
+        "MINI_MODEL",
+        options={
+            "temperature": 0,
+            "reasoning_effort": "minimal",
+        },
+    )
+    FR_BUILDING_COMPARE_FIELD = await getPrompt(os.getenv("FR_BUILDING_COMPARE_FIELD"))
+    # 提示词兜底
+    if not FR_BUILDING_COMPARE_FIELD:
+        logger.error("FR compare field prompt is empty")
+        raise ValueError("FR compare field prompt is empty")
+
+    pairs = [
+        {"pair_id": pair_id, "old_value": old_value}
+        for pair_id, old_value in enumerate(old_values)
+    ]
+    user_prompt = (
+        f"field_name: {field_name}\n\nfield_type: {field_type}\n\n"
+        f"new_value: {new_value}\n\n"
+        f"old_values: {json.dumps(pairs, ensure_ascii=False)}"
+    )
+    messages = [
+        SystemMessage(
+            content=f"{FR_BUILDING_COMPARE_FIELD}\n\n# Batch Mode\n\n{_COMPARE_FIELD_BATCH_INSTRUCTION}"
+        ),
+        HumanMessage(content=user_prompt),
+    ]
+
+    async def _invokeContent(retry_messages: List[BaseMessage]) -> str:
+        retry_response = await llm.ainvoke(retry_messages)
+        return stringifyValue(retry_response.content, strip=False)
+
+    parsed_res, _ = await ainvokeJsonWithRetry(
+        messages=messages,
+        invoke_content=_invokeContent,
+        max_retries=1,
+    )
+    raw_results = parsed_res.get("results") if isinstance(parsed_res, dict) else None
+    if not isinstance(raw_results, list):
+        raise ValueError("Batch compare result is not a list")
+
+    results: list[dict | None] = [None] * len(old_values)
+    for item in raw_results:
+        if not isinstance(item, dict):
+            continue
+        pair_id = item.get("pair_id")
+        if not isinstance(pair_id, int) or not 0 <= pair_id < len(old_values):
+            continue
+        if item.get("tag") not in _COMPARE_TAGS:
+            continue
+        results[pair_id] = {
+            "tag": item.get("tag"),
+            "final_value": item.get("final_value"),
+            "conflict_status": parseEnum(ConflictStatus, item.get("conflict_status")),
+            "detail": item.get("detail"),
+        }
+    return results
+
+
 # 步骤 1-3
 def nodeLoadFR(state: FRBuildingGraphState) -> dict:
     """
@@ -911,6 +1001,305 @@ async def nodeExtractFineGrainedFeeds(state: FRBuildingGraphState) -> dict:
     }
 
 
+def _normalizeCompareText(text: str) -> str:
+    """
+    归一化对比文本：统一大小写、去掉空白与标点
+    """
+    return "".join(ch for ch in text.casefold() if ch.isalnum())
+
+
+def _prefilterCompare(
+    new_value: str,
+    old_value: str,
+    distance: float | None,
+    same_embedding_text_form: bool = True,
+) -> dict | None:
+    """
+    基于向量距离与文本归一化的低成本预判定：
+    - 归一化文本相同（且非空），或距离低于近似重复阈值 -> equivalent
+    - 距离高于无关阈值 -> irrelevant
+    其余（模糊区间）返回 None，交给 LLM 判定
+    same_embedding_text_form：两侧向量化文本的子维度前缀一致时，距离才能用于判定近似重复
+    """
+    normalized_new_value = _normalizeCompareText(new_value)
+    if normalized_new_value != "" and normalized_new_value == _normalizeCompareText(
+        old_value
+    ):
+        return {
+            "tag": "equivalent",
+            "final_value": old_value,
+            "conflict_status": ConflictStatus.RESOLVED_KEEP_OLD,
+            "detail": "Auto equivalent: normalized text is identical",
+        }
+    if not isinstance(distance, (int, float)):
+        return None
+    equivalent_distance = float(os.getenv("FEED_COMPARE_EQUIVALENT_DISTANCE") or 0.03)
+    irrelevant_distance = float(os.getenv("FEED_COMPARE_IRRELEVANT_DISTANCE") or 0.65)
+    if same_embedding_text_form and distance <= equivalent_distance:
+        return {
+            "tag": "equivalent",
+            "final_value": old_value,
+            "conflict_status": ConflictStatus.RESOLVED_KEEP_OLD,
+            "detail": f"Auto equivalent: embedding distance {distance:.4f} <= {equivalent_distance}",
+        }
+    if distance >= irrelevant_distance:
+        return {
+            "tag": "irrelevant",
+            "final_value": None,
+            "conflict_status": None,
+            "detail": f"Auto irrelevant: embedding distance {distance:.4f} >= {irrelevant_distance}",
+        }
+    return None
+
+
+def _recordStageTiming(stage_timings: dict, stage: str, started_at: float) -> None:
+    """
+    记录阶段耗时（累计、最大值、次数）
+    """
+    elapsed = time.perf_counter() - started_at
+    timing = stage_timings[stage]
+    timing["count"] += 1
+    timing["total_seconds"] += elapsed
+    timing["max_seconds"] = max(timing["max_seconds"], elapsed)
+
+
+async def _planFineGrainedFeedUpsertItem(
+    user_id: int,
+    fr_id: int,
+    feed,
+    top_k: int,
+    compare_semaphore: asyncio.Semaphore,
+    stage_timings: dict,
+    prefilter_stats: dict,
+) -> tuple[list[dict], list[str]]:
+    """
+    单条 extracted feed 的对照更新计划：召回 -> 与召回项逐一对比 -> 生成计划项
+    返回 (计划项, warnings)
+    """
+    warnings = []
+    if not isinstance(feed, dict):
+        warning = f"Invalid extracted feed item: {feed}"
+        logger.warning(warning)
+        return [], [warning]
+
+    dimension = feed.get("dimension")
+    content = stringifyValue(feed.get("content"))
+    if not isinstance(dimension, FineGrainedFeedDimension):
+        warning = f"Invalid extracted feed dimension: {feed.get('dimension')}"
+        logger.warning(warning)
+        return [], [warning]
+    if content == "":
+        warning = f"Extracted feed content is empty for dimension={dimension.value}"
+        logger.warning(warning)
+        return [], [warning]
+    sub_dimension = (
+        stringifyValue(feed.get("sub_dimension")) if feed.get("sub_dimension") else None
+    )
+
+    recall_started_at = time.perf_counter()
+    recall_res = await recallFineGrainedFeeds(
+        user_id=user_id,
+        fr_id=fr_id,
+        # scope=[{"scope": dimension, "top_k": top_k}],
+        scope=[
+            {"scope": "all", "top_k": top_k}
+        ],  # 从所有维度召回细粒度信息，当前维度召回可能遗漏其他维度的需要变更的信息
+        # 与新增 feed 落库时的向量化文本一致（子维度 + 内容），近似重复的距离才接近 0
+        query=buildFeedEmbeddingText(content, sub_dimension),
+    )
+    _recordStageTiming(stage_timings, "recall", recall_started_at)
+
+    recalled_candidates = []
+    if recall_res.get("status") == 200:
+        recalled_items = []
+        raw_items = recall_res.get("items", {})
+        if isinstance(raw_items, dict):
+            recalled_items = [
+                *raw_items.get(FineGrainedFeedDimension.PERSONALITY.value, []),
+                *raw_items.get(FineGrainedFeedDimension.INTERACTION_STYLE.value, []),
+                *raw_items.get(FineGrainedFeedDimension.PROCEDURAL_INFO.value, []),
+                *raw_items.get(FineGrainedFeedDimension.MEMORY.value, []),
+            ]
+
+        for item in recalled_items:
+            if not isinstance(item, dict):
+                continue
+            raw_feed = item.get("fine_grained_feed")
+            if not isinstance(raw_feed, dict):
+                continue
+
+            recalled_dimension = parseEnum(
+                FineGrainedFeedDimension, raw_feed.get("dimension")
+            )
+            recalled_confidence = parseEnum(
+                FineGrainedFeedConfidence, raw_feed.get("confidence")
+            )
+            recalled_candidates.append(
+                {
+                    "id": raw_feed.get("id"),
+                    "dimension": recalled_dimension or dimension,
+                    "sub_dimension": raw_feed.get("sub_dimension"),
+                    "confidence": recalled_confidence or feed.get("confidence"),
+                    "content": stringifyValue(raw_feed.get("content")),
+                    "score": float(item.get("score") or 0),
+                    "distance": item.get("distance"),
+                }
+            )
+    else:
+        warning = (
+            f"Recall failed for dimension={dimension.value}, "
+            f"message={recall_res.get('message')}"
+        )
+        logger.warning(warning)
+        warnings.append(warning)
+
+    compare_targets = [
+        recalled_feed
+        for recalled_feed in recalled_candidates
+        if stringifyValue(recalled_feed.get("content")) != ""
+    ]
+
+    field_name = f"fine_grained_feed.{dimension.value}"
+    old_values = [
+        stringifyValue(recalled_feed.get("content")) for recalled_feed in compare_targets
+    ]
+
+    async def _compare(old_value: str) -> dict:
+        async with compare_semaphore:
+            compare_started_at = time.perf_counter()
+            try:
+                return await _compareFieldViaLLM(
+                    field_name=field_name,
+                    field_type="string",
+                    old_value=old_value,
+                    new_value=content,
+                )
+            finally:
+                _recordStageTiming(stage_timings, "compare", compare_started_at)
+
+    # 分层判定：向量距离明显过远 / 近乎重复的召回项直接判定，只有模糊区间交给 LLM
+    compare_results: list[dict | None] = [
+        _prefilterCompare(
+            new_value=content,
+            old_value=old_value,
+            distance=recalled_feed.get("distance"),
+            same_embedding_text_form=(
+                (stringifyValue(recalled_feed.get("sub_dimension")) or None)
+                == sub_dimension
+            ),
+        )
+        for recalled_feed, old_value in zip(compare_targets, old_values)
+    ]
+    for result in compare_results:
+        if result is not None:
+            prefilter_stats[f"auto_{result['tag']}"] += 1
+    llm_indexes = [
+        index for index, result in enumerate(compare_results) if result is None
+    ]
+    prefilter_stats["llm_pairs"] += len(llm_indexes)
+
+    batch_enabled = (os.getenv("FEED_COMPARE_BATCH_MODE") or "true").lower() == "true"
+    if batch_enabled and len(llm_indexes) > 1:
+        # 批量模式：一次 LLM 调用对比当前 feed 与全部模糊区间的召回项
+        async with compare_semaphore:
+            compare_started_at = time.perf_counter()
+            try:
+                batch_results = await _compareFieldBatchViaLLM(
+                    field_name=field_name,
+                    field_type="string",
+                    old_values=[old_values[index] for index in llm_indexes],
+                    new_value=content,
+                )
+                for index, result in zip(llm_indexes, batch_results):
+                    compare_results[index] = result
+            except Exception as e:
+                logger.warning(
+                    f"Batch compare failed, fallback to pairwise compare: {str(e)}"
+                )
+            finally:
+                _recordStageTiming(stage_timings, "compare", compare_started_at)
+
+    # 批量结果缺失的部分（或未启用批量模式）逐对对比；多个召回项相互独立，并发执行
+    pairwise_indexes = [
+        index for index, result in enumerate(compare_results) if result is None
+    ]
+    pairwise_results = await asyncio.gather(
+        *[_compare(old_values[index]) for index in pairwise_indexes]
+    )
+    for index, result in zip(pairwise_indexes, pairwise_results):
+        compare_results[index] = result
+
+    plan_items = []
+    for recalled_feed, LLM_compare_res in zip(compare_targets, compare_results):
+        tag = stringifyValue(LLM_compare_res.get("tag"))
+        final_value = stringifyValue(LLM_compare_res.get("final_value"))
+        detail = stringifyValue(LLM_compare_res.get("detail"))
+
+        if tag == "irrelevant":
+            continue
+        if tag == "equivalent":
+            plan_items.append(
+                {
+                    "extracted_feed": feed,
+                    "action": "skip",
+                    "target_feed_id": recalled_feed.get("id"),
+                    "merged_content": None,
+                    "reason": detail or "Equivalent to recalled feed",
+                    "recalled_candidates": recalled_candidates,
+                }
+            )
+            continue
+        if tag in {"supplementary", "new_adopted"}:
+            plan_items.append(
+                {
+                    "extracted_feed": feed,
+                    "action": "update",
+                    "target_feed_id": recalled_feed.get("id"),
+                    "merged_content": final_value or content,
+                    "reason": detail or f"{tag} by LLM compare",
+                    "recalled_candidates": recalled_candidates,
+                }
+            )
+            continue
+        if tag == "conflictive":
+            plan_items.append(
+                {
+                    "extracted_feed": feed,
+                    "action": "conflict",
+                    "target_feed_id": recalled_feed.get("id"),
+                    "merged_content": final_value or content,
+                    "reason": detail or "Conflictive by LLM compare",
+                    "recalled_candidates": recalled_candidates,
+                }
+            )
+            continue
+
+        warning = (
+            f"Unexpected compare tag={tag}, "
+            f"dimension={dimension.value}, target_feed_id={recalled_feed.get('id')}"
+        )
+        logger.warning(warning)
+        warnings.append(warning)
+
+    if not plan_items:
+        reason = (
+            "All recalled feeds are irrelevant"
+            if len(recalled_candidates) > 0
+            else "No relevant recalled feed, add new feed"
+        )
+        plan_items.append(
+            {
+                "extracted_feed": feed,
+                "action": "add",
+                "target_feed_id": None,
+                "merged_content": None,
+                "reason": reason,
+                "recalled_candidates": recalled_candidates,
+            }
+        )
+    return plan_items, warnings
+
+
 async def nodePlanFineGrainedFeedUpsert(state: FRBuildingGraphState) -> dict:
     """
     FineGrainedFeed 对照更新计划
@@ -945,164 +1334,40 @@ async def nodePlanFineGrainedFeedUpsert(state: FRBuildingGraphState) -> dict:
 
     # 召回条数限制在 3-5，默认 5
     top_k = int(os.getenv("TOP_K_FEEDS_FOR_COMPARE") or 5)
-
-    feed_upsert_plan = []
-    for feed in extracted_feeds:
-        if not isinstance(feed, dict):
-            warning = f"Invalid extracted feed item: {feed}"
-            logger.warning(warning)
-            warnings = warnings + [warning]
-            continue
-
-        dimension = feed.get("dimension")
-        content = stringifyValue(feed.get("content"))
-        if not isinstance(dimension, FineGrainedFeedDimension):
-            warning = f"Invalid extracted feed dimension: {feed.get('dimension')}"
-            logger.warning(warning)
-            warnings = warnings + [warning]
-            continue
-        if content == "":
-            warning = f"Extracted feed content is empty for dimension={dimension.value}"
-            logger.warning(warning)
-            warnings = warnings + [warning]
-            continue
-
-        recall_res = await recallFineGrainedFeeds(
-            user_id=user_id,
-            fr_id=fr_id,
-            # scope=[{"scope": dimension, "top_k": top_k}],
-            scope=[
-                {"scope": "all", "top_k": top_k}
-            ],  # 从所有维度召回细粒度信息，当前维度召回可能遗漏其他维度的需要变更的信息
-            query=content,
-        )
-
-        recalled_candidates = []
-        if recall_res.get("status") == 200:
-            recalled_items = []
-            raw_items = recall_res.get("items", {})
-            if isinstance(raw_items, dict):
-                recalled_items = [
-                    *raw_items.get(FineGrainedFeedDimension.PERSONALITY.value, []),
-                    *raw_items.get(
-                        FineGrainedFeedDimension.INTERACTION_STYLE.value, []
-                    ),
-                    *raw_items.get(FineGrainedFeedDimension.PROCEDURAL_INFO.value, []),
-                    *raw_items.get(FineGrainedFeedDimension.MEMORY.value, []),
-                ]
-
-            for item in recalled_items:
-                if not isinstance(item, dict):
-                    continue
-                raw_feed = item.get("fine_grained_feed")
-                if not isinstance(raw_feed, dict):
-                    continue
-
-                recalled_dimension = parseEnum(
-                    FineGrainedFeedDimension, raw_feed.get("dimension")
-                )
-                recalled_confidence = parseEnum(
-                    FineGrainedFeedConfidence, raw_feed.get("confidence")
-                )
-                recalled_candidates.append(
-                    {
-                        "id": raw_feed.get("id"),
-                        "dimension": recalled_dimension or dimension,
-                        "sub_dimension": raw_feed.get("sub_dimension"),
-                        "confidence": recalled_confidence or feed.get("confidence"),
-                        "content": stringifyValue(raw_feed.get("content")),
-                        "score": float(item.get("score") or 0),
-                    }
-                )
-        else:
-            warning = (
-                f"Recall failed for dimension={dimension.value}, "
-                f"message={recall_res.get('message')}"
-            )
-            logger.warning(warning)
-            warnings = warnings + [warning]
-
-        handled_flag = False
-
-        for recalled_feed in recalled_candidates:
-            old_content = stringifyValue(recalled_feed.get("content"))
-            if old_content == "":
-                continue
-            LLM_compare_res = await _compareFieldViaLLM(
-                field_name=f"fine_grained_feed.{dimension.value}",
-                field_type="string",
-                old_value=old_content,
-                new_value=content,
+    # 不同 feed 之间相互独立，并发召回与对比；LLM 对比调用单独限流
+    feed_semaphore = asyncio.Semaphore(
+        int(os.getenv("FEED_UPSERT_PLAN_CONCURRENCY") or 4)
+    )
+    compare_semaphore = asyncio.Semaphore(
+        int(os.getenv("FEED_COMPARE_LLM_CONCURRENCY") or 8)
+    )
+    stage_timings = {
+        "recall": {"count": 0, "total_seconds": 0.0, "max_seconds": 0.0},
+        "compare": {"count": 0, "total_seconds": 0.0, "max_seconds": 0.0},
+    }
+    prefilter_stats = {"auto_irrelevant": 0, "auto_equivalent": 0, "llm_pairs": 0}
+
+    async def _planOneFeed(feed) -> tuple[list[dict], list[str]]:
+        async with feed_semaphore:
+            return await _planFineGrainedFeedUpsertItem(
+                user_id=user_id,
+                fr_id=fr_id,
+                feed=feed,
+                top_k=top_k,
+                compare_semaphore=compare_semaphore,
+                stage_timings=stage_timings,
+                prefilter_stats=prefilter_stats,
             )
-            tag = stringifyValue(LLM_compare_res.get("tag"))
-            final_value = stringifyValue(LLM_compare_res.get("final_value"))
-            detail = stringifyValue(LLM_compare_res.get("detail"))
-
-            if tag == "irrelevant":
-                continue
-            if tag == "equivalent":
-                handled_flag = True
-                feed_upsert_plan.append(
-                    {
-                        "extracted_feed": feed,
-                        "action": "skip",
-                        "target_feed_id": recalled_feed.get("id"),
-                        "merged_content": None,
-                        "reason": detail or "Equivalent to recalled feed",
-                        "recalled_candidates": recalled_candidates,
-                    }
-                )
-                continue
-            if tag in {"supplementary", "new_adopted"}:
-                handled_flag = True
-                feed_upsert_plan.append(
-                    {
-                        "extracted_feed": feed,
-                        "action": "update",
-                        "target_feed_id": recalled_feed.get("id"),
-                        "merged_content": final_value or content,
-                        "reason": detail or f"{tag} by LLM compare",
-                        "recalled_candidates": recalled_candidates,
-                    }
-                )
-                continue
-            if tag == "conflictive":
-                handled_flag = True
-                feed_upsert_plan.append(
-                    {
-                        "extracted_feed": feed,
-                        "action": "conflict",
-                        "target_feed_id": recalled_feed.get("id"),
-                        "merged_content": final_value or content,
-                        "reason": detail or "Conflictive by LLM compare",
-                        "recalled_candidates": recalled_candidates,
-                    }
-                )
-                continue
 
-            warning = (
-                f"Unexpected compare tag={tag}, "
-                f"dimension={dimension.value}, target_feed_id={recalled_feed.get('id')}"
-            )
-            logger.warning(warning)
-            warnings = warnings + [warning]
+    started_at = time.perf_counter()
+    # gather 保持输入顺序，计划结果与串行执行一致
+    planned = await asyncio.gather(*[_planOneFeed(feed) for feed in extracted_feeds])
+    wall_seconds = time.perf_counter() - started_at
 
-        if not handled_flag:
-            reason = (
-                "All recalled feeds are irrelevant"
-                if len(recalled_candidates) > 0
-                else "No relevant recalled feed, add new feed"
-            )
-            feed_upsert_plan.append(
-                {
-                    "extracted_feed": feed,
-                    "action": "add",
-                    "target_feed_id": None,
-                    "merged_content": None,
-                    "reason": reason,
-                    "recalled_candidates": recalled_candidates,
-                }
-            )
+    feed_upsert_plan = []
+    for plan_items, feed_warnings in planned:
+        feed_upsert_plan += plan_items
+        warnings = warnings + feed_warnings
 
     action_counter = {"add": 0, "update": 0, "skip": 0, "conflict": 0}
     for item in feed_upsert_plan:
@@ -1120,6 +1385,23 @@ async def nodePlanFineGrainedFeedUpsert(state: FRBuildingGraphState) -> dict:
                 "input_feed_count": len(extracted_feeds),
                 "planned_feed_count": len(feed_upsert_plan),
                 "action_counter": action_counter,
+                "prefilter": {
+                    **prefilter_stats,
+                    # 逐对计算时本应发起、被向量阈值直接判定而省掉的 LLM 对比次数
+                    "avoided_llm_compares": prefilter_stats["auto_irrelevant"]
+                    + prefilter_stats["auto_equivalent"],
+                },
+                "timings": {
+                    "wall_seconds": round(wall_seconds, 3),
+                    **{
+                        stage: {
+                            "count": timing["count"],
+                            "total_seconds": round(timing["total_seconds"], 3),
+                            "max_seconds": round(timing["max_seconds"], 3),
+                        }
+                        for stage, timing in stage_timings.items()
+                    },
+                },
             },
         }
     ]
@@ -1171,6 +1453,8 @@ async def nodePersistFineGrainedFeedUpsert(state: FRBuildingGraphState) -> dict:
         }
 
     feed_upsert_results = []
+    # 需要落库的计划项：(feed_upsert_results 下标, 批量落库项)
+    bulk_items = []
 
     for plan_item in feed_upsert_plan:
         if not isinstance(plan_item, dict):
@@ -1217,62 +1501,51 @@ async def nodePersistFineGrainedFeedUpsert(state: FRBuildingGraphState) -> dict:
             "message": "ok",
             "reason": reason,
         }
+        feed_upsert_results.append(result_item)
 
-        try:
-            # skip：不处理
-            if action == "skip":
-                result_item["message"] = "Skip equivalent feed"
-            # add：新增 feed
-            elif action == "add":
-                if content == "":
-                    result_item["status"] = -1
-                    result_item["message"] = "Empty content for add action"
-                else:
-                    add_res = await addFineGrainedFeed(
-                        user_id=user_id,
-                        fr_id=fr_id,
-                        original_source_id=original_source_id,
-                        dimension=dimension,
-                        confidence=confidence,
-                        content=content,
-                        sub_dimension=sub_dimension,
-                    )
-                    result_item["status"] = add_res.get("status", -1)
-                    result_item["message"] = add_res.get(
-                        "message", "Add FineGrainedFeed failed"
-                    )
-            # update：更新原有 feed content 为新值
-            elif action == "update":
-                if not isinstance(target_feed_id, int):
-                    result_item["status"] = -1
-                    result_item["message"] = "target_feed_id is required for update"
-                elif merged_content == "":
-                    result_item["status"] = -2
-                    result_item["message"] = "merged_content is required for update"
-                else:
-                    update_res = await updateFineGrainedFeed(
-                        user_id=user_id,
-                        fr_id=fr_id,
-                        fine_grained_feed_id=target_feed_id,
-                        new_original_source_id=original_source_id,
-                        new_content=merged_content,
-                        new_sub_dimension=sub_dimension,
-                    )
-                    result_item["status"] = update_res.get("status", -1)
-                    result_item["message"] = update_res.get(
-                        "message", "Update FineGrainedFeed failed"
+        # skip：不处理
+        if action == "skip":
+            result_item["message"] = "Skip equivalent feed"
+        # add：新增 feed
+        elif action == "add":
+            if content == "":
+                result_item["status"] = -1
+                result_item["message"] = "Empty content for add action"
+            else:
+                bulk_items.append(
+                    (
+                        result_item,
+                        {
+                            "action": "add",
+                            "dimension": dimension,
+                            "confidence": confidence,
+                            "content": content,
+                            "sub_dimension": sub_dimension,
+                        },
                     )
-            # conflict：记录冲突并更新原有 feed content 为新值（暂定策略）
-            elif action == "conflict":
-                if not isinstance(target_feed_id, int):
-                    result_item["status"] = -1
-                    result_item["message"] = "target_feed_id is required for conflict"
-                elif merged_content == "":
-                    result_item["status"] = -2
-                    result_item["message"] = "merged_content is required for conflict"
-                else:
-                    recalled_candidates = plan_item.get("recalled_candidates")
+                )
+        # update：更新原有 feed content 为新值
+        # conflict：记录冲突并更新原有 feed content 为新值（暂定策略）
+        elif action in ("update", "conflict"):
+            if not isinstance(target_feed_id, int):
+                result_item["status"] = -1
+                result_item["message"] = f"target_feed_id is required for {action}"
+            elif merged_content == "":
+                result_item["status"] = -2
+                result_item["message"] = f"merged_content is required for {action}"
+            else:
+                bulk_item = {
+                    "action": action,
+                    "dimension": dimension,
+                    "confidence": confidence,
+                    "content": content,
+                    "sub_dimension": sub_dimension,
+                    "target_feed_id": target_feed_id,
+                    "merged_content": merged_content,
+                }
+                if action == "conflict":
                     old_value = ""
+                    recalled_candidates = plan_item.get("recalled_candidates")
                     if isinstance(recalled_candidates, list):
                         for candidate in recalled_candidates:
                             if not isinstance(candidate, dict):
@@ -1281,62 +1554,56 @@ async def nodePersistFineGrainedFeedUpsert(state: FRBuildingGraphState) -> dict:
                                 continue
                             old_value = stringifyValue(candidate.get("content"))
                             break
-                    if old_value == "":
-                        old_value = merged_content
-
-                    # 降级方案：先记录冲突，再直接采用新内容进行更新
-                    conflict_res = addFineGrainedFeedConflict(
-                        user_id=user_id,
-                        fr_id=fr_id,
-                        dimension=dimension,
-                        feed_ids=[target_feed_id],
-                        old_value=old_value,
-                        new_value=content or merged_content,
-                        conflict_detail=reason or "Conflictive by LLM compare",
-                        status=ConflictStatus.PENDING,
+                    bulk_item["conflict_old_value"] = old_value or merged_content
+                    bulk_item["conflict_detail"] = (
+                        reason or "Conflictive by LLM compare"
                     )
+                bulk_items.append((result_item, bulk_item))
+        else:
+            result_item["status"] = -9
+            result_item["message"] = f"Unsupported action: {action}"
 
-                    update_res = await updateFineGrainedFeed(
-                        user_id=user_id,
-                        fr_id=fr_id,
-                        fine_grained_feed_id=target_feed_id,
-                        new_original_source_id=original_source_id,
-                        new_content=merged_content,
-                        new_sub_dimension=sub_dimension,
-                    )
-                    result_item["status"] = (
-                        200
-                        if conflict_res.get("status") == 200
-                        and update_res.get("status") == 200
-                        else -3
-                    )
-                    result_item["message"] = (
-                        "Conflict recorded and feed updated"
-                        if result_item["status"] == 200
-                        else (
-                            f"Conflict/update failed: "
-                            f"conflict={conflict_res.get('message')}, "
-                            f"update={update_res.get('message')}"
-                        )
-                    )
-            else:
-                result_item["status"] = -9
-                result_item["message"] = f"Unsupported action: {action}"
+    # 全部新增 / 更新 / 冲突在一个事务中批量落库
+    if bulk_items:
+        try:
+            bulk_res = await bulkUpsertFineGrainedFeeds(
+                user_id=user_id,
+                fr_id=fr_id,
+                original_source_id=original_source_id,
+                items=[bulk_item for _, bulk_item in bulk_items],
+            )
         except Exception as e:
             logger.error(f"Persist feed upsert failed: {str(e)}")
-            result_item["status"] = -99
-            result_item["message"] = f"Exception: {str(e)}"
+            bulk_res = {"status": -99, "message": f"Exception: {str(e)}"}
+
+        if bulk_res.get("status") == 200:
+            for (result_item, bulk_item), item_res in zip(
+                bulk_items, bulk_res.get("results") or []
+            ):
+                result_item["status"] = item_res.get("status", -1)
+                if result_item["status"] != 200:
+                    result_item["message"] = item_res.get("message", "Persist failed")
+                elif bulk_item["action"] == "add":
+                    result_item["message"] = "Add FineGrainedFeed success"
+                elif bulk_item["action"] == "update":
+                    result_item["message"] = "Update FineGrainedFeed success"
+                else:
+                    result_item["message"] = "Conflict recorded and feed updated"
+        else:
+            for result_item, _ in bulk_items:
+                result_item["status"] = bulk_res.get("status", -1)
+                result_item["message"] = bulk_res.get("message", "Persist failed")
 
+    for result_item in feed_upsert_results:
         if result_item.get("status") != 200:
             warning = (
-                f"Persist failed, action={action}, dimension={dimension.value}, "
+                f"Persist failed, action={result_item.get('action')}, "
+                f"dimension={result_item.get('dimension')}, "
                 f"message={result_item.get('message')}"
             )
             logger.warning(warning)
             warnings = warnings + [warning]
 
-        feed_upsert_results.append(result_item)
-
     success_count = len(
         [item for item in feed_upsert_results if item.get("status") == 200]
     )
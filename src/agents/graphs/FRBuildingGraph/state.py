@@ -53,6 +53,7 @@ class RecalledFineGrainedFeed(TypedDict, total=False):
     confidence: FineGrainedFeedConfidence
     content: str
     score: float
+    distance: float | None
 
 
 class FeedUpsertPlanItem(TypedDict, total=False):
@@ -1,6 +1,6 @@
 import logging
 import os
-from typing import Literal, List, Mapping, TypedDict, Any
+from typing import AsyncIterator, Literal, List, Mapping, TypedDict, Any
 from langchain_openai import ChatOpenAI
 from langchain_core.messages import AIMessage, BaseMessage, SystemMessage, HumanMessage
 
@@ -17,6 +17,11 @@ class LLMOptions(TypedDict, total=False):
     extra_body: Mapping[str, Any] | None
 
 
+class ArkStreamDelta(TypedDict):
+    type: Literal["output", "reasoning"]
+    delta: str
+
+
 class ArkLLMResponse(TypedDict):
     output: str
     reasoning_content: str | None
@@ -141,3 +146,47 @@ async def arkAinvoke(
             },
         ),
     }
+
+
+async def arkAstream(
+    model: Literal["LITE_MODEL", "MINI_MODEL"],
+    messages: List[BaseMessage],
+    model_options: LLMOptions = {},
+) -> AsyncIterator[ArkStreamDelta]:
+    """
+    通过 Ark SDK 流式调用 LLM，逐段产出正文 / 推理增量
+    """
+    model_name = os.getenv(model, "")
+    if not model_name:
+        return
+
+    # 全局单例
+    _ark_client = arkClient()
+
+    reasoning_effort = model_options.get("reasoning_effort", None)
+    stream = await _ark_client.responses.create(
+        model=model_name,
+        input=langchain2OpenAIChatMessages(
+            messages=messages, is_ark_responses_messages=True
+        ),
+        temperature=model_options.get("temperature", None),
+        max_output_tokens=model_options.get("max_tokens", None),
+        reasoning=(
+            {
+                "effort": reasoning_effort,
+            }
+            if reasoning_effort
+            else None
+        ),
+        extra_body=model_options.get("extra_body", None),
+        stream=True,
+    )
+    async for event in stream:
+        event_type = getattr(event, "type", None)
+        delta = getattr(event, "delta", None)
+        if not isinstance(delta, str) or not delta:
+            continue
+        if event_type == "response.output_text.delta":
+            yield {"type": "output", "delta": delta}
+        elif event_type == "response.reasoning_summary_text.delta":
+            yield {"type": "reasoning", "delta": delta}
@@ -1,9 +1,79 @@
+import asyncio
+import hashlib
 import json
 import html as html_lib
+import logging
+import os
 import re
-from typing import Optional, Any, List
+import threading
+import time
+from collections import OrderedDict
+from functools import lru_cache
+from pathlib import Path
+from typing import Optional, Any, List, TypedDict
 
-from src.utils.request import fetch
+from src.cli.constants import IMMORTALITY_HOME_DIR
+from src.utils.request import fetchText
+
+
+logger = logging.getLogger(__name__)
+
+# 缓存格式版本，结构变化时递增，旧版本磁盘缓存自动失效
+_PROMPT_CACHE_VERSION = 1
+_PROMPT_CACHE_DIR = IMMORTALITY_HOME_DIR / "prompt_cache"
+# 仓库内置的 prompts 目录，远端不可用时兜底；该目录不随安装包分发，
+# 只在源码目录中运行时存在，安装后可通过 PROMPT_BUNDLED_DIR 指向一份 prompts 目录
+_BUNDLED_PROMPTS_DIR = Path(__file__).resolve().parents[2] / "prompts"
+# 环境变量 key -> 内置 prompt 文件（相对 prompts 目录）
+_BUNDLED_PROMPT_PATHS: dict[str, str] = {
+    "FR_BUILDING_PREPROCESS": "FR_BUILDING_PREPROCESS.md",
+    "FR_BUILDING_EXTRACT_FR_INTRINSIC_CANDIDATES": "FR_BUILDING_EXTRACT_FR_INTRINSIC_CANDIDATES.md",
+    "FR_BUILDING_COMPARE_FIELD": "FR_BUILDING_COMPARE_FIELD.md",
+    "FR_BUILDING_COLLEAGUE": "recipes/by_role/colleague.md",
+    "FR_BUILDING_FAMILY": "recipes/by_role/family.md",
+    "FR_BUILDING_FRIEND": "recipes/by_role/friend.md",
+    "FR_BUILDING_MENTOR": "recipes/by_role/mentor.md",
+    "FR_BUILDING_PARTNER": "recipes/by_role/partner.md",
+    "FR_BUILDING_PUBLIC_FIGURE": "recipes/by_role/public-figure.md",
+    "FR_BUILDING_SELF": "recipes/by_role/self.md",
+    "FR_BUILDING_PERSONALITY": "recipes/by_dimension/personality.md",
+    "FR_BUILDING_INTERACTION_STYLE": "recipes/by_dimension/interaction.md",
+    "FR_BUILDING_PROCEDURAL_INFO": "recipes/by_dimension/procedural.md",
+    "FR_BUILDING_MEMORY": "recipes/by_dimension/memory.md",
+    "FR_BUILDING_REPORT": "FR_BUILDING_REPORT.md",
+    "SYNC_PERSONALITY_FEEDS_TO_FR_CORE": "SYNC_FEEDS_TO_FE_CORE/SYNC_PERSONALITY_FEEDS_TO_FR_CORE.md",
+    "SYNC_INTERACTION_FEEDS_TO_FR_CORE": "SYNC_FEEDS_TO_FE_CORE/SYNC_INTERACTION_FEEDS_TO_FR_CORE.md",
+    "SYNC_PROCEDURAL_FEEDS_TO_FR_CORE": "SYNC_FEEDS_TO_FE_CORE/SYNC_PROCEDURAL_FEEDS_TO_FR_CORE.md",
+    "SYNC_MEMORY_FEEDS_TO_FR_CORE": "SYNC_FEEDS_TO_FE_CORE/SYNC_MEMORY_FEEDS_TO_FR_CORE.md",
+    "SUMMARY_MESSAGES_FOR_TRIM": "SUMMARY_MESSAGES_FOR_TRIM.md",
+    "CONVERSATION_SYSTEM_PROMPT": "CONVERSATION_SYSTEM_PROMPT.md",
+}
+
+
+class _PromptCacheEntry(TypedDict):
+    version: int
+    url: str
+    text: str
+    etag: str | None
+    last_modified: str | None
+    fetched_at: float
+
+
+# JSON-LD 脚本块与 {{ 变量 }} 占位符，模块加载时编译一次
+_JSONLD_PATTERN = re.compile(
+    r'<script[^>]+type=["\']application/ld\+json["\'][^>]*>(.*?)</script>',
+    re.IGNORECASE | re.DOTALL,
+)
+_PLACEHOLDER_PATTERN = re.compile(r"{{\s*([^{}]+?)\s*}}")
+
+
+# 进程内 LRU：url -> 缓存项
+_prompt_memory_cache: "OrderedDict[str, _PromptCacheEntry]" = OrderedDict()
+_prompt_cache_lock = threading.Lock()
+# 正在后台重新校验的 url，避免重复发起
+_revalidating_urls: set[str] = set()
+# 持有后台任务引用，避免被 GC 提前回收
+_background_tasks: set[asyncio.Task] = set()
 
 
 def extractPromptFromPromptMinder(
@@ -23,11 +93,7 @@ def extractPromptFromPromptMinder(
     def _findJsonlds(doc: str) -> List[str]:
         # 抓取所有 <script type="application/ld+json">...</script>
         # 用非贪婪 + DOTALL，尽量不受换行影响
-        pattern = re.compile(
-            r'<script[^>]+type=["\']application/ld\+json["\'][^>]*>(.*?)</script>',
-            re.IGNORECASE | re.DOTALL,
-        )
-        return [m.group(1).strip() for m in pattern.finditer(doc)]
+        return [m.group(1).strip() for m in _JSONLD_PATTERN.finditer(doc)]
 
     def _iterCreativeworks(obj: Any):
         # JSON-LD 里可能是 dict / list，或 {"@graph":[...]}
@@ -59,22 +125,307 @@ def extractPromptFromPromptMinder(
         for cw in _iterCreativeworks(data):
             text = cw.get("text")
             if isinstance(text, str) and text.strip():
-                result = _normalize(text)
-                if variables:
-                    for k, v in variables.items():
-                        val = "" if v is None else str(v)
-                        pattern = re.compile(r"{{\s*" + re.escape(k) + r"\s*}}")
-                        result = pattern.sub(lambda _: val, result)
-                return result
+                return compilePromptTemplate(_normalize(text)).render(variables)
+
+    return None
+
+
+class PromptTemplate:
+    """
+    预编译的 prompt 模板：解析一次，拆分为字面量 / 占位符片段，渲染时一次 join
+    """
+
+    __slots__ = ("source", "variable_names", "_segments", "_placeholders")
+
+    def __init__(self, source: str):
+        self.source = source
+        # 偶数位为字面量，奇数位为占位符原文（变量缺失时原样保留）
+        self._segments: list[str] = []
+        # (片段下标, 变量名)
+        self._placeholders: list[tuple[int, str]] = []
+        cursor = 0
+        for m in _PLACEHOLDER_PATTERN.finditer(source):
+            self._segments.append(source[cursor : m.start()])
+            self._placeholders.append((len(self._segments), m.group(1)))
+            self._segments.append(m.group(0))
+            cursor = m.end()
+        self._segments.append(source[cursor:])
+        self.variable_names: frozenset[str] = frozenset(
+            name for _, name in self._placeholders
+        )
+
+    def check(self, variables: dict | None = None) -> tuple[list[str], list[str]]:
+        """
+        返回 (缺失的变量, 未使用的变量)
+        """
+        keys = set(variables or {})
+        return (
+            sorted(self.variable_names - keys),
+            sorted(keys - self.variable_names),
+        )
+
+    def render(self, variables: dict | None = None) -> str:
+        """
+        渲染模板；缺失的变量保留占位符原文，缺失 / 未使用的变量记录日志
+        """
+        if not self._placeholders:
+            return self.source
+        variables = variables or {}
+        parts = self._segments.copy()
+        missing = []
+        for index, name in self._placeholders:
+            if name in variables:
+                v = variables[name]
+                parts[index] = "" if v is None else str(v)
+            else:
+                missing.append(name)
+        if missing:
+            logger.warning(f"Prompt variables missing: {sorted(set(missing))}")
+        unused = set(variables) - self.variable_names
+        if unused:
+            logger.debug(f"Prompt variables unused: {sorted(unused)}")
+        return "".join(parts)
+
+
+@lru_cache(maxsize=128)
+def compilePromptTemplate(text: str) -> PromptTemplate:
+    """
+    按原文缓存已编译的模板，prompt 更新后原文变化会自动重新编译
+    """
+    return PromptTemplate(text)
+
+
+def _promptCacheTTLSeconds() -> int:
+    return int(os.getenv("PROMPT_CACHE_TTL_SECONDS") or 600)
+
+
+def _isFresh(entry: _PromptCacheEntry) -> bool:
+    return time.time() - entry["fetched_at"] < _promptCacheTTLSeconds()
+
+
+def _getMemoryEntry(url: str) -> _PromptCacheEntry | None:
+    with _prompt_cache_lock:
+        entry = _prompt_memory_cache.get(url)
+        if entry is not None:
+            _prompt_memory_cache.move_to_end(url)
+        return entry
+
+
+def _putMemoryEntry(entry: _PromptCacheEntry) -> None:
+    max_entries = int(os.getenv("PROMPT_CACHE_MAX_ENTRIES") or 64)
+    with _prompt_cache_lock:
+        _prompt_memory_cache[entry["url"]] = entry
+        _prompt_memory_cache.move_to_end(entry["url"])
+        while len(_prompt_memory_cache) > max_entries:
+            _prompt_memory_cache.popitem(last=False)
+
+
+def _diskPath(url: str) -> Path:
+    return _PROMPT_CACHE_DIR / f"{hashlib.sha256(url.encode('utf-8')).hexdigest()}.json"
+
+
+def _loadDiskEntry(url: str) -> _PromptCacheEntry | None:
+    """
+    读取磁盘缓存，格式版本不一致或损坏时视为未命中
+    """
+    path = _diskPath(url)
+    if not path.exists():
+        return None
+    try:
+        data = json.loads(path.read_text(encoding="utf-8"))
+    except Exception:
+        return None
+    if not isinstance(data, dict) or data.get("version") != _PROMPT_CACHE_VERSION:
+        return None
+    if data.get("url") != url or not isinstance(data.get("text"), str):
+        return None
+    return data
+
 
+def _saveDiskEntry(entry: _PromptCacheEntry) -> None:
+    """
+    写入磁盘缓存（先写临时文件再替换，避免并发读到半截内容）
+    """
+    try:
+        _PROMPT_CACHE_DIR.mkdir(parents=True, exist_ok=True)
+        path = _diskPath(entry["url"])
+        tmp_path = path.with_suffix(f".{os.getpid()}.{threading.get_ident()}.tmp")
+        tmp_path.write_text(json.dumps(entry, ensure_ascii=False), encoding="utf-8")
+        os.replace(tmp_path, path)
+    except Exception as e:
+        logger.warning(f"Save prompt cache failed: {str(e)}")
+
+
+def _loadBundledPrompt(url: str) -> str | None:
+    """
+    离线兜底：根据 url 反查环境变量 key，读取仓库内置 prompt
+    """
+    for env_key, relative_path in _BUNDLED_PROMPT_PATHS.items():
+        if os.getenv(env_key) != url:
+            continue
+        bundled_dir = Path(os.getenv("PROMPT_BUNDLED_DIR") or _BUNDLED_PROMPTS_DIR)
+        path = bundled_dir / relative_path
+        if not path.exists():
+            logger.warning(f"Bundled prompt not found: {path}")
+            return None
+        text = path.read_text(encoding="utf-8").strip()
+        return text or None
     return None
 
 
+def _cacheBundledPrompt(url: str) -> str | None:
+    """
+    读取内置 prompt 并作为已过期的缓存项放入内存：
+    后续调用直接返回，并在后台向远端重新校验，不再每次同步等待远端超时
+    """
+    text = _loadBundledPrompt(url)
+    if text is None:
+        return None
+    logger.warning(f"Use bundled prompt as fallback: {url}")
+    _putMemoryEntry(
+        {
+            "version": _PROMPT_CACHE_VERSION,
+            "url": url,
+            "text": text,
+            "etag": None,
+            "last_modified": None,
+            "fetched_at": 0,
+        }
+    )
+    return text
+
+
+async def _fetchPromptEntry(
+    url: str, cached: _PromptCacheEntry | None = None
+) -> _PromptCacheEntry | None:
+    """
+    拉取远端 prompt，带 ETag / If-Modified-Since 协商；成功后写回内存与磁盘
+    """
+    headers = {}
+    if cached is not None:
+        if cached.get("etag"):
+            headers["If-None-Match"] = cached["etag"]
+        if cached.get("last_modified"):
+            headers["If-Modified-Since"] = cached["last_modified"]
+
+    res = await fetchText(
+        url,
+        headers=headers or None,
+        timeout=int(os.getenv("PROMPT_FETCH_TIMEOUT_SECONDS") or 10),
+    )
+    if res["status_code"] == 304 and cached is not None:
+        # 未变更：只刷新时间戳
+        entry: _PromptCacheEntry = {**cached, "fetched_at": time.time()}
+    else:
+        text = extractPromptFromPromptMinder(res.get("body", ""))
+        if not text:
+            logger.warning(f"Prompt not found in page: {url}")
+            return cached
+        response_headers = {k.lower(): v for k, v in res["headers"].items()}
+        entry = {
+            "version": _PROMPT_CACHE_VERSION,
+            "url": url,
+            "text": text,
+            "etag": response_headers.get("etag"),
+            "last_modified": response_headers.get("last-modified"),
+            "fetched_at": time.time(),
+        }
+    _putMemoryEntry(entry)
+    _saveDiskEntry(entry)
+    return entry
+
+
+async def _revalidate(url: str, cached: _PromptCacheEntry) -> None:
+    try:
+        await _fetchPromptEntry(url, cached)
+    except Exception as e:
+        logger.warning(f"Revalidate prompt failed, keep stale cache: {url}, {str(e)}")
+    finally:
+        with _prompt_cache_lock:
+            _revalidating_urls.discard(url)
+
+
+def _scheduleRevalidate(url: str, cached: _PromptCacheEntry) -> None:
+    """
+    stale-while-revalidate：后台刷新，当前调用直接返回旧值
+    """
+    with _prompt_cache_lock:
+        if url in _revalidating_urls:
+            return
+        _revalidating_urls.add(url)
+    task = asyncio.get_running_loop().create_task(_revalidate(url, cached))
+    _background_tasks.add(task)
+    task.add_done_callback(_background_tasks.discard)
+
+
+async def _getPromptText(prompt_minder_url: str) -> str | None:
+    """
+    按 内存 LRU -> 磁盘 -> 远端 -> 内置文件 的顺序获取 prompt 原文
+    """
+    entry = _getMemoryEntry(prompt_minder_url)
+    if entry is None:
+        entry = _loadDiskEntry(prompt_minder_url)
+        if entry is not None:
+            _putMemoryEntry(entry)
+
+    if entry is not None:
+        if not _isFresh(entry):
+            _scheduleRevalidate(prompt_minder_url, entry)
+        return entry["text"]
+
+    # 冷启动：只有此时才会同步等待远端
+    try:
+        entry = await _fetchPromptEntry(prompt_minder_url)
+    except Exception as e:
+        logger.warning(f"Fetch prompt failed: {prompt_minder_url}, {str(e)}")
+        entry = None
+    if entry is not None:
+        return entry["text"]
+
+    return _cacheBundledPrompt(prompt_minder_url)
+
+
+async def getPromptTemplate(prompt_minder_url: str) -> PromptTemplate | None:
+    """
+    获取已编译的 prompt 模板
+    """
+    if not prompt_minder_url:
+        return None
+    text = await _getPromptText(prompt_minder_url)
+    if text is None:
+        return None
+    return compilePromptTemplate(text)
+
+
 async def getPrompt(
     prompt_minder_url: str, variables: dict | None = None
 ) -> str | None:
-    if not prompt_minder_url:
+    template = await getPromptTemplate(prompt_minder_url)
+    if template is None:
         return None
-    res = await fetch(prompt_minder_url)
-    html = res.get("body", "")
-    return extractPromptFromPromptMinder(html, variables)
+    return template.render(variables)
+
+
+async def warmupPrompts() -> None:
+    """
+    预热全部已配置的 prompt（缺失或过期时同步刷新），避免服务启动后首轮对话等待远端
+    """
+
+    async def _warmup(url: str) -> None:
+        cached = _getMemoryEntry(url) or _loadDiskEntry(url)
+        if cached is not None:
+            _putMemoryEntry(cached)
+            if _isFresh(cached):
+                return
+        try:
+            entry = await _fetchPromptEntry(url, cached)
+        except Exception as e:
+            logger.warning(f"Warmup prompt failed: {url}, {str(e)}")
+            entry = cached
+        if entry is None:
+            _cacheBundledPrompt(url)
+
+    urls = {
+        os.getenv(env_key) for env_key in _BUNDLED_PROMPT_PATHS if os.getenv(env_key)
+    }
+    await asyncio.gather(*[_warmup(url) for url in urls])
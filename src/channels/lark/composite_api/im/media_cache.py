@@ -0,0 +1,61 @@
+"""
+图片 / 文件上传缓存：内容哈希 -> image_key / file_key，重复发送同一素材时跳过上传
+"""
+
+import hashlib
+import os
+import threading
+import time
+from collections import OrderedDict
+from typing import Any, IO
+
+# 分块读取大小，计算哈希时不把整个文件读入内存
+_HASH_CHUNK_SIZE = 1024 * 1024
+
+# 进程内 LRU：(素材类型, 内容 sha256, ...) -> (image_key / file_key, 过期时间)
+_media_key_cache: "OrderedDict[tuple, tuple[str, float]]" = OrderedDict()
+_media_key_cache_lock = threading.Lock()
+
+
+def hashMediaContent(stream: IO[Any]) -> str:
+    """
+    分块计算流内容的 sha256，计算后将流复位到原位置
+    """
+    position = stream.tell()
+    digest = hashlib.sha256()
+    while True:
+        chunk = stream.read(_HASH_CHUNK_SIZE)
+        if not chunk:
+            break
+        digest.update(chunk if isinstance(chunk, bytes) else chunk.encode("utf-8"))
+    stream.seek(position)
+    return digest.hexdigest()
+
+
+def getCachedMediaKey(cache_key: tuple) -> str | None:
+    with _media_key_cache_lock:
+        entry = _media_key_cache.get(cache_key)
+        if entry is None:
+            return None
+        if entry[1] <= time.monotonic():
+            del _media_key_cache[cache_key]
+            return None
+        _media_key_cache.move_to_end(cache_key)
+        return entry[0]
+
+
+def setCachedMediaKey(cache_key: tuple, media_key: str) -> None:
+    ttl_seconds = float(os.getenv("LARK_MEDIA_CACHE_TTL_SECONDS") or 7 * 24 * 3600)
+    max_entries = int(os.getenv("LARK_MEDIA_CACHE_MAX_ENTRIES") or 1024)
+    if not media_key or ttl_seconds <= 0 or max_entries <= 0:
+        return
+    with _media_key_cache_lock:
+        _media_key_cache[cache_key] = (media_key, time.monotonic() + ttl_seconds)
+        _media_key_cache.move_to_end(cache_key)
+        while len(_media_key_cache) > max_entries:
+            _media_key_cache.popitem(last=False)
+
+
+def invalidateMediaKey(cache_key: tuple) -> None:
+    with _media_key_cache_lock:
+        _media_key_cache.pop(cache_key, None)
@@ -14,6 +14,7 @@ class SendCardRequest(TypedDict):
     receive_id: str | None
     card_template_id: str | None
     card_variables: dict[str, Any] | None = None
+    uuid: str | None = None
 
 
 class SendCardResponse(BaseResponse):
@@ -22,90 +23,122 @@ class SendCardResponse(BaseResponse):
         self.create_message_response: Optional[CreateMessageResponseBody] = None
 
 
-def sendCard(client: lark.Client, request: SendCardRequest) -> SendCardResponse:
-    try:
-        card_variables = request.get("card_variables")
-        if (
-            not card_variables
-            or not card_variables.get("title")
-            or not card_variables.get("content")
-        ):
-            raise ValueError("Title and content are required")
-        theme = card_variables.get("theme")
-        if (
-            theme
-            and theme != ""
-            and theme
-            not in (
-                "blue",
-                "wathet",
-                "turquoise",
-                "green",
-                "yellow",
-                "orange",
-                "red",
-                "carmine",
-                "violet",
-                "purple",
-                "indigo",
-                "grey",
-                "default",
-            )
-        ):
-            raise ValueError("Theme is invalid")
-        if not theme:
-            card_variables["theme"] = "blue"
-
-        content = json.dumps(
-            {
-                "type": "template",
-                "data": {
-                    "template_id": request.get("card_template_id"),
-                    "template_variable": card_variables or {},
-                },
-            },
-            ensure_ascii=False,
+def _buildCreateMessageRequest(request: SendCardRequest) -> CreateMessageRequest:
+    card_variables = request.get("card_variables")
+    if (
+        not card_variables
+        or not card_variables.get("title")
+        or not card_variables.get("content")
+    ):
+        raise ValueError("Title and content are required")
+    theme = card_variables.get("theme")
+    if (
+        theme
+        and theme != ""
+        and theme
+        not in (
+            "blue",
+            "wathet",
+            "turquoise",
+            "green",
+            "yellow",
+            "orange",
+            "red",
+            "carmine",
+            "violet",
+            "purple",
+            "indigo",
+            "grey",
+            "default",
         )
+    ):
+        raise ValueError("Theme is invalid")
+    if not theme:
+        card_variables["theme"] = "blue"
 
-        create_message_req = (
-            CreateMessageRequest.builder()
-            .receive_id_type(request.get("receive_id_type"))
-            .request_body(
-                CreateMessageRequestBody.builder()
-                .receive_id(request.get("receive_id"))
-                .msg_type("interactive")
-                .content(content)
-                .build()
-            )
+    content = json.dumps(
+        {
+            "type": "template",
+            "data": {
+                "template_id": request.get("card_template_id"),
+                "template_variable": card_variables or {},
+            },
+        },
+        ensure_ascii=False,
+    )
+
+    return (
+        CreateMessageRequest.builder()
+        .receive_id_type(request.get("receive_id_type"))
+        .request_body(
+            CreateMessageRequestBody.builder()
+            .receive_id(request.get("receive_id"))
+            .msg_type("interactive")
+            .content(content)
+            .uuid(request.get("uuid"))
             .build()
         )
+        .build()
+    )
 
-        create_message_resp: CreateMessageResponse = client.im.v1.message.create(
-            create_message_req
+
+def _buildSendCardResponse(
+    create_message_resp: CreateMessageResponse,
+) -> SendCardResponse:
+    response = SendCardResponse()
+    response.raw = create_message_resp.raw
+    response.create_message_response = create_message_resp.data
+    if not create_message_resp.success():
+        lark.logger.error(
+            f"client.im.v1.message.create failed, "
+            f"code: {create_message_resp.code}, "
+            f"msg: {create_message_resp.msg}, "
+            f"log_id: {create_message_resp.get_log_id()}"
         )
+        response.code = create_message_resp.code
+        response.msg = create_message_resp.msg
+        return response
+
+    response.code = 0
+    response.msg = "success"
+    return response
 
-        if not create_message_resp.success():
-            lark.logger.error(
-                f"client.im.v1.message.create failed, "
-                f"code: {create_message_resp.code}, "
-                f"msg: {create_message_resp.msg}, "
-                f"log_id: {create_message_resp.get_log_id()}"
-            )
-            response = SendCardResponse()
-            response.code = create_message_resp.code
-            response.msg = create_message_resp.msg
-            response.create_message_response = create_message_resp.data
-            return response
 
+def sendCard(client: lark.Client, request: SendCardRequest) -> SendCardResponse:
+    try:
+        create_message_resp: CreateMessageResponse = client.im.v1.message.create(
+            _buildCreateMessageRequest(request)
+        )
+        return _buildSendCardResponse(create_message_resp)
+
+    except Exception as exc:
+        lark.logger.exception(f"sendCard failed with exception: {exc}")
         response = SendCardResponse()
-        response.code = 0
-        response.msg = "success"
-        response.create_message_response = create_message_resp.data
+        response.code = -1
+        response.msg = f"exception: {exc}"
+        return response
+
 
+# 异步发送（SDK 异步 HTTP 通道，共用 client 的 tenant_access_token 缓存）；
+# 请求构建失败（参数校验）返回 code=-2，与网络异常（code=-1）区分，调用方只对后者重试
+async def asendCard(client: lark.Client, request: SendCardRequest) -> SendCardResponse:
+    try:
+        create_message_req = _buildCreateMessageRequest(request)
+    except Exception as exc:
+        lark.logger.error(f"asendCard invalid request: {exc}")
+        response = SendCardResponse()
+        response.code = -2
+        response.msg = f"invalid request: {exc}"
         return response
 
+    try:
+        create_message_resp: CreateMessageResponse = (
+            await client.im.v1.message.acreate(create_message_req)
+        )
+        return _buildSendCardResponse(create_message_resp)
+
     except Exception as exc:
-        lark.logger.exception(f"sendCard failed with exception: {exc}")
+        lark.logger.exception(f"asendCard failed with exception: {exc}")
         response = SendCardResponse()
         response.code = -1
         response.msg = f"exception: {exc}"
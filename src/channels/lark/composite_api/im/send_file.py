@@ -2,18 +2,28 @@
 发送文件消息，使用到两个OpenAPI：
 1. [上传文件](https://open.feishu.cn/document/server-docs/im-v1/file/create)
 2. [发送消息](https://open.feishu.cn/document/server-docs/im-v1/message/create)
+同一文件内容上传过且 file_key 未过期时跳过上传
 """
 
+import os
 import lark_oapi as lark
 from lark_oapi.api.im.v1 import *
 
 from typing import Any, IO, Optional, TypedDict
 
+from src.channels.lark.composite_api.im.media_cache import (
+    getCachedMediaKey,
+    hashMediaContent,
+    invalidateMediaKey,
+    setCachedMediaKey,
+)
+
 
 class SendFileRequest(TypedDict):
     file_type: str | None  # 文件类型，必填
-    file_name: str | None  # 带后缀的文件名，必填
-    file: IO[Any] | None  # 文件内容，必填
+    file_name: str | None  # 带后缀的文件名，传 file_path 时可省略
+    file: IO[Any] | None  # 文件内容，与 file_path 二选一
+    file_path: str | None  # 文件路径，与 file 二选一，按需流式读取
     duration: int | None  # 文件的时长(ms)，选填
     receive_id_type: str | None  # 消息接收者ID类型，必填
     receive_id: str | None  # 消息接收者的ID，必填
@@ -27,63 +37,95 @@ class SendFileResponse(BaseResponse):
         self.create_message_response: Optional[CreateMessageResponseBody] = None
 
 
+def _createFileMessage(
+    client: lark.Client,
+    request: SendFileRequest,
+    create_file_resp_data: CreateFileResponseBody,
+    log_id: str | None,
+) -> CreateMessageResponse:
+    create_message_req = (
+        CreateMessageRequest.builder()
+        .receive_id_type(request.get("receive_id_type"))
+        .request_body(
+            CreateMessageRequestBody.builder()
+            .receive_id(request.get("receive_id"))
+            .msg_type("file")
+            .content(lark.JSON.marshal(create_file_resp_data))
+            .uuid(request.get("uuid"))
+            .build()
+        )
+        .build()
+    )
+    if log_id is None:
+        return client.im.v1.message.create(create_message_req)
+    option = lark.RequestOption.builder().headers({"X-Tt-Logid": log_id}).build()
+    return client.im.v1.message.create(create_message_req, option)
+
+
 # 发送文件消息
 def sendFile(client: lark.Client, request: SendFileRequest) -> SendFileResponse:
+    file_handle = None
     try:
-        # 上传文件
-        create_file_req = (
-            CreateFileRequest.builder()
-            .request_body(
-                CreateFileRequestBody.builder()
-                .file_type(request.get("file_type"))
-                .file_name(request.get("file_name"))
-                .duration(request.get("duration"))
-                .file(request.get("file"))
-                .build()
-            )
-            .build()
-        )
+        file = request.get("file")
+        file_name = request.get("file_name")
+        if file is None and request.get("file_path"):
+            # 以文件句柄交给 SDK，不整体读入内存
+            file_handle = open(request.get("file_path"), "rb")
+            file = file_handle
+            file_name = file_name or os.path.basename(request.get("file_path"))
+        cache_key = ("file", request.get("file_type"), hashMediaContent(file))
 
-        create_file_resp = client.im.v1.file.create(create_file_req)
+        for attempt in range(2):
+            file_key = getCachedMediaKey(cache_key)
+            from_cache = file_key is not None
+            log_id = None
+            if from_cache:
+                create_file_resp_data = CreateFileResponseBody({"file_key": file_key})
+            else:
+                # 上传文件
+                create_file_req = (
+                    CreateFileRequest.builder()
+                    .request_body(
+                        CreateFileRequestBody.builder()
+                        .file_type(request.get("file_type"))
+                        .file_name(file_name)
+                        .duration(request.get("duration"))
+                        .file(file)
+                        .build()
+                    )
+                    .build()
+                )
 
-        if not create_file_resp.success():
-            lark.logger.error(
-                f"client.im.v1.file.create failed, "
-                f"code: {create_file_resp.code}, "
-                f"msg: {create_file_resp.msg}, "
-                f"log_id: {create_file_resp.get_log_id()}"
-            )
-            response = SendFileResponse()
-            response.code = create_file_resp.code
-            response.msg = create_file_resp.msg
-            response.create_file_response = create_file_resp.data
-            return response
+                create_file_resp = client.im.v1.file.create(create_file_req)
 
-        # 发送消息
-        option = (
-            lark.RequestOption.builder()
-            .headers({"X-Tt-Logid": create_file_resp.get_log_id()})
-            .build()
-        )
-        create_message_req = (
-            CreateMessageRequest.builder()
-            .receive_id_type(request.get("receive_id_type"))
-            .request_body(
-                CreateMessageRequestBody.builder()
-                .receive_id(request.get("receive_id"))
-                .msg_type("file")
-                .content(lark.JSON.marshal(create_file_resp.data))
-                .uuid(request.get("uuid"))
-                .build()
-            )
-            .build()
-        )
+                if not create_file_resp.success():
+                    lark.logger.error(
+                        f"client.im.v1.file.create failed, "
+                        f"code: {create_file_resp.code}, "
+                        f"msg: {create_file_resp.msg}, "
+                        f"log_id: {create_file_resp.get_log_id()}"
+                    )
+                    response = SendFileResponse()
+                    response.code = create_file_resp.code
+                    response.msg = create_file_resp.msg
+                    response.create_file_response = create_file_resp.data
+                    return response
 
-        create_message_resp: CreateMessageResponse = client.im.v1.message.create(
-            create_message_req, option
-        )
+                create_file_resp_data = create_file_resp.data
+                log_id = create_file_resp.get_log_id()
+                setCachedMediaKey(cache_key, create_file_resp_data.file_key)
+
+            # 发送消息
+            create_message_resp = _createFileMessage(
+                client, request, create_file_resp_data, log_id
+            )
+            if create_message_resp.success():
+                break
+            # 缓存的 file_key 可能已失效：清除后重新上传一次
+            if from_cache and attempt == 0:
+                invalidateMediaKey(cache_key)
+                continue
 
-        if not create_message_resp.success():
             lark.logger.error(
                 f"client.im.v1.message.create failed, "
                 f"code: {create_message_resp.code}, "
@@ -93,7 +135,7 @@ def sendFile(client: lark.Client, request: SendFileRequest) -> SendFileResponse:
             response = SendFileResponse()
             response.code = create_message_resp.code
             response.msg = create_message_resp.msg
-            response.create_file_response = create_file_resp.data
+            response.create_file_response = create_file_resp_data
             response.create_message_response = create_message_resp.data
             return response
 
@@ -101,7 +143,7 @@ def sendFile(client: lark.Client, request: SendFileRequest) -> SendFileResponse:
         response = SendFileResponse()
         response.code = 0
         response.msg = "success"
-        response.create_file_response = create_file_resp.data
+        response.create_file_response = create_file_resp_data
         response.create_message_response = create_message_resp.data
         return response
     except Exception as exc:
@@ -110,3 +152,6 @@ def sendFile(client: lark.Client, request: SendFileRequest) -> SendFileResponse:
         response.code = -1
         response.msg = f"exception: {exc}"
         return response
+    finally:
+        if file_handle is not None:
+            file_handle.close()
@@ -2,15 +2,24 @@
 发送图片消息，使用到两个OpenAPI：
 1. [上传图片](https://open.feishu.cn/document/server-docs/im-v1/image/create)
 2. [发送消息](https://open.feishu.cn/document/server-docs/im-v1/message/create)
+同一图片内容上传过且 image_key 未过期时跳过上传
 """
 
 import lark_oapi as lark
 from lark_oapi.api.im.v1 import *
 from typing import Any, IO, Optional, TypedDict
 
+from src.channels.lark.composite_api.im.media_cache import (
+    getCachedMediaKey,
+    hashMediaContent,
+    invalidateMediaKey,
+    setCachedMediaKey,
+)
+
 
 class SendImageRequest(TypedDict):
-    image: IO[Any] | None = None  # 图片，必填
+    image: IO[Any] | None = None  # 图片，与 image_path 二选一
+    image_path: str | None = None  # 图片路径，与 image 二选一，按需流式读取
     receive_id_type: str | None = None  # 消息接收者ID类型，必填
     receive_id: str | None = None  # 消息接收者的ID，必填
     uuid: str | None = None  # 消息uuid，选填
@@ -23,61 +32,93 @@ class SendImageResponse(BaseResponse):
         self.create_message_response: Optional[CreateMessageResponseBody] = None
 
 
+def _createImageMessage(
+    client: lark.Client,
+    request: SendImageRequest,
+    create_image_resp_data: CreateImageResponseBody,
+    log_id: str | None,
+) -> CreateMessageResponse:
+    create_message_req = (
+        CreateMessageRequest.builder()
+        .receive_id_type(request.get("receive_id_type"))
+        .request_body(
+            CreateMessageRequestBody.builder()
+            .receive_id(request.get("receive_id"))
+            .msg_type("image")
+            .content(lark.JSON.marshal(create_image_resp_data))
+            .uuid(request.get("uuid"))
+            .build()
+        )
+        .build()
+    )
+    if log_id is None:
+        return client.im.v1.message.create(create_message_req)
+    option = lark.RequestOption.builder().headers({"X-Tt-Logid": log_id}).build()
+    return client.im.v1.message.create(create_message_req, option)
+
+
 # 发送图片消息
 def sendImage(client: lark.Client, request: SendImageRequest) -> SendImageResponse:
+    image_file = None
     try:
-        # 上传图片
-        create_image_req = (
-            CreateImageRequest.builder()
-            .request_body(
-                CreateImageRequestBody.builder()
-                .image_type("message")
-                .image(request.get("image"))
-                .build()
-            )
-            .build()
-        )
+        image = request.get("image")
+        if image is None and request.get("image_path"):
+            # 以文件句柄交给 SDK，不整体读入内存
+            image_file = open(request.get("image_path"), "rb")
+            image = image_file
+        cache_key = ("image", hashMediaContent(image))
 
-        create_image_resp = client.im.v1.image.create(create_image_req)
+        for attempt in range(2):
+            image_key = getCachedMediaKey(cache_key)
+            from_cache = image_key is not None
+            log_id = None
+            if from_cache:
+                create_image_resp_data = CreateImageResponseBody(
+                    {"image_key": image_key}
+                )
+            else:
+                # 上传图片
+                create_image_req = (
+                    CreateImageRequest.builder()
+                    .request_body(
+                        CreateImageRequestBody.builder()
+                        .image_type("message")
+                        .image(image)
+                        .build()
+                    )
+                    .build()
+                )
 
-        if not create_image_resp.success():
-            lark.logger.error(
-                f"client.im.v1.image.create failed, "
-                f"code: {create_image_resp.code}, "
-                f"msg: {create_image_resp.msg}, "
-                f"log_id: {create_image_resp.get_log_id()}"
-            )
-            response = SendImageResponse()
-            response.code = create_image_resp.code
-            response.msg = create_image_resp.msg
-            response.create_image_response = create_image_resp.data
-            return response
+                create_image_resp = client.im.v1.image.create(create_image_req)
 
-        # 发送消息
-        option = (
-            lark.RequestOption.builder()
-            .headers({"X-Tt-Logid": create_image_resp.get_log_id()})
-            .build()
-        )
-        create_message_req = (
-            CreateMessageRequest.builder()
-            .receive_id_type(request.get("receive_id_type"))
-            .request_body(
-                CreateMessageRequestBody.builder()
-                .receive_id(request.get("receive_id"))
-                .msg_type("image")
-                .content(lark.JSON.marshal(create_image_resp.data))
-                .uuid(request.get("uuid"))
-                .build()
-            )
-            .build()
-        )
+                if not create_image_resp.success():
+                    lark.logger.error(
+                        f"client.im.v1.image.create failed, "
+                        f"code: {create_image_resp.code}, "
+                        f"msg: {create_image_resp.msg}, "
+                        f"log_id: {create_image_resp.get_log_id()}"
+                    )
+                    response = SendImageResponse()
+                    response.code = create_image_resp.code
+                    response.msg = create_image_resp.msg
+                    response.create_image_response = create_image_resp.data
+                    return response
 
-        create_message_resp: CreateMessageResponse = client.im.v1.message.create(
-            create_message_req, option
-        )
+                create_image_resp_data = create_image_resp.data
+                log_id = create_image_resp.get_log_id()
+                setCachedMediaKey(cache_key, create_image_resp_data.image_key)
+
+            # 发送消息
+            create_message_resp = _createImageMessage(
+                client, request, create_image_resp_data, log_id
+            )
+            if create_message_resp.success():
+                break
+            # 缓存的 image_key 可能已失效：清除后重新上传一次
+            if from_cache and attempt == 0:
+                invalidateMediaKey(cache_key)
+                continue
 
-        if not create_message_resp.success():
             lark.logger.error(
                 f"client.im.v1.message.create failed, "
                 f"code: {create_message_resp.code}, "
@@ -87,7 +128,7 @@ def sendImage(client: lark.Client, request: SendImageRequest) -> SendImageRespon
             response = SendImageResponse()
             response.code = create_message_resp.code
             response.msg = create_message_resp.msg
-            response.create_image_response = create_image_resp.data
+            response.create_image_response = create_image_resp_data
             response.create_message_response = create_message_resp.data
             return response
 
@@ -95,7 +136,7 @@ def sendImage(client: lark.Client, request: SendImageRequest) -> SendImageRespon
         response = SendImageResponse()
         response.code = 0
         response.msg = "success"
-        response.create_image_response = create_image_resp.data
+        response.create_image_response = create_image_resp_data
         response.create_message_response = create_message_resp.data
         return response
     except Exception as exc:
@@ -104,3 +145,6 @@ def sendImage(client: lark.Client, request: SendImageRequest) -> SendImageRespon
         response.code = -1
         response.msg = f"exception: {exc}"
         return response
+    finally:
+        if image_file is not None:
+            image_file.close()
@@ -21,48 +21,79 @@ class SendTextResponse(BaseResponse):
         self.create_message_response: Optional[CreateMessageResponseBody] = None
 
 
-def sendText(client: lark.Client, request: SendTextRequest) -> SendTextResponse:
-    try:
-        create_message_req = (
-            CreateMessageRequest.builder()
-            .receive_id_type(request.get("receive_id_type"))
-            .request_body(
-                CreateMessageRequestBody.builder()
-                .receive_id(request.get("receive_id"))
-                .msg_type("text")
-                .content(lark.JSON.marshal({"text": request.get("text")}))
-                .uuid(request.get("uuid"))
-                .build()
-            )
+def _buildCreateMessageRequest(request: SendTextRequest) -> CreateMessageRequest:
+    return (
+        CreateMessageRequest.builder()
+        .receive_id_type(request.get("receive_id_type"))
+        .request_body(
+            CreateMessageRequestBody.builder()
+            .receive_id(request.get("receive_id"))
+            .msg_type("text")
+            .content(lark.JSON.marshal({"text": request.get("text")}))
+            .uuid(request.get("uuid"))
             .build()
         )
+        .build()
+    )
 
-        create_message_resp: CreateMessageResponse = client.im.v1.message.create(
-            create_message_req
+
+def _buildSendTextResponse(
+    create_message_resp: CreateMessageResponse,
+) -> SendTextResponse:
+    response = SendTextResponse()
+    response.raw = create_message_resp.raw
+    response.create_message_response = create_message_resp.data
+    if not create_message_resp.success():
+        lark.logger.error(
+            f"client.im.v1.message.create failed, "
+            f"code: {create_message_resp.code}, "
+            f"msg: {create_message_resp.msg}, "
+            f"log_id: {create_message_resp.get_log_id()}"
         )
+        response.code = create_message_resp.code
+        response.msg = create_message_resp.msg
+        return response
+
+    response.code = 0
+    response.msg = "success"
+    return response
 
-        if not create_message_resp.success():
-            lark.logger.error(
-                f"client.im.v1.message.create failed, "
-                f"code: {create_message_resp.code}, "
-                f"msg: {create_message_resp.msg}, "
-                f"log_id: {create_message_resp.get_log_id()}"
-            )
-            response = SendTextResponse()
-            response.code = create_message_resp.code
-            response.msg = create_message_resp.msg
-            response.create_message_response = create_message_resp.data
-            return response
 
+def sendText(client: lark.Client, request: SendTextRequest) -> SendTextResponse:
+    try:
+        create_message_resp: CreateMessageResponse = client.im.v1.message.create(
+            _buildCreateMessageRequest(request)
+        )
+        return _buildSendTextResponse(create_message_resp)
+
+    except Exception as exc:
+        lark.logger.exception(f"sendText failed with exception: {exc}")
         response = SendTextResponse()
-        response.code = 0
-        response.msg = "success"
-        response.create_message_response = create_message_resp.data
+        response.code = -1
+        response.msg = f"exception: {exc}"
+        return response
+
 
+# 异步发送（SDK 异步 HTTP 通道，共用 client 的 tenant_access_token 缓存）；
+# 请求构建失败（参数校验）返回 code=-2，与网络异常（code=-1）区分，调用方只对后者重试
+async def asendText(client: lark.Client, request: SendTextRequest) -> SendTextResponse:
+    try:
+        create_message_req = _buildCreateMessageRequest(request)
+    except Exception as exc:
+        lark.logger.error(f"asendText invalid request: {exc}")
+        response = SendTextResponse()
+        response.code = -2
+        response.msg = f"invalid request: {exc}"
         return response
 
+    try:
+        create_message_resp: CreateMessageResponse = (
+            await client.im.v1.message.acreate(create_message_req)
+        )
+        return _buildSendTextResponse(create_message_resp)
+
     except Exception as exc:
-        lark.logger.exception(f"sendText failed with exception: {exc}")
+        lark.logger.exception(f"asendText failed with exception: {exc}")
         response = SendTextResponse()
         response.code = -1
         response.msg = f"exception: {exc}"
@@ -1,9 +1,10 @@
 import asyncio
+import heapq
 import logging
 import os
 import threading
 import time
-from typing import Any, List
+from typing import Awaitable, Callable, List
 
 from psycopg import OperationalError
 
@@ -11,6 +12,7 @@ from src.agents.graphs.ConversationGraph.graph import (
     getConversationGraph,
     rebuildConversationGraph,
 )
+from src.agents.graphs.ConversationGraph.nodes import speculateConversationRecall
 from src.agents.graphs.ConversationGraph.state import ConversationGraphOutput
 from src.channels.lark.integration.utils import (
     sendCard2OpenId,
@@ -30,8 +32,10 @@ logger = logging.getLogger(__name__)
 _active_fr_by_open_id: dict[str, int] = {}
 # 每个用户待处理的消息队列
 _pending_messages_by_open_id: dict[str, list[str]] = {}
-# 每个用户的计时器
-_flush_timer_by_open_id: dict[str, threading.Timer] = {}
+# 每个用户当前的批处理截止时间（time.monotonic），用于防抖
+_flush_deadline_by_open_id: dict[str, float] = {}
+# 截止时间小顶堆 (deadline, open_id)，过期项惰性删除；由单一调度协程统一触发，不再每条消息一个线程
+_flush_heap: list[tuple[float, str]] = []
 # 全局状态锁
 _state_lock = threading.Lock()
 # 为了防止飞书 SDK 问题导致重复接收消息，暂存已接收的消息和接收时间戳
@@ -81,15 +85,6 @@ def _getOrCreateAsyncLoop() -> asyncio.AbstractEventLoop:
         return _async_loop
 
 
-def _runAsync(coro: Any, timeout_seconds: int = 120) -> Any:
-    """
-    在单一异步事件循环中运行异步任务
-    """
-    loop = _getOrCreateAsyncLoop()
-    future = asyncio.run_coroutine_threadsafe(coro, loop)
-    return future.result(timeout=timeout_seconds)
-
-
 def _isClosedCheckpointerConnectionError(error: Exception) -> bool:
     """
     只对已知的 PostgreSQL 连接失效场景做一次自愈重试。
@@ -100,10 +95,14 @@ def _isClosedCheckpointerConnectionError(error: Exception) -> bool:
 
 
 async def processMessages(
-    user_id: int, fr_id: int, messages: list[str]
+    user_id: int,
+    fr_id: int,
+    messages: list[str],
+    on_message: Callable[[str], Awaitable[None]] | None = None,
 ) -> tuple[List[str], str]:
     """
     调用 ConversationGraph，批量处理本批次消息
+    on_message：流式模式下每生成一条完整消息即回调（按生成顺序）
     """
     session_start = time.perf_counter()
     logger.info(f"开始处理本批次消息：{messages}")
@@ -116,20 +115,48 @@ async def processMessages(
             "messages_received": messages,
         },
     }
+
+    # 本次调用已流式推送的消息，重试时据此避免重复回复
+    streamed_messages: list[str] = []
+
+    async def _run(graph) -> ConversationGraphOutput:
+        if on_message is None:
+            return await graph.ainvoke(state, config=short_term_memory_config)
+        final_state: ConversationGraphOutput = {}
+        async for mode, chunk in graph.astream(
+            state,
+            config=short_term_memory_config,
+            stream_mode=["custom", "values"],
+        ):
+            if mode == "custom":
+                message = (chunk or {}).get("message_to_send")
+                if isinstance(message, str):
+                    streamed_messages.append(message)
+                    await on_message(message)
+            elif mode == "values":
+                final_state = chunk
+        return final_state
+
     graph = await getConversationGraph()
     try:
-        response: ConversationGraphOutput = await graph.ainvoke(
-            state, config=short_term_memory_config
-        )
+        response = await _run(graph)
     except OperationalError as error:
         if not _isClosedCheckpointerConnectionError(error):
             raise
+        if streamed_messages:
+            # 已有消息推送给用户：重跑会重复发送并生成另一份回复，只重建 graph 供后续批次使用
+            logger.warning(
+                "ConversationGraph checkpointer connection closed after streaming, rebuilding graph without retry",
+                exc_info=True,
+            )
+            await rebuildConversationGraph()
+            return (list(streamed_messages), "")
         logger.warning(
             "ConversationGraph checkpointer connection closed, rebuilding graph and retrying once",
             exc_info=True,
         )
         graph = await rebuildConversationGraph()
-        response = await graph.ainvoke(state, config=short_term_memory_config)
+        response = await _run(graph)
 
     logger.info(f"处理完成，耗时：{time.perf_counter() - session_start}s")
     llm_output = response.get("llm_output", {})
@@ -138,29 +165,36 @@ async def processMessages(
     return (messages_to_send, reasoning_content)
 
 
-def _cancelFlushTimerLocked(open_id: str) -> None:
+def _cancelFlushLocked(open_id: str) -> None:
     """
-    取消当前计时并删除 open_id 对应的计时器
+    取消 open_id 当前的批处理计时（需持有 _state_lock；堆中旧项由调度协程惰性丢弃）
     """
-    timer = _flush_timer_by_open_id.get(open_id)
-    if timer and timer.is_alive():
-        timer.cancel()
-    _flush_timer_by_open_id.pop(open_id, None)
+    _flush_deadline_by_open_id.pop(open_id, None)
 
 
-def _sendBatchMessages(open_id: str) -> None:
+# 说明：
+# - 防抖调度：所有用户共用一个调度协程 + 截止时间堆，替代每条消息一个 threading.Timer
+# - 批处理：按 fr_id 路由到固定 worker 队列，同一 FR 的批次严格按顺序处理，不同 FR 并发处理
+# - ConversationGraph 的异步 checkpointer 与异步数据库连接池都绑定在同一后台 loop 上，
+#   因此 worker 为该 loop 上的协程，同步数据库查询放到线程池执行；飞书发送只入队，由发送管道异步送达
+
+# 调度协程唤醒事件（仅在后台 loop 中使用）
+_flush_wakeup: asyncio.Event | None = None
+# 每个 worker 一个队列
+_worker_queues: list[asyncio.Queue] = []
+# 调度协程与 worker 是否已启动
+_dispatcher_started = False
+# 持有调度协程与 worker 任务引用，避免被 GC 提前回收
+_dispatcher_tasks: set[asyncio.Task] = set()
+# 每个用户进行中的投机召回 task（仅在后台 loop 中访问）
+_speculative_task_by_open_id: dict[str, asyncio.Task] = {}
+
+
+async def _processBatch(open_id: str, fr_id: int | None, messages: list[str]) -> None:
     """
-    异步调用 processMessages 处理本批次消息
+    处理某个用户的一个批次消息，并发送回复
     """
-    with _state_lock:
-        messages_to_process = _pending_messages_by_open_id.pop(open_id, [])
-        # 删除当前计时器
-        _flush_timer_by_open_id.pop(open_id, None)
-
-    if not messages_to_process:
-        return
-
-    user_id = getUserIdByOpenId(open_id).get("user_id")
+    user_id = (await asyncio.to_thread(getUserIdByOpenId, open_id)).get("user_id")
     if user_id is None:
         sendCard2OpenId(
             open_id=open_id,
@@ -170,8 +204,6 @@ def _sendBatchMessages(open_id: str) -> None:
         )
         return
 
-    with _state_lock:
-        fr_id = _active_fr_by_open_id.get(open_id)
     if fr_id is None:
         sendCard2OpenId(
             open_id=open_id,
@@ -181,7 +213,9 @@ def _sendBatchMessages(open_id: str) -> None:
         )
         return
 
-    if not ifFRBelongsToUser(user_id, fr_id).get("is_belong"):
+    if not (await asyncio.to_thread(ifFRBelongsToUser, user_id, fr_id)).get(
+        "is_belong"
+    ):
         with _state_lock:
             _active_fr_by_open_id.pop(open_id, None)
         sendCard2OpenId(
@@ -192,13 +226,25 @@ def _sendBatchMessages(open_id: str) -> None:
         )
         return
 
+    # 流式推送：每生成一条完整消息立即发送，不等待整轮生成结束
+    sent_count = 0
+
+    async def _sendStreamedMessage(msg: str) -> None:
+        nonlocal sent_count
+        sent_count += 1
+        msg = msg.strip()
+        if msg != "":
+            sendText2OpenId(open_id, msg)
+
     try:
-        messages_to_send, _ = _runAsync(
+        messages_to_send, _ = await asyncio.wait_for(
             processMessages(
                 user_id=user_id,
                 fr_id=fr_id,
-                messages=messages_to_process,
-            )
+                messages=messages,
+                on_message=_sendStreamedMessage,
+            ),
+            timeout=int(os.getenv("CONVERSATION_TIMEOUT_SECONDS") or 120),
         )
     except Exception as e:
         logger.warning(f"Fail to process messages in batch: {e}", exc_info=True)
@@ -210,28 +256,147 @@ def _sendBatchMessages(open_id: str) -> None:
         )
         return
 
-    for msg in messages_to_send:
+    # 非流式生成（或流式回退）的消息在结束后统一发送，已流式发送的跳过
+    for msg in messages_to_send[sent_count:]:
         msg = msg.strip()
         if msg is not None and msg != "":
             sendText2OpenId(open_id, msg)
 
 
+async def _conversationWorker(queue: asyncio.Queue) -> None:
+    """
+    worker：顺序消费自身队列中的批次
+    """
+    while True:
+        open_id, fr_id, messages = await queue.get()
+        try:
+            await _processBatch(open_id, fr_id, messages)
+        except Exception as e:
+            logger.warning(f"Conversation worker failed: {e}", exc_info=True)
+        finally:
+            queue.task_done()
+
+
+def _dispatchBatch(open_id: str) -> None:
+    """
+    取出 open_id 的待处理消息，按 fr_id 路由到对应 worker 队列（在后台 loop 中调用）
+    """
+    with _state_lock:
+        messages_to_process = _pending_messages_by_open_id.pop(open_id, [])
+        fr_id = _active_fr_by_open_id.get(open_id)
+    if not messages_to_process:
+        return
+    # 同一 FR 始终进入同一队列，保证顺序；未激活 FR 的提示按 open_id 分散
+    route_key = fr_id if fr_id is not None else hash(open_id)
+    queue = _worker_queues[route_key % len(_worker_queues)]
+    queue.put_nowait((open_id, fr_id, messages_to_process))
+
+
+async def _flushScheduler() -> None:
+    """
+    防抖调度协程：等待最近的截止时间，到期后分发批次
+    """
+    while True:
+        due_open_ids = []
+        with _state_lock:
+            now = time.monotonic()
+            while _flush_heap and _flush_heap[0][0] <= now:
+                deadline, open_id = heapq.heappop(_flush_heap)
+                # 截止时间已被刷新或取消的旧项直接丢弃
+                if _flush_deadline_by_open_id.get(open_id) == deadline:
+                    _flush_deadline_by_open_id.pop(open_id, None)
+                    due_open_ids.append(open_id)
+            timeout = _flush_heap[0][0] - now if _flush_heap else None
+            _flush_wakeup.clear()
+
+        for open_id in due_open_ids:
+            _dispatchBatch(open_id)
+
+        try:
+            await asyncio.wait_for(_flush_wakeup.wait(), timeout=timeout)
+        except asyncio.TimeoutError:
+            pass
+
+
+async def _startDispatcher() -> None:
+    global _flush_wakeup, _worker_queues
+    _flush_wakeup = asyncio.Event()
+    worker_count = max(1, int(os.getenv("CONVERSATION_WORKERS") or 4))
+    _worker_queues = [asyncio.Queue() for _ in range(worker_count)]
+    loop = asyncio.get_running_loop()
+    for coro in [
+        _flushScheduler(),
+        *[_conversationWorker(queue) for queue in _worker_queues],
+    ]:
+        task = loop.create_task(coro)
+        _dispatcher_tasks.add(task)
+        task.add_done_callback(_dispatcher_tasks.discard)
+    logger.info(f"Conversation dispatcher started with {worker_count} workers")
+
+
+def _ensureDispatcherStarted() -> asyncio.AbstractEventLoop:
+    """
+    在后台 loop 中启动调度协程与 worker（仅一次）
+    """
+    global _dispatcher_started
+    loop = _getOrCreateAsyncLoop()
+    with _async_loop_lock:
+        if not _dispatcher_started:
+            asyncio.run_coroutine_threadsafe(_startDispatcher(), loop).result()
+            _dispatcher_started = True
+    return loop
+
+
+async def _speculativeRecall(open_id: str) -> None:
+    """
+    防抖窗口内按已收到的消息提前召回，flush 时 nodeRecallFeedsFromDB 直接命中
+    """
+    # 连续发消息时只对停顿后的消息前缀召回，中间前缀的 task 会被新消息取消
+    await asyncio.sleep(int(os.getenv("SPECULATIVE_RECALL_DELAY_MS") or 500) / 1000)
+    with _state_lock:
+        messages = list(_pending_messages_by_open_id.get(open_id, []))
+        fr_id = _active_fr_by_open_id.get(open_id)
+    if not messages or fr_id is None:
+        return
+    user_id = (await asyncio.to_thread(getUserIdByOpenId, open_id)).get("user_id")
+    if user_id is None:
+        return
+    await speculateConversationRecall(user_id, fr_id, messages)
+
+
+def _startSpeculativeRecall(open_id: str) -> None:
+    """
+    新消息到达时重启 open_id 的投机召回（在后台 loop 中调用）
+    """
+    if (os.getenv("SPECULATIVE_RECALL") or "true").lower() != "true":
+        return
+    previous_task = _speculative_task_by_open_id.pop(open_id, None)
+    if previous_task is not None and not previous_task.done():
+        previous_task.cancel()
+    task = asyncio.get_running_loop().create_task(_speculativeRecall(open_id))
+    _speculative_task_by_open_id[open_id] = task
+
+    def _onDone(done_task: asyncio.Task) -> None:
+        if _speculative_task_by_open_id.get(open_id) is done_task:
+            _speculative_task_by_open_id.pop(open_id, None)
+        if not done_task.cancelled() and done_task.exception() is not None:
+            logger.warning(f"Speculative recall failed: {done_task.exception()}")
+
+    task.add_done_callback(_onDone)
+
+
 def _scheduleFlush(open_id: str) -> None:
     """
-    重置计时器
+    重置 open_id 的批处理截止时间
     """
+    loop = _ensureDispatcherStarted()
     waiting_seconds = int(os.getenv("WAITING_SECONDS_FOR_CONVERSATION") or "15")
     with _state_lock:
-        # 删除 open_id 对应的计时器，重新创建一个新的
-        _cancelFlushTimerLocked(open_id)
-        flush_timer = threading.Timer(
-            waiting_seconds,
-            _sendBatchMessages,
-            args=(open_id,),
-        )
-        flush_timer.daemon = True  # 设为守护线程，主线程退出时自动结束
-        _flush_timer_by_open_id[open_id] = flush_timer
-        flush_timer.start()
+        deadline = time.monotonic() + waiting_seconds
+        _flush_deadline_by_open_id[open_id] = deadline
+        heapq.heappush(_flush_heap, (deadline, open_id))
+    loop.call_soon_threadsafe(_flush_wakeup.set)
+    loop.call_soon_threadsafe(_startSpeculativeRecall, open_id)
 
 
 def filterDuplicatedMessage(message: str, open_id: str) -> bool:
@@ -361,7 +526,15 @@ def messageHandler(message: str, open_id: str) -> None:
         return
 
     # 只入队不立即处理：最后一条消息后等待 WAITING_SECONDS 秒再批量处理
+    max_pending_messages = int(os.getenv("MAX_PENDING_MESSAGES_PER_USER") or 50)
     with _state_lock:
         buffered_messages = _pending_messages_by_open_id.setdefault(open_id, [])
         buffered_messages.append(message)
+        # 每个用户的待处理队列有上限，超出时丢弃最早的消息
+        if len(buffered_messages) > max_pending_messages:
+            dropped_count = len(buffered_messages) - max_pending_messages
+            del buffered_messages[:dropped_count]
+            logger.warning(
+                f"Pending messages exceed limit, drop {dropped_count} oldest, open_id={open_id}"
+            )
     _scheduleFlush(open_id)
@@ -1,16 +1,17 @@
 import asyncio
+import hashlib
 import logging
 import re
-import time
 from typing import Literal
 
-from src.agents.graphs.FRBuildingGraph.graph import getFRBuildingGraph
 from src.channels.lark.integration.utils import sendCard2OpenId
+from src.database.enums import JobType
 from src.services.figure_and_relation import (
     getAllFigureAndRelations,
     getFRAllContext,
     getFigureAndRelation,
 )
+from src.services.job import enqueueJob
 from src.services.user import getUserIdByOpenId
 from src.utils.index import stringifyValue
 
@@ -145,8 +146,8 @@ def switchFRLark(open_id: str, fr_id: int) -> None:
         lark_integration._active_fr_by_open_id[open_id] = fr_id
         # 清空待处理的消息队列
         lark_integration._pending_messages_by_open_id.pop(open_id, None)
-        # 取消计时器
-        lark_integration._cancelFlushTimerLocked(open_id)
+        # 取消批处理计时
+        lark_integration._cancelFlushLocked(open_id)
     logger.info(f"Successfully switch FR to {figure_name}")
     sendCard2OpenId(
         open_id=open_id,
@@ -165,7 +166,7 @@ def clearCurrentRelationChainLark(open_id: str) -> None:
     with lark_integration._state_lock:
         lark_integration._active_fr_by_open_id.pop(open_id, None)
         lark_integration._pending_messages_by_open_id.pop(open_id, None)
-        lark_integration._cancelFlushTimerLocked(open_id)
+        lark_integration._cancelFlushLocked(open_id)
     logger.info(f"Successfully clear FR for {open_id}")
     sendCard2OpenId(
         open_id=open_id,
@@ -298,76 +299,46 @@ def buildPersonaLark(open_id: str, fr_id: int, text: str) -> None:
 
     user_id = common_info.get("user_id")
     figure_name = common_info.get("figure_name")
+    # 提交到持久化任务队列，由 job worker 执行，服务重启后任务不丢失
+    res = enqueueJob(
+        user_id=user_id,
+        job_type=JobType.FR_BUILDING,
+        payload={
+            "raw_content": text,
+            "open_id": open_id,
+            "figure_name": figure_name,
+        },
+        fr_id=fr_id,
+        dedup_key=f"{JobType.FR_BUILDING.value}:{fr_id}:{hashlib.sha256(text.encode('utf-8')).hexdigest()}",
+    )
+    if res.get("status") != 200:
+        sendCard2OpenId(
+            open_id=open_id,
+            title="出错啦",
+            content="完善人物画像任务提交失败，请稍后重试",
+            theme="red",
+        )
+        return
+    if res.get("deduplicated"):
+        sendCard2OpenId(
+            open_id=open_id,
+            title="请稍后再试",
+            content=f"相同内容的 **{figure_name}** 画像完善任务（`#{res.get('job_id')}`）已在排队，无需重复提交",
+            theme="yellow",
+        )
+        return
+
+    queue_position = res.get("queue_position") or 0
     sendCard2OpenId(
         open_id=open_id,
         title="任务开始",
-        content=f"开始完善 **{figure_name}** 的人物画像，完成后会通知结果",
+        content=(
+            f"开始完善 **{figure_name}** 的人物画像（任务 `#{res.get('job_id')}`），完成后会通知结果"
+            + (f"\n\n前面还有 `{queue_position}` 个任务在排队" if queue_position else "")
+        ),
         theme="blue",
     )
 
-    async def _task() -> None:
-        """
-        完善人物画像任务
-        """
-        start_time = time.perf_counter()
-        try:
-            init_state = {
-                "request": {
-                    "user_id": user_id,
-                    "fr_id": fr_id,
-                    "raw_content": text,
-                    # "raw_images": [],
-                },
-            }
-            async with getFRBuildingGraph() as graph:
-                res = await graph.ainvoke(init_state)
-            end_time = time.perf_counter()
-
-            logger.info(f"Successfully build persona for {figure_name}")
-            sendCard2OpenId(
-                open_id=open_id,
-                title="人物画像完善成功",
-                content=f"已完成 **{figure_name}** 人物画像完善，耗时 `{end_time - start_time:.2f}s`",
-                theme="green",
-            )
-            # 发送完善报告
-            fr_building_report = res.get("fr_building_report")
-            if isinstance(fr_building_report, str):
-                report_text = fr_building_report.strip()
-                if report_text:
-                    sendCard2OpenId(
-                        open_id=open_id,
-                        title=f"{figure_name} 画像完善报告",
-                        content=report_text,
-                        theme="violet",
-                    )
-        except RuntimeError as rte:
-            if "FRBuildingGraph is running" not in str(rte):
-                raise rte
-            logger.warning("FRBuildingGraph is running, please wait until it finishes")
-            sendCard2OpenId(
-                open_id=open_id,
-                title="请稍后再试",
-                content="当前存在运行中人物画像完善任务，请等待完成后再试",
-                theme="yellow",
-            )
-            return
-        except Exception as e:
-            logger.warning(
-                f"Fail to build persona, open_id={open_id}, fr_id={fr_id}, err={e}",
-                exc_info=True,
-            )
-            sendCard2OpenId(
-                open_id=open_id,
-                title="出错啦",
-                content="完善人物画像失败，请稍后重试",
-                theme="red",
-            )
-            return
-
-    # 提交到后台异步 loop 执行，不阻塞当前消息处理链路
-    _submitBackgroundCoroutine(_task())
-
 
 menu = [
     {
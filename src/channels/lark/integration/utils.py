@@ -1,32 +1,246 @@
+import asyncio
 import logging
 import os
-from typing import Literal
+import random
+import threading
+import time
+import uuid
+from concurrent.futures import Future
+from typing import Any, Literal
 
 from src.channels.lark.client import larkClient
-from src.channels.lark.composite_api.im.send_card import sendCard
-from src.channels.lark.composite_api.im.send_text import SendTextRequest, sendText
+from src.channels.lark.composite_api.im.send_card import asendCard
+from src.channels.lark.composite_api.im.send_text import SendTextRequest, asendText
 
 
 _lark_client = larkClient()
 logger = logging.getLogger(__name__)
 
+# 说明：
+# - 出站消息统一进入后台 loop 上的发送管道，调用方入队后立即返回，不阻塞飞书事件线程与对话 worker
+# - 每个接收者一个队列、一个发送协程，保证同一用户的消息按入队顺序送达；不同用户并发发送
+# - 全局令牌桶匹配应用级 QPS 限制，同一接收者按单用户 QPS 限制间隔发送
+# - 429 / 5xx / 限频错误码 / 网络异常按指数退避 + 抖动重试，重试复用同一消息 uuid，飞书侧去重
+# - 使用 SDK 异步 HTTP 通道，全部请求共用同一 client，tenant_access_token 由 SDK 缓存复用
 
-def sendText2OpenId(open_id: str, text: str) -> None:
+# 飞书限频错误码
+_LARK_RATE_LIMIT_CODES = {99991400}
+
+# 发送管道事件循环
+_outbound_loop: asyncio.AbstractEventLoop | None = None
+# 发送管道事件循环锁
+_outbound_loop_lock = threading.Lock()
+# 每个接收者待发送的消息队列（仅在发送管道 loop 中访问）
+_outbound_queues: dict[str, asyncio.Queue] = {}
+# 持有发送协程引用，避免被 GC 提前回收
+_outbound_tasks: set[asyncio.Task] = set()
+# 全局令牌桶（仅在发送管道 loop 中创建和使用）
+_token_bucket: "_TokenBucket | None" = None
+
+
+class _TokenBucket:
     """
-    发送文本消息到飞书 openid
+    令牌桶：按 rate 匀速补充，最多积攒 capacity 个令牌
     """
-    response = sendText(
-        _lark_client,
-        SendTextRequest(
-            text=text,
-            receive_id_type="open_id",
-            receive_id=open_id,
-        ),
-    )
-    if getattr(response, "code", None) != 0:
-        logger.warning(
-            f"Fail to send text to open_id: {open_id}, code: {response.code}, msg: {response.msg}"
+
+    def __init__(self, rate: float, capacity: float) -> None:
+        self.rate = rate
+        self.capacity = capacity
+        self.tokens = capacity
+        self.updated_at = time.monotonic()
+        self.lock = asyncio.Lock()
+
+    async def acquire(self) -> None:
+        async with self.lock:
+            while True:
+                now = time.monotonic()
+                self.tokens = min(
+                    self.capacity, self.tokens + (now - self.updated_at) * self.rate
+                )
+                self.updated_at = now
+                if self.tokens >= 1:
+                    self.tokens -= 1
+                    return
+                await asyncio.sleep((1 - self.tokens) / self.rate)
+
+
+def _runLoop(loop: asyncio.AbstractEventLoop) -> None:
+    asyncio.set_event_loop(loop)
+    loop.run_forever()
+
+
+def _getOrCreateOutboundLoop() -> asyncio.AbstractEventLoop:
+    """
+    获取或创建发送管道事件循环
+    """
+    global _outbound_loop
+    with _outbound_loop_lock:
+        if _outbound_loop is not None and _outbound_loop.is_running():
+            return _outbound_loop
+
+        loop = asyncio.new_event_loop()
+        threading.Thread(
+            target=_runLoop,
+            args=(loop,),
+            name="lark-outbound-loop",
+            daemon=True,
+        ).start()
+        _outbound_loop = loop
+        return _outbound_loop
+
+
+def _retryAfterSeconds(response: Any) -> float | None:
+    """
+    判断发送结果是否可重试；可重试时返回服务端建议的等待秒数（无建议时为 0），否则返回 None
+    """
+    code = getattr(response, "code", None)
+    raw = getattr(response, "raw", None)
+    status_code = getattr(raw, "status_code", None)
+    if code == 0:
+        return None
+    # 网络异常等未拿到 HTTP 响应的情况；请求构建失败（code=-2）为确定性错误，不重试
+    if code == -1 and raw is None:
+        return 0
+    if status_code == 429 or code in _LARK_RATE_LIMIT_CODES:
+        headers = getattr(raw, "headers", None) or {}
+        reset = headers.get("x-ogw-ratelimit-reset") or headers.get(
+            "X-Ogw-Ratelimit-Reset"
+        )
+        try:
+            return float(reset) if reset else 0
+        except (TypeError, ValueError):
+            return 0
+    if isinstance(status_code, int) and status_code >= 500:
+        return 0
+    return None
+
+
+async def _sendWithRetry(open_id: str, kind: str, payload: dict[str, Any]) -> bool:
+    """
+    限流 + 重试发送单条消息
+    """
+    max_retries = int(os.getenv("LARK_SEND_MAX_RETRIES") or 3)
+    base_seconds = float(os.getenv("LARK_SEND_RETRY_BASE_SECONDS") or 0.5)
+    # 同一条消息的所有重试使用同一 uuid，避免超时重试导致重复消息
+    message_uuid = uuid.uuid4().hex
+    for attempt in range(max_retries + 1):
+        await _token_bucket.acquire()
+        if kind == "card":
+            response = await asendCard(
+                _lark_client,
+                {
+                    "receive_id_type": "open_id",
+                    "receive_id": open_id,
+                    "card_template_id": payload["card_template_id"],
+                    "card_variables": dict(payload["card_variables"]),
+                    "uuid": message_uuid,
+                },
+            )
+        else:
+            response = await asendText(
+                _lark_client,
+                SendTextRequest(
+                    text=payload["text"],
+                    receive_id_type="open_id",
+                    receive_id=open_id,
+                    uuid=message_uuid,
+                ),
+            )
+        if getattr(response, "code", None) == 0:
+            return True
+
+        retry_after = _retryAfterSeconds(response)
+        if retry_after is None or attempt >= max_retries:
+            logger.warning(
+                f"Fail to send {kind} to open_id: {open_id}, code: {response.code}, msg: {response.msg}"
+            )
+            return False
+        # 指数退避 + 全抖动，服务端给出重置时间时至少等到重置
+        delay = max(retry_after, random.uniform(0, base_seconds * 2**attempt))
+        logger.info(
+            f"Retry sending {kind} to open_id: {open_id} in {delay:.2f}s, code: {response.code}"
         )
+        await asyncio.sleep(delay)
+    return False
+
+
+async def _deliver(open_id: str, kind: str, payload: dict[str, Any]) -> bool:
+    """
+    发送单条消息；卡片发送失败时降级为文本
+    """
+    if await _sendWithRetry(open_id, kind, payload):
+        return True
+    if kind == "card":
+        return await _sendWithRetry(open_id, "text", {"text": payload["fallback_text"]})
+    return False
+
+
+async def _drainOutboundQueue(open_id: str, queue: asyncio.Queue) -> None:
+    """
+    顺序发送某个接收者的消息，队列清空后退出
+    """
+    per_user_qps = float(os.getenv("LARK_SEND_PER_USER_QPS") or 5)
+    min_interval = 1 / per_user_qps if per_user_qps > 0 else 0
+    last_sent_at = 0.0
+    while True:
+        # 队列判空与移除在同一次调度内完成，入队方不会遗漏
+        if queue.empty():
+            _outbound_queues.pop(open_id, None)
+            return
+        kind, payload, future = queue.get_nowait()
+        wait_seconds = last_sent_at + min_interval - time.monotonic()
+        if wait_seconds > 0:
+            await asyncio.sleep(wait_seconds)
+        try:
+            ok = await _deliver(open_id, kind, payload)
+        except Exception as e:
+            logger.warning(f"Fail to deliver {kind} to open_id: {open_id}: {e}")
+            ok = False
+        last_sent_at = time.monotonic()
+        if not future.done():
+            future.set_result(ok)
+
+
+def _enqueue(open_id: str, kind: str, payload: dict[str, Any], future: Future) -> None:
+    """
+    入队并按需启动接收者的发送协程（在发送管道 loop 中调用）
+    """
+    global _token_bucket
+    if _token_bucket is None:
+        qps = max(1.0, float(os.getenv("LARK_SEND_QPS") or 50))
+        _token_bucket = _TokenBucket(rate=qps, capacity=qps)
+
+    queue = _outbound_queues.get(open_id)
+    if queue is not None:
+        queue.put_nowait((kind, payload, future))
+        return
+    queue = asyncio.Queue()
+    queue.put_nowait((kind, payload, future))
+    _outbound_queues[open_id] = queue
+    task = asyncio.get_running_loop().create_task(_drainOutboundQueue(open_id, queue))
+    _outbound_tasks.add(task)
+    task.add_done_callback(_outbound_tasks.discard)
+
+
+def _submit(open_id: str, kind: str, payload: dict[str, Any]) -> "Future[bool]":
+    """
+    提交到发送管道，立即返回；future 在送达（或最终失败）后置为 True / False
+    """
+    future: "Future[bool]" = Future()
+    if _lark_client is None:
+        logger.warning("Lark client is not configured, message dropped")
+        future.set_result(False)
+        return future
+    loop = _getOrCreateOutboundLoop()
+    loop.call_soon_threadsafe(_enqueue, open_id, kind, payload, future)
+    return future
+
+
+def sendText2OpenId(open_id: str, text: str) -> "Future[bool]":
+    """
+    发送文本消息到飞书 openid（非阻塞，同一 openid 按调用顺序送达）
+    """
+    return _submit(open_id, "text", {"text": text})
 
 
 def sendCard2OpenId(
@@ -51,34 +265,29 @@ def sendCard2OpenId(
         ]
         | None
     ) = None,
-) -> None:
+) -> "Future[bool]":
     """
-    发送飞书卡片到飞书 openid
+    发送飞书卡片到飞书 openid（非阻塞，同一 openid 按调用顺序送达）
     """
+    fallback_text = f"『Immortality』{title}\n{content}"
     LARK_CARD_TEMPLATE_ID = os.getenv("LARK_CARD_TEMPLATE_ID")
     if not LARK_CARD_TEMPLATE_ID:
         logger.warning("LARK_CARD_TEMPLATE_ID is not set")
         # 降级到 sendText2OpenId
-        sendText2OpenId(open_id, f"『Immortality』{title}\n{content}")
-        return
+        return sendText2OpenId(open_id, fallback_text)
+    if not title or not content:
+        return sendText2OpenId(open_id, fallback_text)
 
-    response = sendCard(
-        _lark_client,
+    return _submit(
+        open_id,
+        "card",
         {
-            "receive_id_type": "open_id",
-            "receive_id": open_id,
             "card_template_id": LARK_CARD_TEMPLATE_ID,
             "card_variables": {
                 "title": title,
                 "content": content,
                 "theme": theme or "blue",
             },
+            "fallback_text": fallback_text,
         },
     )
-    if getattr(response, "code", None) != 0:
-        logger.warning(
-            f"Fail to send card to open_id: {open_id}, code: {response.code}, msg: {response.msg}"
-        )
-        # 降级到 sendText2OpenId
-        sendText2OpenId(open_id, f"『Immortality』{title}\n{content}")
-        return
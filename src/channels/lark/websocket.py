@@ -1,3 +1,4 @@
+import asyncio
 import json
 import logging
 import os
@@ -75,8 +76,31 @@ def startLarkService():
     启动 Lark 服务
     """
     # 延迟导入，避免环境变量未加载
-    from src.channels.lark.integration.index import messageHandler
+    from src.agents.prompt import warmupPrompts
+    from src.channels.lark.integration.index import (
+        _getOrCreateAsyncLoop,
+        messageHandler,
+    )
     from src.database.models import initDatabaseIfNeeded
+    from src.services.job_worker import runJobWorker
 
     initDatabaseIfNeeded()
+    # 预热 prompt 缓存，首轮对话无需等待远端拉取
+    asyncio.run(warmupPrompts())
+    # 内置 job worker：在 integration 后台 loop 上执行任务队列；也可关闭后单独运行 `immortality jobs worker`
+    if (os.getenv("JOB_WORKER_EMBEDDED") or "true").lower() != "false":
+        worker_future = asyncio.run_coroutine_threadsafe(
+            runJobWorker(), _getOrCreateAsyncLoop()
+        )
+
+        def _onWorkerDone(fut) -> None:
+            if fut.cancelled():
+                logger.warning("Embedded job worker cancelled")
+                return
+            try:
+                fut.result()
+            except Exception as e:
+                logger.error(f"Embedded job worker crashed: {e}", exc_info=True)
+
+        worker_future.add_done_callback(_onWorkerDone)
     startLarkWebSocketServer(messageHandler)
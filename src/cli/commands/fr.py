@@ -1,7 +1,6 @@
 from argparse import Namespace, ArgumentParser, Action, _SubParsersAction
 from typing import Callable
 import questionary
-import asyncio
 
 from src.cli.utils import (
     CLIError,
@@ -10,14 +9,18 @@ from src.cli.utils import (
     printServiceResInCLI,
     printTableInCLI,
 )
-from src.database.enums import FigureRole, Gender, MBTI, parseEnum
+from src.database.enums import FigureRole, Gender, JobType, MBTI, parseEnum
+from src.database.index import runWithAsyncDB
 from src.services.figure_and_relation import (
     addFigureAndRelation,
     getAllFigureAndRelations,
+    filterFRIdsNeedingCoreSync,
     getFRAllContext,
+    ifFRBelongsToUser,
     syncAllFeedsToFRCore,
     syncFeedsToFRCore,
 )
+from src.services.job import enqueueJob
 from src.utils.index import stringifyValue
 
 
@@ -77,7 +80,9 @@ def registerFRSubparser(
         "sync-feeds",
         help="Sync fine-grained feeds (personality / interaction style / procedural info / memory detail) to FR core fields",
     )
-    fr_sync_feeds_parser.usage = "immortality fr sync-feeds [--id <id>] [-h] [--json]"
+    fr_sync_feeds_parser.usage = (
+        "immortality fr sync-feeds [--id <id>] [--incremental] [--enqueue] [-h] [--json]"
+    )
     add_json(fr_sync_feeds_parser)
     fr_sync_feeds_parser.add_argument(
         "--id",
@@ -85,6 +90,16 @@ def registerFRSubparser(
         type=int,
         help="(Optional) FigureAndRelation ID, sync all FRs if omitted",
     )
+    fr_sync_feeds_parser.add_argument(
+        "--incremental",
+        action="store_true",
+        help="(Optional) Only re-sync dimensions whose feeds have changed since the last sync",
+    )
+    fr_sync_feeds_parser.add_argument(
+        "--enqueue",
+        action="store_true",
+        help="(Optional) Submit one background job per FR instead of syncing in foreground (run by `immortality jobs worker`)",
+    )
     fr_sync_feeds_parser.set_defaults(func=syncFeedsToFRCoreCLI)
 
 
@@ -282,7 +297,7 @@ def showFRCLI(args: Namespace) -> int:
         raise CLIError("query must be a non-empty string", exit_code=2)
     normalized_query = query.strip() if isinstance(query, str) else None
 
-    res = asyncio.run(
+    res = runWithAsyncDB(
         getFRAllContext(user_id=user_id, fr_id=fr_id, query=normalized_query)
     )
     if args.json:
@@ -325,10 +340,72 @@ def syncFeedsToFRCoreCLI(args: Namespace) -> int:
     """
     user_id = getCurrentUserFromLocalSession().get("user_id")
     fr_id = getattr(args, "id", None)
+    incremental = bool(getattr(args, "incremental", False))
+    if getattr(args, "enqueue", False):
+        return _enqueueSyncFeedsJobs(
+            user_id, fr_id, incremental=incremental, as_json=args.json
+        )
     if fr_id is not None:
-        res = asyncio.run(syncFeedsToFRCore(user_id=user_id, fr_id=fr_id))
+        res = runWithAsyncDB(
+            syncFeedsToFRCore(user_id=user_id, fr_id=fr_id, force=not incremental)
+        )
     else:
-        res = asyncio.run(syncAllFeedsToFRCore(user_id=user_id))
+        res = runWithAsyncDB(
+            syncAllFeedsToFRCore(user_id=user_id, incremental=incremental)
+        )
 
     printServiceResInCLI(res, as_json=args.json)
     return 0 if res.get("status") == 200 else 1
+
+
+def _enqueueSyncFeedsJobs(
+    user_id: int, fr_id: int | None, incremental: bool, as_json: bool
+) -> int:
+    """
+    为每个 FR 提交一个 core 同步后台任务（相同 FR 已有待执行任务时去重）
+    """
+    if fr_id is not None:
+        if not ifFRBelongsToUser(user_id, fr_id).get("is_belong"):
+            raise CLIError("FigureAndRelation not found", exit_code=2)
+        fr_ids = [fr_id]
+    else:
+        fr_ids = [
+            fr.get("id")
+            for fr in getAllFigureAndRelations(user_id=user_id).get(
+                "figure_and_relations", []
+            )
+        ]
+    if not fr_ids:
+        raise CLIError("User has no FigureAndRelation", exit_code=1)
+    if incremental:
+        fr_ids = runWithAsyncDB(filterFRIdsNeedingCoreSync(fr_ids))
+        if not fr_ids:
+            printServiceResInCLI(
+                {"status": 200, "message": "No FR needs sync"}, as_json=as_json
+            )
+            return 0
+
+    results = {
+        str(item): enqueueJob(
+            user_id=user_id,
+            job_type=JobType.SYNC_FEEDS_TO_FR_CORE,
+            payload={"force": not incremental},
+            fr_id=item,
+            dedup_key=f"{JobType.SYNC_FEEDS_TO_FR_CORE.value}:{item}",
+        )
+        for item in fr_ids
+    }
+    success_count = sum(1 for res in results.values() if res.get("status") == 200)
+    printServiceResInCLI(
+        {
+            "status": 200 if success_count == len(fr_ids) else -1,
+            "message": (
+                "Sync jobs enqueued, run `immortality jobs list` to check progress"
+                if success_count == len(fr_ids)
+                else "Some sync jobs failed to enqueue"
+            ),
+            "results": results,
+        },
+        as_json=as_json,
+    )
+    return 0 if success_count == len(fr_ids) else 1
@@ -0,0 +1,142 @@
+from argparse import Namespace, ArgumentParser, Action, _SubParsersAction
+from typing import Callable
+
+from src.cli.utils import (
+    CLIError,
+    getCurrentUserFromLocalSession,
+    immortalityPrint,
+    printServiceResInCLI,
+    printTableInCLI,
+)
+from src.database.enums import JobStatus, parseEnum
+from src.database.index import runWithAsyncDB
+from src.services.job import cancelJob, getJob, listJobs
+
+
+def registerJobsSubparser(
+    subparsers: _SubParsersAction,
+    add_json: Callable[[ArgumentParser], Action],
+) -> ArgumentParser:
+    """
+    注册 jobs 子命令
+    """
+    # jobs
+    jobs_parser = subparsers.add_parser("jobs", help="Background job commands")
+    jobs_parser.usage = "immortality jobs {list, show, cancel, worker} [-h]"
+    jobs_subparsers = jobs_parser.add_subparsers(dest="jobs_command")
+
+    # jobs list
+    jobs_list_parser = jobs_subparsers.add_parser("list", help="List jobs")
+    jobs_list_parser.usage = (
+        "immortality jobs list [--status <status>] [--limit <limit>] [-h] [--json]"
+    )
+    add_json(jobs_list_parser)
+    jobs_list_parser.add_argument(
+        "--status",
+        required=False,
+        help="(Optional) Filter by status (pending/running/succeeded/failed/canceled)",
+    )
+    jobs_list_parser.add_argument(
+        "--limit", required=False, type=int, default=20, help="Max jobs to list"
+    )
+    jobs_list_parser.set_defaults(func=listJobsCLI)
+
+    # jobs show
+    jobs_show_parser = jobs_subparsers.add_parser("show", help="Show job detail")
+    jobs_show_parser.usage = "immortality jobs show --id <id> [-h] [--json]"
+    add_json(jobs_show_parser)
+    jobs_show_parser.add_argument("--id", required=True, type=int, help="Job ID")
+    jobs_show_parser.set_defaults(func=showJobCLI)
+
+    # jobs cancel
+    jobs_cancel_parser = jobs_subparsers.add_parser(
+        "cancel", help="Cancel a pending job"
+    )
+    jobs_cancel_parser.usage = "immortality jobs cancel --id <id> [-h] [--json]"
+    add_json(jobs_cancel_parser)
+    jobs_cancel_parser.add_argument("--id", required=True, type=int, help="Job ID")
+    jobs_cancel_parser.set_defaults(func=cancelJobCLI)
+
+    # jobs worker
+    jobs_worker_parser = jobs_subparsers.add_parser(
+        "worker", help="Run a job worker process (can run on several machines)"
+    )
+    jobs_worker_parser.usage = "immortality jobs worker [--concurrency <n>] [-h]"
+    jobs_worker_parser.add_argument(
+        "--concurrency",
+        required=False,
+        type=int,
+        help="(Optional) Concurrent jobs in this process, defaults to JOB_WORKER_CONCURRENCY",
+    )
+    jobs_worker_parser.set_defaults(func=runJobWorkerCLI)
+
+
+def listJobsCLI(args: Namespace) -> int:
+    """
+    查看当前用户任务列表
+    """
+    user_id = getCurrentUserFromLocalSession().get("user_id")
+    status = None
+    arg_status = getattr(args, "status", None)
+    if arg_status:
+        status = parseEnum(JobStatus, arg_status.strip().lower())
+        if not isinstance(status, JobStatus):
+            raise CLIError("Invalid status", exit_code=2)
+
+    res = listJobs(user_id=user_id, status=status, limit=args.limit)
+    if args.json or res.get("status") != 200:
+        printServiceResInCLI(res, as_json=args.json)
+        return 0 if res.get("status") == 200 else 1
+
+    jobs = [
+        {
+            "id": job.get("id"),
+            "job_type": job.get("job_type"),
+            "fr_id": job.get("fr_id"),
+            "status": job.get("status"),
+            "attempts": f"{job.get('attempts')}/{job.get('max_attempts')}",
+            "run_after": job.get("run_after"),
+            "last_error": (job.get("last_error") or "")[:60],
+        }
+        for job in res.get("jobs", [])
+    ]
+    if jobs:
+        printTableInCLI(jobs)
+    else:
+        immortalityPrint("No jobs", type="info")
+    return 0
+
+
+def showJobCLI(args: Namespace) -> int:
+    """
+    查看任务详情
+    """
+    user_id = getCurrentUserFromLocalSession().get("user_id")
+    res = getJob(user_id=user_id, job_id=args.id)
+    printServiceResInCLI(res, as_json=args.json)
+    return 0 if res.get("status") == 200 else 1
+
+
+def cancelJobCLI(args: Namespace) -> int:
+    """
+    取消待执行任务
+    """
+    user_id = getCurrentUserFromLocalSession().get("user_id")
+    res = cancelJob(user_id=user_id, job_id=args.id)
+    printServiceResInCLI(res, as_json=args.json)
+    return 0 if res.get("status") == 200 else 1
+
+
+def runJobWorkerCLI(args: Namespace) -> int:
+    """
+    前台运行任务 worker（Ctrl+C 退出，执行中的任务会在心跳超时后被其他 worker 回收）
+    """
+    from src.services.job_worker import runJobWorker
+
+    concurrency = getattr(args, "concurrency", None)
+    if concurrency is not None and concurrency <= 0:
+        raise CLIError("concurrency must be greater than 0", exit_code=2)
+
+    immortalityPrint("Job worker started, press Ctrl+C to exit", type="success")
+    runWithAsyncDB(runJobWorker(concurrency=concurrency))
+    return 0
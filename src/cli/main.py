@@ -13,6 +13,7 @@ def parserBuilder() -> argparse.ArgumentParser:
     from src.cli.commands.index import registerTopSubparser
     from src.cli.commands.auth import registerAuthSubparser
     from src.cli.commands.fr import registerFRSubparser
+    from src.cli.commands.jobs import registerJobsSubparser
     from src.cli.commands.lark_service import registerLarkServiceSubparser
 
     parser = ImmortalityArgumentParser(
@@ -20,7 +21,7 @@ def parserBuilder() -> argparse.ArgumentParser:
         formatter_class=ImmortalityHelpFormatter,
     )
     parser.usage = (
-        "immortality {doctor, setup, auth, fr, lark-service} ... [-h] [--json]"
+        "immortality {doctor, setup, auth, fr, jobs, lark-service} ... [-h] [--json]"
     )
     parser.add_argument("--json", action="store_true", help="Output in JSON format")
 
@@ -32,6 +33,7 @@ def parserBuilder() -> argparse.ArgumentParser:
     registerTopSubparser(subparsers, add_json)
     registerAuthSubparser(subparsers, add_json)
     registerFRSubparser(subparsers, add_json)
+    registerJobsSubparser(subparsers, add_json)
     registerLarkServiceSubparser(subparsers, add_json)
 
     return parser
@@ -121,6 +121,19 @@ class AnalysisType(enum.Enum):
     NARRATIVE = "narrative"  # 自然语言叙述分析
 
 
+class JobType(enum.Enum):
+    FR_BUILDING = "fr_building"  # 完善人物画像（FRBuildingGraph）
+    SYNC_FEEDS_TO_FR_CORE = "sync_feeds_to_fr_core"  # 同步细粒度信息到 FR core 字段
+
+
+class JobStatus(enum.Enum):
+    PENDING = "pending"  # 待执行（含等待重试）
+    RUNNING = "running"  # 执行中
+    SUCCEEDED = "succeeded"  # 执行成功
+    FAILED = "failed"  # 重试耗尽后失败
+    CANCELED = "canceled"  # 已取消
+
+
 def parseEnum(enum_cls, value: str | None) -> enum.Enum | None:
     """
     解析枚举键 / 值，返回枚举实例
@@ -1,10 +1,17 @@
+import asyncio
 import os
+import weakref
 from sqlalchemy import create_engine
+from sqlalchemy.ext.asyncio import AsyncEngine, async_sessionmaker, create_async_engine
 from sqlalchemy.orm import sessionmaker
 
 _engine = None
 _session_factory = None
 _session_factory_pid = None
+# 异步连接绑定事件循环，AsyncEngine 按 (事件循环, pid) 隔离
+_async_engines: "weakref.WeakKeyDictionary[asyncio.AbstractEventLoop, tuple[int, AsyncEngine, async_sessionmaker]]" = (
+    weakref.WeakKeyDictionary()
+)
 
 
 def _buildEngine():
@@ -33,3 +40,60 @@ def _getSessionFactory():
 
 def session():
     return _getSessionFactory()()
+
+
+def _buildAsyncEngine() -> AsyncEngine:
+    # postgresql+psycopg 在 create_async_engine 下自动使用 psycopg 异步驱动
+    return create_async_engine(
+        url=os.getenv("DATABASE_URI") or "",
+        echo=False,
+        pool_size=int(os.getenv("DB_POOL_SIZE", "5")),
+        max_overflow=int(os.getenv("DB_MAX_OVERFLOW", "10")),
+        pool_timeout=int(os.getenv("DB_POOL_TIMEOUT", "60")),
+        pool_recycle=int(os.getenv("DB_POOL_RECYCLE", "3600")),
+        pool_pre_ping=True,
+    )
+
+
+def _getAsyncSessionFactory() -> async_sessionmaker:
+    loop = asyncio.get_running_loop()
+    pid = os.getpid()
+    entry = _async_engines.get(loop)
+    if entry is None or entry[0] != pid:
+        engine = _buildAsyncEngine()
+        session_factory = async_sessionmaker(
+            bind=engine, autoflush=False, expire_on_commit=False
+        )
+        entry = (pid, engine, session_factory)
+        _async_engines[loop] = entry
+    return entry[2]
+
+
+def asession():
+    """
+    异步 session，用法：async with asession() as db: ...
+    """
+    return _getAsyncSessionFactory()()
+
+
+async def disposeAsyncEngine() -> None:
+    """
+    释放当前事件循环上的异步连接池（事件循环结束前调用）
+    """
+    entry = _async_engines.pop(asyncio.get_running_loop(), None)
+    if entry is not None:
+        await entry[1].dispose()
+
+
+def runWithAsyncDB(coro):
+    """
+    asyncio.run 的封装：结束前释放该事件循环上的异步连接池，供 CLI 等一次性调用使用
+    """
+
+    async def _run():
+        try:
+            return await coro
+        finally:
+            await disposeAsyncEngine()
+
+    return asyncio.run(_run())
@@ -10,10 +10,11 @@ from sqlalchemy import (
     Text,
     DateTime,
     Index,
+    text,
 )
 from sqlalchemy.orm import relationship, declarative_base
 from sqlalchemy.ext.mutable import MutableList
-from sqlalchemy.dialects.postgresql import ARRAY
+from sqlalchemy.dialects.postgresql import ARRAY, JSONB
 from pgvector.sqlalchemy import Vector
 from bcrypt import hashpw, gensalt, checkpw
 from datetime import datetime, timezone
@@ -26,6 +27,8 @@ from src.database.enums import (
     FineGrainedFeedConfidence,
     FineGrainedFeedDimension,
     Gender,
+    JobStatus,
+    JobType,
     UserLevel,
     OriginalSourceType,
 )
@@ -247,14 +250,31 @@ class FineGrainedFeed(Base, SerializableMixin):
     """
 
     __tablename__ = "fine_grained_feed"
-    # 使用HNSW索引加速余弦相似度向量检索
+    # 使用HNSW索引加速余弦相似度向量检索：
+    # 召回总是过滤 is_deleted（按维度召回时还过滤 dimension），建部分索引，
+    # 避免 ANN 扫描返回的大多是已删除 / 其他维度的行
     __table_args__ = (
         Index(
-            "ix_fine_grained_feed_embedding_hnsw",
+            "ix_fine_grained_feed_embedding_hnsw_active",
             "embedding",
             postgresql_using="hnsw",
             postgresql_ops={"embedding": "vector_cosine_ops"},
+            postgresql_where=text("is_deleted = false"),
         ),
+        *[
+            Index(
+                f"ix_fine_grained_feed_embedding_hnsw_{dimension.value}",
+                "embedding",
+                postgresql_using="hnsw",
+                postgresql_ops={"embedding": "vector_cosine_ops"},
+                postgresql_where=text(
+                    f"is_deleted = false AND dimension = '{dimension.name}'"
+                ),
+            )
+            for dimension in FineGrainedFeedDimension
+        ],
+        # 小 FR 由规划器直接按 fr_id 精确扫描排序，不走 ANN
+        Index("ix_fine_grained_feed_fr_id_dimension", "fr_id", "dimension"),
     )
 
     id = Column(Integer, primary_key=True, autoincrement=True)
@@ -534,14 +554,16 @@ class Knowledge(Base, SerializableMixin):
     """私有知识库"""
 
     __tablename__ = "knowledge"
-    # 使用HNSW索引加速余弦相似度向量检索
+    # 使用HNSW索引加速余弦相似度向量检索（召回总是过滤 is_deleted，建部分索引）
     __table_args__ = (
         Index(
-            "ix_knowledge_embedding_hnsw",
+            "ix_knowledge_embedding_hnsw_active",
             "embedding",
             postgresql_using="hnsw",
             postgresql_ops={"embedding": "vector_cosine_ops"},
+            postgresql_where=text("is_deleted = false"),
         ),
+        Index("ix_knowledge_user_id", "user_id"),
     )
 
     id = Column(Integer, primary_key=True, autoincrement=True)
@@ -650,6 +672,131 @@ class Analysis(Base, SerializableMixin):
         return f"<Analysis {self.id}>"
 
 
+class EmbeddingCache(Base, SerializableMixin):
+    """文本向量缓存，key 为 (模型, 维度, 文本 sha256)"""
+
+    __tablename__ = "embedding_cache"
+
+    model_name = Column(Text, primary_key=True, comment="Embedding 模型")
+    dimensions = Column(Integer, primary_key=True, comment="向量维度")
+    text_sha256 = Column(String(64), primary_key=True, comment="文本 sha256")
+    embedding = Column(Vector(1024), nullable=False, comment="向量表示")
+    created_at = Column(
+        DateTime,
+        default=lambda: datetime.now(timezone.utc).replace(tzinfo=None),
+        index=True,
+        comment="创建时间（淘汰时按此排序）",
+    )
+
+    def __repr__(self):
+        return f"<EmbeddingCache {self.model_name} {self.text_sha256[:8]}>"
+
+
+class FRCoreSyncWatermark(Base, SerializableMixin):
+    """FR core 字段同步水位：每个 FR、每个维度记录上次同步时的 feed 集合指纹"""
+
+    __tablename__ = "fr_core_sync_watermark"
+
+    fr_id = Column(
+        Integer,
+        ForeignKey("figure_and_relation.id"),
+        primary_key=True,
+        comment="关联的 FigureAndRelation ID",
+    )
+    dimension = Column(
+        Enum(FineGrainedFeedDimension),
+        primary_key=True,
+        comment="维度",
+    )
+    max_feed_id = Column(
+        Integer, nullable=False, default=0, comment="同步时该维度最大 feed ID"
+    )
+    feed_count = Column(Integer, nullable=False, default=0, comment="同步时该维度 feed 数")
+    feed_set_hash = Column(
+        String(64), nullable=False, comment="同步时该维度 feed 集合指纹 (id + 内容)"
+    )
+    synced_at = Column(
+        DateTime,
+        default=lambda: datetime.now(timezone.utc).replace(tzinfo=None),
+        onupdate=lambda: datetime.now(timezone.utc).replace(tzinfo=None),
+        comment="同步时间",
+    )
+
+    def __repr__(self):
+        return f"<FRCoreSyncWatermark {self.fr_id} {self.dimension}>"
+
+
+class Job(Base, SerializableMixin):
+    """后台任务队列（FRBuildingGraph 构建、core 同步等），worker 通过 SKIP LOCKED 领取"""
+
+    __tablename__ = "job"
+    __table_args__ = (
+        # 领取任务：按 (status, run_after) 扫描待执行任务
+        Index("ix_job_status_run_after", "status", "run_after"),
+        # 去重：同一 dedup_key 同时只允许存在一个待执行任务
+        Index(
+            "uq_job_pending_dedup_key",
+            "dedup_key",
+            unique=True,
+            postgresql_where=text("status = 'PENDING'"),
+        ),
+        # 同一 FR 同时只允许一个执行中的任务；并发领取时未提交的领取也会在此冲突
+        Index(
+            "uq_job_running_fr_id",
+            "fr_id",
+            unique=True,
+            postgresql_where=text("status = 'RUNNING'"),
+        ),
+    )
+    id = Column(Integer, primary_key=True, autoincrement=True)
+    job_type = Column(Enum(JobType), nullable=False, comment="任务类型")
+    user_id = Column(
+        Integer,
+        ForeignKey("user.id"),
+        nullable=False,
+        index=True,
+        comment="发起用户 ID",
+    )
+    fr_id = Column(
+        Integer,
+        ForeignKey("figure_and_relation.id"),
+        nullable=True,
+        index=True,
+        comment="关联的 FigureAndRelation ID",
+    )
+    payload = Column(JSONB, nullable=False, default=dict, comment="任务参数")
+    dedup_key = Column(Text, nullable=True, comment="去重键")
+
+    status = Column(
+        Enum(JobStatus),
+        nullable=False,
+        default=JobStatus.PENDING,
+        comment="任务状态",
+    )
+    attempts = Column(Integer, nullable=False, default=0, comment="已尝试次数")
+    max_attempts = Column(Integer, nullable=False, default=3, comment="最大尝试次数")
+    run_after = Column(
+        DateTime,
+        nullable=False,
+        default=lambda: datetime.now(timezone.utc).replace(tzinfo=None),
+        comment="最早可执行时间（重试退避）",
+    )
+    locked_by = Column(Text, nullable=True, comment="领取该任务的 worker")
+    locked_at = Column(DateTime, nullable=True, comment="领取 / 心跳时间")
+    last_error = Column(Text, nullable=True, comment="最近一次错误")
+    result = Column(JSONB, nullable=True, comment="执行结果")
+
+    created_at = Column(
+        DateTime,
+        default=lambda: datetime.now(timezone.utc).replace(tzinfo=None),
+        comment="创建时间",
+    )
+    finished_at = Column(DateTime, nullable=True, comment="结束时间")
+
+    def __repr__(self):
+        return f"<Job {self.id} {self.job_type}>"
+
+
 def initDatabaseIfNeeded():
     """
     一键初始化创建数据库表
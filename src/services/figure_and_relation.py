@@ -1,20 +1,39 @@
 import asyncio
+import hashlib
 import logging
 import os
-from typing import Any, List
+import threading
+import time
+from collections import OrderedDict
+from contextlib import nullcontext
+from typing import Any, List, Literal
 from langchain_core.messages import HumanMessage, SystemMessage
+from sqlalchemy import func, select
+from sqlalchemy.dialects.postgresql import insert
 
 from src.agents.llm import prepareLLM
 from src.agents.prompt import getPrompt
 from src.database.enums import FigureRole, FineGrainedFeedDimension, Gender, MBTI
-from src.database.index import session
+from src.database.index import asession, session
 from src.database.models import (
     FRBuildingGraphReport,
+    FRCoreSyncWatermark,
     FROverallUpdateLog,
     FigureAndRelation,
+    FineGrainedFeed,
+)
+from src.services.fine_grained_feed import (
+    invalidateFineGrainedFeedRecallCache,
+    recallFineGrainedFeeds,
+)
+from src.services.user import getUserById
+from src.utils.identity_cache import (
+    getCachedIdentity,
+    invalidateIdentity,
+    setCachedIdentity,
 )
-from src.services.fine_grained_feed import recallFineGrainedFeeds
 from src.utils.index import (
+    acheckFigureAndRelationOwnership,
     checkFigureAndRelationOwnership,
     cleanList,
     stringifyValue,
@@ -65,6 +84,25 @@ fr_list_fields = {
     "words_user2figure",
 }
 
+# 对话上下文中不包含在人物画像里的字段（在对话的其他部分注入）
+_CONVERSATION_PERSONA_EXCLUDE_FIELDS = [
+    "words_figure2user",
+    "words_user2figure",
+    "core_procedural_info",
+    "core_memory",
+]
+
+# 进程内 LRU：fr_id -> (user_id, 版本号, 写入时间, 对话上下文)
+_fr_context_cache: "OrderedDict[int, tuple[int, int, float, dict[str, Any]]]" = (
+    OrderedDict()
+)
+# fr_id -> 版本号，每次失效 +1；加载期间版本变化则不回填，避免旧数据覆盖
+_fr_context_versions: dict[int, int] = {}
+_fr_context_cache_lock = threading.Lock()
+
+# 身份缓存命名空间：(user_id, fr_id) -> True，只缓存归属成立的结果
+_FR_OWNERSHIP_CACHE_NAMESPACE = "fr_ownership"
+
 
 def fr_string_fields(detailed: bool = False):
     fields = {
@@ -211,6 +249,9 @@ def deleteFigureAndRelation(
             db.rollback()
             logger.error(f"Delete FigureAndRelation failed: {str(e)}")
             return {"status": -4, "message": "Delete FigureAndRelation failed"}
+        invalidateFRContextCache(fr_id)
+        invalidateIdentity(_FR_OWNERSHIP_CACHE_NAMESPACE, (user_id, fr_id))
+        invalidateFineGrainedFeedRecallCache(fr_id)
 
         return {
             "status": 200,
@@ -279,6 +320,7 @@ def updateFigureAndRelation(
             db.rollback()
             logger.error(f"Update FigureAndRelation failed: {str(e)}")
             return {"status": -7, "message": "Update FigureAndRelation failed"}
+        invalidateFRContextCache(fr_id)
 
         return {
             "status": 200,
@@ -610,6 +652,81 @@ def buildRecalledMarkdown(title: str, items: list[dict[str, Any]]) -> str:
     return "\n".join(lines)
 
 
+def invalidateFRContextCache(fr_id: int) -> None:
+    """
+    FR 画像 / core 字段变更后使对话上下文缓存失效
+    """
+    with _fr_context_cache_lock:
+        _fr_context_versions[fr_id] = _fr_context_versions.get(fr_id, 0) + 1
+        _fr_context_cache.pop(fr_id, None)
+
+
+def getFRConversationContext(
+    user_id: int,
+    fr_id: int,
+) -> dict:
+    """
+    获取对话所需的 FR 上下文（人物画像 Markdown、用户展示名等），进程内缓存；
+    同进程内的更新会主动失效，其他进程的更新由 TTL 兜底
+    """
+    if not isinstance(user_id, int):
+        return {"status": -1, "message": "Invalid user_id"}
+    if not isinstance(fr_id, int):
+        return {"status": -2, "message": "Invalid fr_id"}
+
+    ttl_seconds = float(os.getenv("FR_CONTEXT_CACHE_TTL_SECONDS") or 600)
+    with _fr_context_cache_lock:
+        version = _fr_context_versions.get(fr_id, 0)
+        entry = _fr_context_cache.get(fr_id)
+        if entry is not None:
+            cached_user_id, cached_version, created, context = entry
+            if (
+                cached_user_id == user_id
+                and cached_version == version
+                and time.monotonic() - created < ttl_seconds
+            ):
+                _fr_context_cache.move_to_end(fr_id)
+                return {
+                    "status": 200,
+                    "message": "Get FR context success",
+                    "context": context,
+                }
+
+    user = getUserById(user_id).get("user")
+    if user is None:
+        return {"status": -3, "message": "User not found"}
+    fr = getFigureAndRelation(user_id, fr_id).get("figure_and_relation")
+    if fr is None:
+        return {"status": -4, "message": "FigureAndRelation not found"}
+
+    username = user.get("username")
+    nickname = user.get("nickname", username)
+    context = {
+        "user_name": f"{username}({nickname})" if username != nickname else username,
+        "figure_role": fr.get("figure_role"),
+        "figure_persona": buildFigurePersonaMarkdown(
+            fr=fr,
+            exclude_fields=_CONVERSATION_PERSONA_EXCLUDE_FIELDS,
+        ),
+        "words_to_user": list(fr.get("words_figure2user") or []),
+    }
+
+    max_entries = int(os.getenv("FR_CONTEXT_CACHE_MAX_ENTRIES") or 1024)
+    with _fr_context_cache_lock:
+        # 加载期间发生了失效，本次结果可能是旧数据，不回填
+        if _fr_context_versions.get(fr_id, 0) == version and max_entries > 0:
+            _fr_context_cache[fr_id] = (user_id, version, time.monotonic(), context)
+            _fr_context_cache.move_to_end(fr_id)
+            while len(_fr_context_cache) > max_entries:
+                _fr_context_cache.popitem(last=False)
+
+    return {
+        "status": 200,
+        "message": "Get FR context success",
+        "context": context,
+    }
+
+
 async def getFRAllContext(
     user_id: int,
     fr_id: int,
@@ -624,8 +741,10 @@ async def getFRAllContext(
         return {"status": -2, "message": "Invalid fr_id"}
     if not isinstance(query, str) and query is not None:
         return {"status": -3, "message": "query must be a str"}
-    with session() as db:
-        fr = checkFigureAndRelationOwnership(db=db, user_id=user_id, fr_id=fr_id)
+    async with asession() as db:
+        fr = await acheckFigureAndRelationOwnership(
+            db=db, user_id=user_id, fr_id=fr_id
+        )
         if fr is None:
             return {"status": -4, "message": "FigureAndRelation not found"}
     persona = buildFigurePersonaMarkdown(fr=fr.toJson())
@@ -664,28 +783,29 @@ async def getFRAllContext(
             "top_k": 5,
         },
     ]
-    for conf in dimension_conf:
-        recall_res = await recallFineGrainedFeeds(
-            user_id=user_id,
-            fr_id=fr_id,
-            scope=[
-                {
-                    "scope": conf["dimension"],
-                    "top_k": conf["top_k"],
-                }
-            ],
-            query=normalized_query,
-        )
-        if recall_res.get("status") != 200:
-            return {
-                "status": -5,
-                "message": f"Recall FineGrainedFeed failed: {recall_res.get('message', '')}",
+    # 四个维度合并为一次召回：一次向量化 + 一次 SQL
+    recall_res = await recallFineGrainedFeeds(
+        user_id=user_id,
+        fr_id=fr_id,
+        scope=[
+            {
+                "scope": conf["dimension"],
+                "top_k": conf["top_k"],
             }
-        items = []
-        raw_items = recall_res.get("items", {})
-        if isinstance(raw_items, dict):
-            items = raw_items.get(conf["dimension"].value, [])
-
+            for conf in dimension_conf
+        ],
+        query=normalized_query,
+    )
+    if recall_res.get("status") != 200:
+        return {
+            "status": -5,
+            "message": f"Recall FineGrainedFeed failed: {recall_res.get('message', '')}",
+        }
+    raw_items = recall_res.get("items", {})
+    if not isinstance(raw_items, dict):
+        raw_items = {}
+    for conf in dimension_conf:
+        items = raw_items.get(conf["dimension"].value, [])
         recalled_map[conf["result_key"]] = (
             buildRecalledMarkdown(title=conf["title"], items=items) if items else None
         )
@@ -701,25 +821,123 @@ async def getFRAllContext(
     }
 
 
+_CORE_SYNC_DIMENSIONS = [
+    FineGrainedFeedDimension.PERSONALITY,
+    FineGrainedFeedDimension.INTERACTION_STYLE,
+    FineGrainedFeedDimension.PROCEDURAL_INFO,
+    FineGrainedFeedDimension.MEMORY,
+]
+
+_CORE_SYNC_DELTA_INSTRUCTION = """You will receive the EXISTING integrated text and SEVERAL NEW information fragments.
+Merge the new fragments into the existing text, applying all the rules above to the merged result:
+- Keep every valid point of the existing text, including its structure where possible
+- Add new points under the appropriate headings; merge duplicates; handle conflicts as described above
+- Output the complete merged text only"""
+
+
+def _hashFeedEntries(entries: list[tuple[int, str]]) -> str:
+    """
+    feed 集合指纹：按 id 排序后的 (id, 内容 md5) 序列 sha256
+    """
+    digest = hashlib.sha256()
+    for feed_id, content_md5 in entries:
+        digest.update(f"{feed_id}:{content_md5}\n".encode("utf-8"))
+    return digest.hexdigest()
+
+
+async def _loadCoreSyncState(
+    db: Any,
+    fr_ids: list[int],
+) -> tuple[
+    dict[tuple[int, FineGrainedFeedDimension], list[tuple[int, str]]],
+    dict[tuple[int, FineGrainedFeedDimension], FRCoreSyncWatermark],
+]:
+    """
+    读取 FR 当前各维度 feed 的 (id, 内容 md5) 与已记录的同步水位（不读取 embedding 与正文）
+    """
+    entries: dict[tuple[int, FineGrainedFeedDimension], list[tuple[int, str]]] = {}
+    rows = (
+        await db.execute(
+            select(
+                FineGrainedFeed.fr_id,
+                FineGrainedFeed.dimension,
+                FineGrainedFeed.id,
+                func.md5(FineGrainedFeed.content),
+            )
+            .where(
+                FineGrainedFeed.fr_id.in_(fr_ids),
+                FineGrainedFeed.dimension.in_(_CORE_SYNC_DIMENSIONS),
+                FineGrainedFeed.is_deleted == False,
+            )
+            .order_by(FineGrainedFeed.id.asc())
+        )
+    ).all()
+    for fr_id, dimension, feed_id, content_md5 in rows:
+        entries.setdefault((fr_id, dimension), []).append((feed_id, content_md5))
+
+    watermarks = {
+        (item.fr_id, item.dimension): item
+        for item in (
+            await db.execute(
+                select(FRCoreSyncWatermark).where(
+                    FRCoreSyncWatermark.fr_id.in_(fr_ids)
+                )
+            )
+        ).scalars()
+    }
+    return entries, watermarks
+
+
+def _diffCoreDimension(
+    entries: list[tuple[int, str]],
+    watermark: FRCoreSyncWatermark | None,
+) -> tuple[Literal["clean", "delta", "full"], list[int]]:
+    """
+    判断某维度自上次同步后的变化：
+    - clean：feed 集合未变
+    - delta：旧 feed 均未变，只新增了 feed（返回新增 feed id）
+    - full：有修改 / 删除，或无水位
+    """
+    if watermark is None:
+        return ("clean" if not entries else "full"), []
+    if _hashFeedEntries(entries) == watermark.feed_set_hash:
+        return "clean", []
+    old_entries = [item for item in entries if item[0] <= watermark.max_feed_id]
+    new_ids = [item[0] for item in entries if item[0] > watermark.max_feed_id]
+    if new_ids and _hashFeedEntries(old_entries) == watermark.feed_set_hash:
+        return "delta", new_ids
+    return "full", []
+
+
 async def syncFeedsToFRCore(
     user_id: int,
     fr_id: int,
+    llm_semaphore: asyncio.Semaphore | None = None,
+    force: bool = False,
 ) -> dict[str, Any]:
     """
     同步 FineGrainedFeed 到 FigureAndRelation core 字段
+    - 按维度记录 feed 集合指纹水位，只重新生成 feed 有变化的维度（force=True 时全部重新生成）
+    - CORE_SYNC_DELTA_MODE 开启时，仅新增 feed 的维度只把新增 feed 合并进已有 core 文本
+    llm_semaphore：多个 FR 并发同步时共享的 LLM 并发预算
     """
     if not isinstance(user_id, int):
         return {"status": -1, "message": "Invalid user_id"}
     if not isinstance(fr_id, int):
         return {"status": -2, "message": "Invalid fr_id"}
 
-    with session() as db:
-        figure_and_relation = checkFigureAndRelationOwnership(
+    async with asession() as db:
+        figure_and_relation = await acheckFigureAndRelationOwnership(
             db=db, user_id=user_id, fr_id=fr_id
         )
         if figure_and_relation is None:
             return {"status": -3, "message": "FigureAndRelation not found"}
         # persona = buildFigurePersonaMarkdown(figure_and_relation.toJson()) # 暂不需要 persona 注入提示词
+        try:
+            feed_entries, watermarks = await _loadCoreSyncState(db, [fr_id])
+        except Exception as e:
+            logger.error(f"Load core sync watermark failed: {str(e)}")
+            return {"status": -4, "message": "Load core sync watermark failed"}
 
     dimension_conf: dict[str, dict[str, Any]] = {
         FineGrainedFeedDimension.PERSONALITY.value: {
@@ -756,37 +974,111 @@ async def syncFeedsToFRCore(
         },
     }
 
+    # 按水位划分维度：clean 跳过，delta 只合并新增 feed，full 重新召回生成
+    delta_mode = (os.getenv("CORE_SYNC_DELTA_MODE") or "false").lower() == "true"
+    for conf in dimension_conf.values():
+        entries = feed_entries.get((fr_id, conf["dimension"]), [])
+        conf["entries"] = entries
+        conf["existing_core"] = (getattr(figure_and_relation, conf["field"]) or "").strip()
+        if force:
+            conf["mode"], conf["new_feed_ids"] = "full", []
+            continue
+        conf["mode"], conf["new_feed_ids"] = _diffCoreDimension(
+            entries, watermarks.get((fr_id, conf["dimension"]))
+        )
+        # 未开启增量合并或没有已有 core 文本时，退化为全量生成
+        if conf["mode"] == "delta" and (not delta_mode or conf["existing_core"] == ""):
+            conf["mode"] = "full"
+
+    dirty_conf = {
+        key: conf for key, conf in dimension_conf.items() if conf["mode"] != "clean"
+    }
+    skipped_dimensions = [
+        key for key, conf in dimension_conf.items() if conf["mode"] == "clean"
+    ]
+    if not dirty_conf:
+        return {
+            "status": 200,
+            "message": "FR core is up to date",
+            "synced_dimensions": {},
+            "skipped_dimensions": skipped_dimensions,
+        }
+
     # 召回
     # 本场景召回不需要 query
-    try:
-        recall_res = await recallFineGrainedFeeds(
-            user_id=user_id,
-            fr_id=fr_id,
-            scope=[
-                {
-                    "scope": conf["dimension"],
-                    "top_k": conf["top_k"],
-                }
-                for conf in dimension_conf.values()
-            ],
-        )
-    except Exception as e:
-        logger.error(f"Recall FineGrainedFeed failed: {str(e)}")
-        return {"status": -4, "message": "Recall FineGrainedFeed failed"}
-    if recall_res.get("status") != 200:
-        logger.warning(
-            f"Recall FineGrainedFeed failed: {recall_res.get('message', '')}"
-        )
-        return {"status": -4, "message": "Recall FineGrainedFeed failed"}
+    full_conf = [conf for conf in dirty_conf.values() if conf["mode"] == "full"]
+    if full_conf:
+        try:
+            recall_res = await recallFineGrainedFeeds(
+                user_id=user_id,
+                fr_id=fr_id,
+                scope=[
+                    {
+                        "scope": conf["dimension"],
+                        "top_k": conf["top_k"],
+                    }
+                    for conf in full_conf
+                ],
+            )
+        except Exception as e:
+            logger.error(f"Recall FineGrainedFeed failed: {str(e)}")
+            return {"status": -4, "message": "Recall FineGrainedFeed failed"}
+        if recall_res.get("status") != 200:
+            logger.warning(
+                f"Recall FineGrainedFeed failed: {recall_res.get('message', '')}"
+            )
+            return {"status": -4, "message": "Recall FineGrainedFeed failed"}
 
-    recalled_items = recall_res.get("items", {})
+        recalled_items = recall_res.get("items", {})
 
-    # 落入召回内容：无召回时保持空字符串，避免触发 LLM 生成并覆盖原字段
-    for conf in dimension_conf.values():
-        items = recalled_items.get(conf["dimension"].value, [])
-        conf["recalled_content"] = (
-            buildRecalledMarkdown(title=conf["title"], items=items) if items else ""
-        )
+        # 落入召回内容：无召回时保持空字符串，避免触发 LLM 生成并覆盖原字段
+        for conf in full_conf:
+            items = recalled_items.get(conf["dimension"].value, [])
+            conf["recalled_content"] = (
+                buildRecalledMarkdown(title=conf["title"], items=items) if items else ""
+            )
+
+    # 增量合并：只读取新增 feed
+    delta_conf = [conf for conf in dirty_conf.values() if conf["mode"] == "delta"]
+    if delta_conf:
+        new_feed_ids = [
+            feed_id for conf in delta_conf for feed_id in conf["new_feed_ids"]
+        ]
+        async with asession() as db:
+            try:
+                new_feeds = (
+                    await db.execute(
+                        select(
+                            FineGrainedFeed.id,
+                            FineGrainedFeed.dimension,
+                            FineGrainedFeed.sub_dimension,
+                            FineGrainedFeed.confidence,
+                            FineGrainedFeed.content,
+                        )
+                        .where(FineGrainedFeed.id.in_(new_feed_ids))
+                        .order_by(FineGrainedFeed.id.asc())
+                    )
+                ).all()
+            except Exception as e:
+                logger.error(f"Load new FineGrainedFeed failed: {str(e)}")
+                return {"status": -4, "message": "Load new FineGrainedFeed failed"}
+        for conf in delta_conf:
+            items = [
+                {
+                    "fine_grained_feed": {
+                        "content": feed.content,
+                        "sub_dimension": feed.sub_dimension,
+                        "confidence": feed.confidence,
+                    }
+                }
+                for feed in new_feeds
+                if feed.dimension == conf["dimension"]
+            ]
+            conf["recalled_content"] = (
+                buildRecalledMarkdown(title=f"新增{conf['title']}", items=items)
+                if items
+                else ""
+            )
 
     # LLM 提炼摘要
     llm = prepareLLM(
@@ -816,12 +1108,22 @@ async def syncFeedsToFRCore(
             raise ValueError(f"{conf_by_dimension['prompt_key']} prompt not found")
 
         user_prompt = f"当前主题：{conf_by_dimension['dimension'].value}\n{conf_by_dimension['recalled_content']}"
-        response = await llm.ainvoke(
-            [
-                SystemMessage(content=SYSTEM_PROMPT),
-                HumanMessage(content=user_prompt),
-            ]
-        )
+        if conf_by_dimension["mode"] == "delta":
+            SYSTEM_PROMPT = (
+                f"{SYSTEM_PROMPT}\n\n# Delta Mode\n\n{_CORE_SYNC_DELTA_INSTRUCTION}"
+            )
+            user_prompt = (
+                f"当前主题：{conf_by_dimension['dimension'].value}\n"
+                f"# 已有整合文本\n{conf_by_dimension['existing_core']}\n\n"
+                f"{conf_by_dimension['recalled_content']}"
+            )
+        async with llm_semaphore or nullcontext():
+            response = await llm.ainvoke(
+                [
+                    SystemMessage(content=SYSTEM_PROMPT),
+                    HumanMessage(content=user_prompt),
+                ]
+            )
         core = response.content.strip()
 
         return conf_by_dimension["field"], core
@@ -829,7 +1131,7 @@ async def syncFeedsToFRCore(
     try:
         # 并发任务
         branch_results = await asyncio.gather(
-            *[_genCoreByLLM(conf) for conf in dimension_conf.values()]
+            *[_genCoreByLLM(conf) for conf in dirty_conf.values()]
         )
     except Exception as e:
         logger.error(f"syncFeedsToFRCore failed during branch execution: {str(e)}")
@@ -840,14 +1142,20 @@ async def syncFeedsToFRCore(
         for field, core in branch_results
         if core and core != ""  # core 为空时，不更新对应字段
     }
-    with session() as db:
+    # 只有已写入 core，或本身没有可用内容的维度才推进水位；LLM 未产出 core 的维度下次继续同步
+    synced_conf = {
+        key: conf
+        for key, conf in dirty_conf.items()
+        if conf["field"] in updates or conf["recalled_content"] == ""
+    }
+    async with asession() as db:
         try:
             fr_logs: list[FROverallUpdateLog] = []
-            figure_and_relation = checkFigureAndRelationOwnership(
+            figure_and_relation = await acheckFigureAndRelationOwnership(
                 db=db, user_id=user_id, fr_id=fr_id
             )
             if figure_and_relation is None:
-                db.rollback()
+                await db.rollback()
                 return {"status": -3, "message": "FigureAndRelation not found"}
 
             for field, value in updates.items():
@@ -863,15 +1171,50 @@ async def syncFeedsToFRCore(
                 )
             if fr_logs:
                 db.add_all(fr_logs)
-            db.commit()
+
+            # 记录本次同步时的 feed 集合水位（以同步开始时读取的集合为准，期间新增的 feed 下次再同步）
+            if synced_conf:
+                watermark_stmt = insert(FRCoreSyncWatermark).values(
+                    [
+                        {
+                            "fr_id": fr_id,
+                            "dimension": conf["dimension"],
+                            "max_feed_id": max(
+                                [item[0] for item in conf["entries"]], default=0
+                            ),
+                            "feed_count": len(conf["entries"]),
+                            "feed_set_hash": _hashFeedEntries(conf["entries"]),
+                        }
+                        for conf in synced_conf.values()
+                    ]
+                )
+                await db.execute(
+                    watermark_stmt.on_conflict_do_update(
+                        index_elements=[
+                            FRCoreSyncWatermark.fr_id,
+                            FRCoreSyncWatermark.dimension,
+                        ],
+                        set_={
+                            "max_feed_id": watermark_stmt.excluded.max_feed_id,
+                            "feed_count": watermark_stmt.excluded.feed_count,
+                            "feed_set_hash": watermark_stmt.excluded.feed_set_hash,
+                            "synced_at": func.timezone("UTC", func.now()),
+                        },
+                    )
+                )
+            await db.commit()
         except Exception as e:
-            db.rollback()
+            await db.rollback()
             logger.error(f"syncFeedsToFRCore db update failed: {str(e)}")
             return {"status": -5, "message": "Sync FR core failed"}
+    invalidateFRContextCache(fr_id)
 
     return {
         "status": 200,
         "message": "Sync FR core success",
+        "synced_dimensions": {key: conf["mode"] for key, conf in synced_conf.items()},
+        "unsynced_dimensions": [key for key in dirty_conf if key not in synced_conf],
+        "skipped_dimensions": skipped_dimensions,
         # "core_personality": updates.get("core_personality", ""),
         # "core_interaction_style": updates.get("core_interaction_style", ""),
         # "core_procedural_info": updates.get("core_procedural_info", ""),
@@ -879,9 +1222,37 @@ async def syncFeedsToFRCore(
     }
 
 
-async def syncAllFeedsToFRCore(user_id: int) -> dict[str, Any]:
+async def filterFRIdsNeedingCoreSync(fr_ids: list[int]) -> list[int]:
+    """
+    增量同步：只保留至少一个维度的 feed 集合与上次同步水位不一致的 FR
+    """
+    if not fr_ids:
+        return []
+    async with asession() as db:
+        feed_entries, watermarks = await _loadCoreSyncState(db, fr_ids)
+    return [
+        fr_id
+        for fr_id in fr_ids
+        if any(
+            _diffCoreDimension(
+                feed_entries.get((fr_id, dimension), []),
+                watermarks.get((fr_id, dimension)),
+            )[0]
+            != "clean"
+            for dimension in _CORE_SYNC_DIMENSIONS
+        )
+    ]
+
+
+async def syncAllFeedsToFRCore(
+    user_id: int,
+    incremental: bool = False,
+) -> dict[str, Any]:
     """
     将用户所有 FR 的 FineGrainedFeed 同步到其 FigureAndRelation core 字段
+    - 多个 FR 并发同步（CORE_SYNC_FR_CONCURRENCY），LLM 调用共享并发预算（CORE_SYNC_LLM_CONCURRENCY）
+    - incremental=True 时跳过上次同步后没有 feed 变动的 FR，且 FR 内只重新生成有变动的维度；
+      否则全部重新生成
     """
     if not isinstance(user_id, int):
         return {"status": -1, "message": "User ID must be an integer"}
@@ -900,28 +1271,64 @@ async def syncAllFeedsToFRCore(user_id: int) -> dict[str, Any]:
         if not fr_ids or len(fr_ids) == 0:
             return {"status": -2, "message": "User has no FigureAndRelation"}
 
-    res: dict[str, Any] = {}
-    success_count = 0
-    for fr_id in fr_ids:
-        res[str(fr_id)] = await syncFeedsToFRCore(user_id=user_id, fr_id=fr_id)
-        if res[str(fr_id)]["status"] == 200:
-            success_count += 1
+    fr_ids_to_sync = fr_ids
+    if incremental:
+        try:
+            fr_ids_to_sync = await filterFRIdsNeedingCoreSync(fr_ids)
+        except Exception as e:
+            # 水位查询失败时退化为全量同步
+            logger.warning(f"Filter FRs needing core sync failed: {str(e)}")
+            fr_ids_to_sync = fr_ids
+    skipped_fr_ids = [fr_id for fr_id in fr_ids if fr_id not in fr_ids_to_sync]
+
+    fr_semaphore = asyncio.Semaphore(
+        max(1, int(os.getenv("CORE_SYNC_FR_CONCURRENCY") or 4))
+    )
+    llm_semaphore = asyncio.Semaphore(
+        max(1, int(os.getenv("CORE_SYNC_LLM_CONCURRENCY") or 8))
+    )
+
+    async def _syncOne(fr_id: int) -> dict[str, Any]:
+        async with fr_semaphore:
+            start_time = time.perf_counter()
+            try:
+                fr_res = await syncFeedsToFRCore(
+                    user_id=user_id,
+                    fr_id=fr_id,
+                    llm_semaphore=llm_semaphore,
+                    force=not incremental,
+                )
+            except Exception as e:
+                logger.error(f"syncFeedsToFRCore failed, fr_id={fr_id}: {str(e)}")
+                fr_res = {"status": -6, "message": "Sync FR core failed"}
+            fr_res["elapsed_seconds"] = round(time.perf_counter() - start_time, 3)
+            return fr_res
+
+    start_time = time.perf_counter()
+    fr_results = await asyncio.gather(*[_syncOne(fr_id) for fr_id in fr_ids_to_sync])
+    res: dict[str, Any] = {
+        str(fr_id): fr_res for fr_id, fr_res in zip(fr_ids_to_sync, fr_results)
+    }
+    success_count = sum(1 for fr_res in fr_results if fr_res["status"] == 200)
+    total_count = len(fr_ids_to_sync)
     return {
         "status": (
-            200 if success_count == len(fr_ids) else -3 if success_count == 0 else 201
+            200 if success_count == total_count else -3 if success_count == 0 else 201
         ),
         "message": (
             "Sync FR core success"
-            if success_count == len(fr_ids)
+            if success_count == total_count
             else (
-                "Sync FR core partial success"
+                "Sync FR core failed"
                 if success_count == 0
                 else "Sync FR core partial success"
             )
         ),
         "results": res,
         "success_count": success_count,
-        "fail_count": len(fr_ids) - success_count,
+        "fail_count": total_count - success_count,
+        "skipped_fr_ids": skipped_fr_ids,
+        "elapsed_seconds": round(time.perf_counter() - start_time, 3),
     }
 
 
@@ -957,18 +1364,23 @@ def ifFRBelongsToUser(
     fr_id: int,
 ) -> dict:
     """
-    判断 fr 是否属于用户
+    判断 fr 是否属于用户（进程内 TTL 缓存，删除 FR 时主动失效）
     """
-    with session() as db:
-        fr = db.get(FigureAndRelation, fr_id)
-        if fr is None:
-            return {
-                "status": 200,
-                "message": "Success",
-                "is_belong": False,
-            }
+    if getCachedIdentity(_FR_OWNERSHIP_CACHE_NAMESPACE, (user_id, fr_id)):
         return {
             "status": 200,
             "message": "Success",
-            "is_belong": fr.user_id == user_id,
+            "is_belong": True,
         }
+
+    with session() as db:
+        fr = db.get(FigureAndRelation, fr_id)
+        is_belong = fr is not None and fr.user_id == user_id and not fr.is_deleted
+
+    if is_belong:
+        setCachedIdentity(_FR_OWNERSHIP_CACHE_NAMESPACE, (user_id, fr_id), True)
+    return {
+        "status": 200,
+        "message": "Success",
+        "is_belong": is_belong,
+    }
@@ -1,31 +1,61 @@
+import asyncio
 import logging
 import os
 from typing import List, Literal, TypedDict
 
-from src.agents.embedding import vectorizeText
+from sqlalchemy import (
+    Float,
+    Integer,
+    case,
+    cast,
+    func,
+    literal,
+    null,
+    select,
+    union_all,
+)
+
+from src.agents.embedding import vectorizeText, vectorizeTexts
 from src.database.enums import (
     ConflictStatus,
     FineGrainedFeedConfidence,
     FineGrainedFeedDimension,
     OriginalSourceType,
 )
-from src.database.index import session
+from src.database.index import asession, session
 from src.database.models import (
     FROverallUpdateLog,
     FineGrainedFeed,
     FineGrainedFeedConflict,
     OriginalSource,
 )
+from src.services.fr_vector_index import queryFRVectorIndex
 from src.utils.index import (
+    acheckFigureAndRelationOwnership,
+    acheckOriginalSourceOwnership,
+    applyVectorSearchOptions,
+    checkVectorSearchOptions,
+    projectionToJson,
+    semanticScoreSQL,
     serialize2String,
-    timeDecay,
+    timeDecaySQL,
     checkFigureAndRelationOwnership,
     checkOriginalSourceOwnership,
 )
+from src.utils.recall_cache import (
+    bumpRecallGeneration,
+    getCachedRecall,
+    getRecallGeneration,
+    queryFingerprint,
+    setCachedRecall,
+)
 
 
 logger = logging.getLogger(__name__)
 
+# 召回缓存命名空间，代数按 fr_id 计
+_RECALL_CACHE_NAMESPACE = "fine_grained_feed"
+
 
 def _checkFineGrainedFeedIds(
     db,
@@ -48,6 +78,14 @@ def _checkFineGrainedFeedIds(
     return count == len(set(feed_ids))
 
 
+def buildFeedEmbeddingText(content: str, sub_dimension: str | None = None) -> str:
+    """
+    新增 feed 时用于向量化的文本（子维度 + 内容）
+    """
+    content = content.strip()
+    return f"{sub_dimension}{'\n' if sub_dimension else ''}{content}"
+
+
 async def addFineGrainedFeed(
     user_id: int,
     fr_id: int,
@@ -75,8 +113,8 @@ async def addFineGrainedFeed(
     if sub_dimension is not None and not isinstance(sub_dimension, str):
         return {"status": -7, "message": "Invalid sub_dimension"}
 
-    with session() as db:
-        fr = checkFigureAndRelationOwnership(
+    async with asession() as db:
+        fr = await acheckFigureAndRelationOwnership(
             db=db,
             user_id=user_id,
             fr_id=fr_id,
@@ -84,7 +122,7 @@ async def addFineGrainedFeed(
         if fr is None:
             return {"status": -8, "message": "FigureAndRelation not found"}
 
-        original_source = checkOriginalSourceOwnership(
+        original_source = await acheckOriginalSourceOwnership(
             db=db,
             user_id=user_id,
             fr_id=fr_id,
@@ -105,9 +143,7 @@ async def addFineGrainedFeed(
 
         # 向量化
         try:
-            vector = await vectorizeText(
-                f"{sub_dimension}{'\n' if sub_dimension else ''}{content}"
-            )
+            vector = await vectorizeText(buildFeedEmbeddingText(content, sub_dimension))
         except Exception as e:
             logger.error(f"Embedding generation failed: {str(e)}")
             return {"status": -10, "message": f"Embedding generation failed"}
@@ -119,15 +155,229 @@ async def addFineGrainedFeed(
 
         try:
             db.add(fine_grained_feed)
-            db.commit()
+            await db.commit()
         except Exception as e:
-            db.rollback()
+            await db.rollback()
             logger.error(f"Add FineGrainedFeed failed: {str(e)}")
             return {"status": -12, "message": "Add FineGrainedFeed failed"}
+        bumpRecallGeneration(_RECALL_CACHE_NAMESPACE, fr_id)
 
         return {"status": 200, "message": "Add FineGrainedFeed success"}
 
 
+class _bulkFeedUpsertItem(TypedDict, total=False):
+    action: Literal["add", "update", "conflict"]
+    dimension: FineGrainedFeedDimension
+    confidence: FineGrainedFeedConfidence
+    content: str
+    sub_dimension: str | None
+    target_feed_id: int | None
+    merged_content: str | None
+    conflict_old_value: str | None
+    conflict_detail: str | None
+
+
+async def bulkUpsertFineGrainedFeeds(
+    user_id: int,
+    fr_id: int,
+    original_source_id: int,
+    items: List[_bulkFeedUpsertItem],
+) -> dict:
+    """
+    批量落库细粒度信息（新增 / 更新 / 冲突+更新）
+    归属只校验一次，待向量化文本批量向量化，全部写入在同一事务中提交；
+    返回与 items 顺序一致的逐条结果
+    """
+    if not isinstance(user_id, int):
+        return {"status": -1, "message": "Invalid user_id"}
+    if not isinstance(fr_id, int):
+        return {"status": -2, "message": "Invalid fr_id"}
+    if not isinstance(original_source_id, int):
+        return {"status": -3, "message": "Invalid original_source_id"}
+    if not isinstance(items, list):
+        return {"status": -4, "message": "Invalid items"}
+
+    results: list[dict] = [{"status": 200, "message": "ok"} for _ in items]
+
+    # 逐条校验，并整理待向量化文本
+    texts_by_index: dict[int, str] = {}
+    for index, item in enumerate(items):
+        action = item.get("action") if isinstance(item, dict) else None
+        if action == "add":
+            content = item.get("content")
+            sub_dimension = item.get("sub_dimension")
+            if not isinstance(item.get("dimension"), FineGrainedFeedDimension):
+                results[index] = {"status": -5, "message": "Invalid dimension"}
+            elif not isinstance(item.get("confidence"), FineGrainedFeedConfidence):
+                results[index] = {"status": -6, "message": "Invalid confidence"}
+            elif not isinstance(content, str) or content.strip() == "":
+                results[index] = {"status": -7, "message": "content cannot be empty"}
+            elif sub_dimension is not None and not isinstance(sub_dimension, str):
+                results[index] = {"status": -8, "message": "Invalid sub_dimension"}
+            else:
+                texts_by_index[index] = buildFeedEmbeddingText(content, sub_dimension)
+        elif action in ("update", "conflict"):
+            merged_content = item.get("merged_content")
+            sub_dimension = item.get("sub_dimension")
+            if not isinstance(item.get("dimension"), FineGrainedFeedDimension):
+                results[index] = {"status": -5, "message": "Invalid dimension"}
+            elif not isinstance(item.get("target_feed_id"), int):
+                results[index] = {"status": -9, "message": "Invalid target_feed_id"}
+            elif not isinstance(merged_content, str) or merged_content.strip() == "":
+                results[index] = {
+                    "status": -7,
+                    "message": "merged_content cannot be empty",
+                }
+            elif sub_dimension is not None and not isinstance(sub_dimension, str):
+                results[index] = {"status": -8, "message": "Invalid sub_dimension"}
+            elif action == "conflict" and (
+                not isinstance(item.get("conflict_old_value"), str)
+                or item["conflict_old_value"].strip() == ""
+                or not isinstance(item.get("conflict_detail"), str)
+                or item["conflict_detail"].strip() == ""
+            ):
+                results[index] = {
+                    "status": -10,
+                    "message": "conflict_old_value and conflict_detail cannot be empty",
+                }
+            else:
+                texts_by_index[index] = merged_content.strip()
+        else:
+            results[index] = {"status": -11, "message": f"Unsupported action: {action}"}
+
+    if not texts_by_index:
+        return {"status": 200, "message": "Nothing to upsert", "results": results}
+
+    # 批量向量化；整批失败时逐条重试，隔离失败项
+    indexes = list(texts_by_index)
+    try:
+        vectors = await vectorizeTexts([texts_by_index[index] for index in indexes])
+    except Exception as e:
+        logger.warning(f"Batch embedding failed, retry one by one: {str(e)}")
+        vectors = await asyncio.gather(
+            *[vectorizeText(texts_by_index[index]) for index in indexes],
+            return_exceptions=True,
+        )
+    vector_by_index: dict[int, list[float]] = {}
+    for index, vector in zip(indexes, vectors):
+        if isinstance(vector, BaseException):
+            logger.error(f"Embedding generation failed: {str(vector)}")
+            results[index] = {"status": -12, "message": "Embedding generation failed"}
+        elif not isinstance(vector, list) or not vector:
+            results[index] = {"status": -13, "message": "Invalid embedding result"}
+        else:
+            vector_by_index[index] = vector
+    if not vector_by_index:
+        return {"status": 200, "message": "Nothing to upsert", "results": results}
+
+    embedding_model_name = os.getenv("EMBEDDING_MODEL_NAME") or ""
+    async with asession() as db:
+        # 归属只校验一次
+        fr = await acheckFigureAndRelationOwnership(db, user_id, fr_id)
+        if fr is None:
+            return {"status": -14, "message": "FigureAndRelation not found"}
+        original_source = await acheckOriginalSourceOwnership(
+            db=db,
+            user_id=user_id,
+            fr_id=fr_id,
+            original_source_id=original_source_id,
+        )
+        if original_source is None:
+            return {"status": -15, "message": "OriginalSource not found"}
+
+        # 一次加载全部待更新 feed
+        target_feed_ids = {
+            items[index]["target_feed_id"]
+            for index in vector_by_index
+            if items[index]["action"] in ("update", "conflict")
+        }
+        feeds_by_id: dict[int, FineGrainedFeed] = {}
+        if target_feed_ids:
+            feeds_by_id = {
+                feed.id: feed
+                for feed in await db.scalars(
+                    select(FineGrainedFeed).where(
+                        FineGrainedFeed.id.in_(target_feed_ids),
+                        FineGrainedFeed.fr_id == fr_id,
+                        FineGrainedFeed.is_deleted == False,
+                    )
+                )
+            }
+
+        # 按原顺序应用，同一 feed 被多次更新时与逐条执行结果一致
+        new_rows = []
+        for index in sorted(vector_by_index):
+            item = items[index]
+            vector = vector_by_index[index]
+            if item["action"] == "add":
+                sub_dimension = item.get("sub_dimension")
+                new_rows.append(
+                    FineGrainedFeed(
+                        fr_id=fr_id,
+                        original_source_id=original_source_id,
+                        dimension=item["dimension"],
+                        sub_dimension=sub_dimension,
+                        confidence=item["confidence"],
+                        content=item["content"].strip(),
+                        embedding=vector,
+                        embedding_model_name=embedding_model_name,
+                    )
+                )
+                continue
+
+            fine_grained_feed = feeds_by_id.get(item["target_feed_id"])
+            if fine_grained_feed is None:
+                results[index] = {"status": -16, "message": "FineGrainedFeed not found"}
+                continue
+            if item["action"] == "conflict":
+                new_rows.append(
+                    FineGrainedFeedConflict(
+                        fr_id=fr_id,
+                        dimension=item["dimension"],
+                        feed_ids=[fine_grained_feed.id],
+                        old_value=item["conflict_old_value"].strip(),
+                        new_value=(item.get("content") or item["merged_content"]).strip(),
+                        conflict_detail=item["conflict_detail"].strip(),
+                        status=ConflictStatus.PENDING,
+                    )
+                )
+            sub_dimension = item.get("sub_dimension")
+            old_content = fine_grained_feed.content
+            fine_grained_feed.original_source_id = original_source_id
+            fine_grained_feed.content = item["merged_content"].strip()
+            fine_grained_feed.sub_dimension = (
+                sub_dimension.strip() if isinstance(sub_dimension, str) else None
+            )
+            fine_grained_feed.embedding = vector
+            fine_grained_feed.embedding_model_name = embedding_model_name
+            new_rows.append(
+                FROverallUpdateLog(
+                    fr_id=fr_id,
+                    original_source_id=original_source_id,
+                    update_field_or_sub_dimension=fine_grained_feed.sub_dimension or "",
+                    update_dimension=fine_grained_feed.dimension,
+                    old_value=serialize2String(old_content),
+                    new_value=serialize2String(fine_grained_feed.content),
+                )
+            )
+
+        try:
+            # 同类行由 ORM 合并为批量 INSERT ... RETURNING / executemany UPDATE
+            db.add_all(new_rows)
+            await db.commit()
+        except Exception as e:
+            await db.rollback()
+            logger.error(f"Bulk upsert FineGrainedFeed failed: {str(e)}")
+            return {"status": -17, "message": "Bulk upsert FineGrainedFeed failed"}
+    bumpRecallGeneration(_RECALL_CACHE_NAMESPACE, fr_id)
+
+    return {
+        "status": 200,
+        "message": "Bulk upsert FineGrainedFeed success",
+        "results": results,
+    }
+
+
 def deleteFineGrainedFeed(
     user_id: int,
     fr_id: int,
@@ -165,6 +415,7 @@ def deleteFineGrainedFeed(
             db.rollback()
             logger.error(f"Delete FineGrainedFeed failed: {str(e)}")
             return {"status": -6, "message": "Delete FineGrainedFeed failed"}
+        bumpRecallGeneration(_RECALL_CACHE_NAMESPACE, fr_id)
         return {"status": 200, "message": "Delete FineGrainedFeed success"}
 
 
@@ -192,12 +443,12 @@ async def updateFineGrainedFeed(
     if new_sub_dimension is not None and not isinstance(new_sub_dimension, str):
         return {"status": -6, "message": "Invalid new_sub_dimension"}
 
-    with session() as db:
-        fr = checkFigureAndRelationOwnership(db, user_id, fr_id)
+    async with asession() as db:
+        fr = await acheckFigureAndRelationOwnership(db, user_id, fr_id)
         if fr is None:
             return {"status": -7, "message": "FigureAndRelation not found"}
 
-        original_source = checkOriginalSourceOwnership(
+        original_source = await acheckOriginalSourceOwnership(
             db=db,
             user_id=user_id,
             fr_id=fr_id,
@@ -206,14 +457,14 @@ async def updateFineGrainedFeed(
         if original_source is None:
             return {"status": -8, "message": "OriginalSource not found"}
 
-        fine_grained_feed = (
-            db.query(FineGrainedFeed)
-            .filter(
+        fine_grained_feed = await db.scalar(
+            select(FineGrainedFeed)
+            .where(
                 FineGrainedFeed.id == fine_grained_feed_id,
                 FineGrainedFeed.fr_id == fr_id,
                 FineGrainedFeed.is_deleted == False,
             )
-            .first()
+            .limit(1)
         )
         if fine_grained_feed is None:
             return {"status": -9, "message": "FineGrainedFeed not found"}
@@ -247,11 +498,12 @@ async def updateFineGrainedFeed(
         )
 
         try:
-            db.commit()
+            await db.commit()
         except Exception as e:
-            db.rollback()
+            await db.rollback()
             logger.error(f"Update FineGrainedFeed failed: {str(e)}")
             return {"status": -12, "message": "Update FineGrainedFeed failed"}
+        bumpRecallGeneration(_RECALL_CACHE_NAMESPACE, fr_id)
 
         return {"status": 200, "message": "Update FineGrainedFeed success"}
 
@@ -342,6 +594,13 @@ def getAllFineGrainedFeed(
         }
 
 
+def invalidateFineGrainedFeedRecallCache(fr_id: int) -> None:
+    """
+    使 FR 的召回缓存失效（FR 删除等 feed 之外的变更）
+    """
+    bumpRecallGeneration(_RECALL_CACHE_NAMESPACE, fr_id)
+
+
 class _recallScopeAndTopK(TypedDict):
     scope: FineGrainedFeedDimension | Literal["all"]
     top_k: int
@@ -352,9 +611,15 @@ async def recallFineGrainedFeeds(
     fr_id: int,
     scope: List[_recallScopeAndTopK],
     query: str | None = None,
+    query_vector: list[float] | None = None,
+    ef_search: int | None = None,
+    iterative_scan: str | None = None,
 ) -> dict:
     """
     召回细粒度信息
+    所有 scope 合并为一次 SQL（UNION ALL 各 scope 的向量扫描）；
+    可传入预先计算好的 query_vector，避免重复向量化；
+    ef_search / iterative_scan 为 HNSW 检索参数，未传入时取环境变量配置
     """
     if not isinstance(user_id, int):
         return {"status": -1, "message": "Invalid user_id"}
@@ -383,31 +648,51 @@ async def recallFineGrainedFeeds(
             return {"status": -10, "message": "Duplicate scope is not allowed"}
         seen_scope_items.add(item_scope)
         normalized_scope_cfg.append((item_scope, item_top_k))
+    if query_vector is not None and (
+        not isinstance(query_vector, list) or not query_vector
+    ):
+        return {"status": -6, "message": "Invalid embedding result"}
+    vector_search_error = checkVectorSearchOptions(ef_search, iterative_scan)
+    if vector_search_error is not None:
+        return {"status": -11, "message": vector_search_error}
+
+    # 召回缓存：同一 FR、scope 配置与 query 指纹命中时跳过向量化与 SQL；FR 的 feed 写入后代数变化即失效
+    cache_key = (
+        user_id,
+        tuple(
+            (item_scope if item_scope == "all" else item_scope.value, item_top_k)
+            for item_scope, item_top_k in normalized_scope_cfg
+        ),
+        queryFingerprint(query, query_vector),
+        ef_search,
+        iterative_scan,
+    )
+    generation = getRecallGeneration(_RECALL_CACHE_NAMESPACE, fr_id)
+    cached_results = getCachedRecall(_RECALL_CACHE_NAMESPACE, fr_id, cache_key)
+    if cached_results is not None:
+        return {
+            "status": 200,
+            "message": "Recall success",
+            "items": cached_results,
+        }
 
-    has_query = query is not None and query.strip() != ""
-    if has_query:
-        query = query.strip()
-    distance = None
-
-    if has_query:
+    if query_vector is not None:
+        # 已有向量（已在前面校验）：直接走向量召回逻辑
+        vector = query_vector
+    elif query is not None and query.strip() != "":
         # query 不为空：走向量召回逻辑
         try:
-            vector = await vectorizeText(query)
+            vector = await vectorizeText(query.strip())
         except Exception as e:
             logger.error(f"Embedding failed: {str(e)}")
             return {"status": -5, "message": "Embedding failed"}
         if not isinstance(vector, list) or not vector:
             return {"status": -6, "message": "Invalid embedding result"}
-        distance = FineGrainedFeed.embedding.cosine_distance(vector)
+    else:
+        vector = None
 
-    confidence_weight_map = {
-        FineGrainedFeedConfidence.VERBATIM: 1.0,
-        FineGrainedFeedConfidence.ARTIFACT: 0.85,
-        FineGrainedFeedConfidence.IMPRESSION: 0.7,
-    }
-
-    with session() as db:
-        fr = checkFigureAndRelationOwnership(db, user_id, fr_id)
+    async with asession() as db:
+        fr = await acheckFigureAndRelationOwnership(db, user_id, fr_id)
         if fr is None:
             return {"status": -7, "message": "FigureAndRelation not found"}
         try:
@@ -416,72 +701,33 @@ async def recallFineGrainedFeeds(
             logger.error(f"Recall FineGrainedFeed failed: {str(e)}")
             return {"status": -8, "message": "Recall FineGrainedFeed failed"}
 
-        results = {}
-        # 分别按 scope 召回
-        for scope_item, scope_top_k in normalized_scope_cfg:
-            if has_query:
-                # query 不为空：走向量召回逻辑
-                db_query = db.query(FineGrainedFeed, distance.label("distance")).filter(
-                    FineGrainedFeed.fr_id == fr_id,
-                    FineGrainedFeed.is_deleted == False,
-                )
-            else:
-                # query 为空：先获取全部 feeds
-                db_query = db.query(FineGrainedFeed).filter(
-                    FineGrainedFeed.fr_id == fr_id,
-                    FineGrainedFeed.is_deleted == False,
-                )
-            if scope_item != "all":
-                # 按 scope 筛选
-                db_query = db_query.filter(FineGrainedFeed.dimension == scope_item)
-
-            if has_query:
-                candidates = (
-                    db_query.order_by(distance.asc())
-                    .limit(max(vector_candidates_limit, scope_top_k))
-                    .all()
-                )
-            else:
-                candidates = db_query.all()
-
-            per_scope_results = []
-            # 对每个召回项计算 score，重排
-            for candidate in candidates:
-                if has_query:
-                    fine_grained_feed, dist = candidate
-                    semantic_score = max(0.0, min(1.0, 1 - float(dist) / 2))
-                else:
-                    fine_grained_feed = candidate
-                    dist = None
-                    semantic_score = None
-                confidence_weight = confidence_weight_map.get(
-                    fine_grained_feed.confidence, 0.7
-                )
-                created_at = fine_grained_feed.created_at
-
-                decay = timeDecay(created_at) if created_at else 1.0
-                if has_query:
-                    # query 不为空：语义分和置信度共同计算分数
-                    raw_score = semantic_score * 0.8 + confidence_weight * 0.2
-                else:
-                    # query 为空：仅用置信度计算分数
-                    raw_score = confidence_weight
-                score = raw_score * decay
-
-                per_scope_results.append(
-                    {
-                        "distance": float(dist) if dist is not None else None,
-                        "score": score,
-                        "semantic_score": semantic_score,
-                        "confidence_weight": confidence_weight,
-                        "time_decay": decay,
-                        "fine_grained_feed": fine_grained_feed.toJson(
-                            exclude=["embedding", "embedding_model_name"]
-                        ),
-                    }
+        try:
+            # 开启进程内索引时优先精确召回，FR 过大或索引不可用时走数据库
+            results_by_scope = await queryFRVectorIndex(
+                db,
+                fr_id=fr_id,
+                generation=generation,
+                vector=vector,
+                scope_cfg=normalized_scope_cfg,
+                candidates_limit=vector_candidates_limit,
+            )
+            if results_by_scope is None:
+                await applyVectorSearchOptions(db, ef_search, iterative_scan)
+                results_by_scope = await _queryScoredFeedsByScope(
+                    db,
+                    fr_id=fr_id,
+                    vector=vector,
+                    scope_cfg=normalized_scope_cfg,
+                    candidates_limit=vector_candidates_limit,
                 )
+        except Exception as e:
+            logger.error(f"Recall FineGrainedFeed failed: {str(e)}")
+            return {"status": -8, "message": "Recall FineGrainedFeed failed"}
 
-            per_scope_results.sort(key=lambda x: x["score"], reverse=True)
+        results = {}
+        for scope_index, (scope_item, scope_top_k) in enumerate(normalized_scope_cfg):
+            # 库内已按 score 排序并截断到 top_k
+            per_scope_results = results_by_scope.get(scope_index, [])
             if scope_item != "all":
                 results[scope_item.value] = per_scope_results[:scope_top_k]
             else:
@@ -496,6 +742,7 @@ async def recallFineGrainedFeeds(
                 for dimension, items in grouped_by_dimension.items():
                     results.setdefault(dimension, []).extend(items)
 
+        setCachedRecall(_RECALL_CACHE_NAMESPACE, fr_id, cache_key, generation, results)
         return {
             "status": 200,
             "message": "Recall success",
@@ -503,6 +750,119 @@ async def recallFineGrainedFeeds(
         }
 
 
+# 召回结果只投影这些列，不回传 embedding
+_RECALL_PROJECTION_KEYS = [
+    column.key
+    for column in FineGrainedFeed.__table__.columns
+    if column.key not in ("embedding", "embedding_model_name")
+]
+
+
+async def _queryScoredFeedsByScope(
+    db,
+    fr_id: int,
+    vector: list[float] | None,
+    scope_cfg: list[tuple[FineGrainedFeedDimension | Literal["all"], int]],
+    candidates_limit: int,
+) -> dict[int, list[dict]]:
+    """
+    在 PostgreSQL 中完成召回与打分：
+    每个 scope 各自一段候选扫描（有向量时 ORDER BY distance LIMIT n，可走 HNSW），
+    UNION ALL 后在库内计算 score，并按 scope 取 top_k，只回传投影列
+    返回 scope 下标 -> 按 score 降序的召回项
+    """
+    projection = [
+        FineGrainedFeed.__table__.c[key] for key in _RECALL_PROJECTION_KEYS
+    ]
+    distance = (
+        FineGrainedFeed.embedding.cosine_distance(vector) if vector is not None else None
+    )
+    branches = []
+    for scope_index, (scope_item, scope_top_k) in enumerate(scope_cfg):
+        branch = select(
+            *projection,
+            cast(literal(scope_index), Integer).label("scope_index"),
+            cast(literal(scope_top_k), Integer).label("scope_top_k"),
+            (
+                distance.label("distance")
+                if distance is not None
+                else cast(null(), Float).label("distance")
+            ),
+        ).where(
+            FineGrainedFeed.fr_id == fr_id,
+            FineGrainedFeed.is_deleted == False,
+        )
+        if scope_item != "all":
+            # 按 scope 筛选；维度以字面量内联，规划器才能匹配按维度的部分 HNSW 索引
+            branch = branch.where(
+                FineGrainedFeed.dimension
+                == literal(
+                    scope_item, FineGrainedFeed.dimension.type, literal_execute=True
+                )
+            )
+        if distance is not None:
+            branch = branch.order_by(distance.asc()).limit(
+                max(candidates_limit, scope_top_k)
+            )
+        branches.append(branch)
+    candidates = (
+        union_all(*branches) if len(branches) > 1 else branches[0]
+    ).subquery("candidates")
+
+    confidence_weight = case(
+        (candidates.c.confidence == FineGrainedFeedConfidence.VERBATIM, 1.0),
+        (candidates.c.confidence == FineGrainedFeedConfidence.ARTIFACT, 0.85),
+        (candidates.c.confidence == FineGrainedFeedConfidence.IMPRESSION, 0.7),
+        else_=0.7,
+    )
+    decay = timeDecaySQL(candidates.c.created_at)
+    if vector is not None:
+        # query 不为空：语义分和置信度共同计算分数
+        semantic_score = semanticScoreSQL(candidates.c.distance)
+        score = (semantic_score * 0.8 + confidence_weight * 0.2) * decay
+    else:
+        # query 为空：仅用置信度计算分数
+        semantic_score = cast(null(), Float)
+        score = confidence_weight * decay
+    scored = select(
+        candidates,
+        semantic_score.label("semantic_score"),
+        confidence_weight.label("confidence_weight"),
+        decay.label("time_decay"),
+        score.label("score"),
+        func.row_number()
+        .over(partition_by=candidates.c.scope_index, order_by=score.desc())
+        .label("score_rank"),
+    ).subquery("scored")
+
+    rows = (
+        await db.execute(
+            select(scored)
+            .where(scored.c.score_rank <= scored.c.scope_top_k)
+            .order_by(scored.c.scope_index, scored.c.score_rank)
+        )
+    ).mappings()
+
+    results_by_scope: dict[int, list[dict]] = {}
+    for row in rows:
+        dist = row["distance"]
+        results_by_scope.setdefault(row["scope_index"], []).append(
+            {
+                "distance": float(dist) if dist is not None else None,
+                "score": float(row["score"]),
+                "semantic_score": (
+                    float(row["semantic_score"])
+                    if row["semantic_score"] is not None
+                    else None
+                ),
+                "confidence_weight": float(row["confidence_weight"]),
+                "time_decay": float(row["time_decay"]),
+                "fine_grained_feed": projectionToJson(row, _RECALL_PROJECTION_KEYS),
+            }
+        )
+    return results_by_scope
+
+
 def addOriginalSource(
     user_id: int,
     fr_id: int,
@@ -0,0 +1,272 @@
+"""
+进程内 per-FR 向量索引（可选）：
+每个 FR 一个 float32 归一化矩阵，召回时精确点积 top-k，打分口径与库内召回一致；
+按需懒加载，feed 写入后召回代数变化即重新加载，按 FR 行数做 LRU 淘汰；
+召回代数只在本进程内递增，索引项另设 TTL，兜底其他进程（job worker 等）的写入
+"""
+
+import logging
+import math
+import os
+import threading
+import time
+from collections import OrderedDict
+from datetime import timezone
+from typing import Any, Literal, TypedDict
+
+from sqlalchemy import select
+
+from src.database.enums import FineGrainedFeedConfidence, FineGrainedFeedDimension
+from src.database.models import FineGrainedFeed
+from src.utils.index import projectionToJson
+
+try:
+    import numpy as np
+except ImportError:  # numpy 随 pgvector 安装；缺失时索引不可用，召回走数据库
+    np = None
+
+
+logger = logging.getLogger(__name__)
+
+# 与库内召回一致：只投影非 embedding 列
+_PROJECTION_KEYS = [
+    column.key
+    for column in FineGrainedFeed.__table__.columns
+    if column.key not in ("embedding", "embedding_model_name")
+]
+# 与库内召回的置信度权重一致
+_CONFIDENCE_WEIGHTS = {
+    FineGrainedFeedConfidence.VERBATIM: 1.0,
+    FineGrainedFeedConfidence.ARTIFACT: 0.85,
+    FineGrainedFeedConfidence.IMPRESSION: 0.7,
+}
+
+
+class _FRVectorIndexEntry(TypedDict):
+    generation: int
+    # 行数超过单 FR 上限时为 None，表示该 FR 走数据库召回
+    matrix: Any
+    dimensions: Any
+    confidence_weights: Any
+    created_epochs: Any
+    feeds: list[dict]
+    rows: int
+    # 加载时间（time.monotonic()），超过 TTL 后重新加载
+    loaded_at: float
+
+
+# 进程内 LRU：fr_id -> 索引项
+_fr_vector_indexes: "OrderedDict[int, _FRVectorIndexEntry]" = OrderedDict()
+_fr_vector_index_lock = threading.Lock()
+# 已开启索引但缺少 numpy 时只告警一次
+_numpy_missing_warned = False
+
+
+def isFRVectorIndexEnabled() -> bool:
+    global _numpy_missing_warned
+    if (os.getenv("FR_VECTOR_INDEX") or "false").lower() != "true":
+        return False
+    if np is None:
+        if not _numpy_missing_warned:
+            _numpy_missing_warned = True
+            logger.warning(
+                "FR_VECTOR_INDEX=true but numpy is not installed, recall falls back to database"
+            )
+        return False
+    return True
+
+
+def _putIndex(fr_id: int, entry: _FRVectorIndexEntry) -> None:
+    max_total_rows = int(os.getenv("FR_VECTOR_INDEX_MAX_TOTAL_ROWS") or 50000)
+    with _fr_vector_index_lock:
+        _fr_vector_indexes[fr_id] = entry
+        _fr_vector_indexes.move_to_end(fr_id)
+        total_rows = sum(item["rows"] for item in _fr_vector_indexes.values())
+        # 按行数淘汰最久未使用的 FR，至少保留当前 FR
+        while total_rows > max_total_rows and len(_fr_vector_indexes) > 1:
+            _, evicted = _fr_vector_indexes.popitem(last=False)
+            total_rows -= evicted["rows"]
+
+
+async def _loadIndex(db, fr_id: int, generation: int) -> _FRVectorIndexEntry:
+    """
+    从数据库加载 FR 的全部有效 feed 构建索引
+    """
+    max_rows = int(os.getenv("FR_VECTOR_INDEX_MAX_ROWS_PER_FR") or 5000)
+    rows = (
+        (
+            await db.execute(
+                select(
+                    *[FineGrainedFeed.__table__.c[key] for key in _PROJECTION_KEYS],
+                    FineGrainedFeed.embedding,
+                )
+                .where(
+                    FineGrainedFeed.fr_id == fr_id,
+                    FineGrainedFeed.is_deleted == False,
+                )
+                .order_by(FineGrainedFeed.id.asc())
+                .limit(max_rows + 1)
+            )
+        )
+        .mappings()
+        .all()
+    )
+    if len(rows) > max_rows:
+        return {
+            "generation": generation,
+            "matrix": None,
+            "dimensions": None,
+            "confidence_weights": None,
+            "created_epochs": None,
+            "feeds": [],
+            "rows": 0,
+            "loaded_at": time.monotonic(),
+        }
+
+    now = time.time()
+    vector_dims = next(
+        (len(row["embedding"]) for row in rows if row["embedding"] is not None), 0
+    )
+    matrix = np.zeros((len(rows), vector_dims), dtype=np.float32)
+    for i, row in enumerate(rows):
+        if row["embedding"] is not None:
+            matrix[i] = np.asarray(row["embedding"], dtype=np.float32)
+    norms = np.linalg.norm(matrix, axis=1)
+    norms[norms == 0] = 1
+    matrix /= norms[:, None]
+
+    return {
+        "generation": generation,
+        "matrix": matrix,
+        "dimensions": np.array(
+            [
+                row["dimension"].value if row["dimension"] is not None else ""
+                for row in rows
+            ],
+            dtype=object,
+        ),
+        "confidence_weights": np.array(
+            [_CONFIDENCE_WEIGHTS.get(row["confidence"], 0.7) for row in rows],
+            dtype=np.float64,
+        ),
+        "created_epochs": np.array(
+            [
+                (
+                    row["created_at"].replace(tzinfo=timezone.utc).timestamp()
+                    if row["created_at"] is not None
+                    else now
+                )
+                for row in rows
+            ],
+            dtype=np.float64,
+        ),
+        "feeds": [projectionToJson(row, _PROJECTION_KEYS) for row in rows],
+        "rows": len(rows),
+        "loaded_at": time.monotonic(),
+    }
+
+
+def _scoreScope(
+    entry: _FRVectorIndexEntry,
+    vector: Any,
+    scope_item: FineGrainedFeedDimension | Literal["all"],
+    top_k: int,
+    candidates_limit: int,
+) -> list[dict]:
+    """
+    单个 scope：精确点积取候选，再按语义分、置信度、时间衰减打分取 top_k
+    """
+    if scope_item == "all":
+        indices = np.arange(entry["rows"])
+    else:
+        indices = np.flatnonzero(entry["dimensions"] == scope_item.value)
+    if indices.size == 0:
+        return []
+
+    distances = None
+    semantic_scores = None
+    if vector is not None:
+        distances = 1.0 - (entry["matrix"][indices] @ vector).astype(np.float64)
+        limit = max(candidates_limit, top_k)
+        if indices.size > limit:
+            candidates = np.argpartition(distances, limit - 1)[:limit]
+            indices, distances = indices[candidates], distances[candidates]
+
+    half_life_days = int(os.getenv("HALF_LIFE_DAYS"))
+    delta_days = np.floor((time.time() - entry["created_epochs"][indices]) / 86400)
+    decays = np.exp(-delta_days / half_life_days)
+    confidence_weights = entry["confidence_weights"][indices]
+    if distances is not None:
+        semantic_scores = np.clip(1 - distances / 2, 0.0, 1.0)
+        scores = (semantic_scores * 0.8 + confidence_weights * 0.2) * decays
+    else:
+        scores = confidence_weights * decays
+
+    order = np.argsort(-scores, kind="stable")[:top_k]
+    return [
+        {
+            "distance": float(distances[i]) if distances is not None else None,
+            "score": float(scores[i]),
+            "semantic_score": (
+                float(semantic_scores[i]) if semantic_scores is not None else None
+            ),
+            "confidence_weight": float(confidence_weights[i]),
+            "time_decay": float(decays[i]),
+            "fine_grained_feed": dict(entry["feeds"][indices[i]]),
+        }
+        for i in order
+    ]
+
+
+async def queryFRVectorIndex(
+    db,
+    fr_id: int,
+    generation: int,
+    vector: list[float] | None,
+    scope_cfg: list[tuple[FineGrainedFeedDimension | Literal["all"], int]],
+    candidates_limit: int,
+) -> dict[int, list[dict]] | None:
+    """
+    用进程内索引召回，返回格式与 _queryScoredFeedsByScope 一致；
+    索引未开启或 FR 行数超过上限时返回 None，由调用方走数据库召回
+    generation 为当前 FR 的召回代数，与索引项不一致或索引项超过 TTL 时重新加载
+    """
+    if not isFRVectorIndexEnabled():
+        return None
+
+    ttl_seconds = float(os.getenv("FR_VECTOR_INDEX_TTL_SECONDS") or 120)
+    with _fr_vector_index_lock:
+        entry = _fr_vector_indexes.get(fr_id)
+        if (
+            entry is not None
+            and entry["generation"] == generation
+            and time.monotonic() - entry["loaded_at"] < ttl_seconds
+        ):
+            _fr_vector_indexes.move_to_end(fr_id)
+        else:
+            entry = None
+    if entry is None:
+        entry = await _loadIndex(db, fr_id, generation)
+        _putIndex(fr_id, entry)
+        logger.info(f"FR vector index loaded, fr_id={fr_id}, rows={entry['rows']}")
+    if entry["matrix"] is None:
+        return None
+    if entry["rows"] == 0:
+        return {scope_index: [] for scope_index in range(len(scope_cfg))}
+
+    query = None
+    if vector is not None:
+        query = np.asarray(vector, dtype=np.float32)
+        if entry["matrix"].shape[1] != query.shape[0]:
+            return None
+        norm = float(np.linalg.norm(query))
+        if not math.isfinite(norm) or norm == 0:
+            return None
+        query = query / norm
+
+    return {
+        scope_index: _scoreScope(
+            entry, query, scope_item, scope_top_k, candidates_limit
+        )
+        for scope_index, (scope_item, scope_top_k) in enumerate(scope_cfg)
+    }
@@ -0,0 +1,387 @@
+import logging
+import os
+from datetime import datetime, timedelta, timezone
+from typing import Any
+
+from sqlalchemy import exists, func, select, text, update
+from sqlalchemy.dialects.postgresql import insert
+from sqlalchemy.exc import IntegrityError
+from sqlalchemy.orm import aliased
+
+from src.database.enums import JobStatus, JobType
+from src.database.index import asession, session
+from src.database.models import Job
+
+logger = logging.getLogger(__name__)
+
+
+def _utcNow() -> datetime:
+    return datetime.now(timezone.utc).replace(tzinfo=None)
+
+
+def _dbUtcNow():
+    """
+    数据库侧当前 UTC 时间（与 naive UTC 的 DateTime 列比较）
+    """
+    return func.timezone("UTC", func.now())
+
+
+def enqueueJob(
+    user_id: int,
+    job_type: JobType,
+    payload: dict[str, Any],
+    fr_id: int | None = None,
+    dedup_key: str | None = None,
+    max_attempts: int | None = None,
+) -> dict[str, Any]:
+    """
+    提交后台任务；相同 dedup_key 已有待执行任务时不重复提交，直接返回已有任务
+    """
+    if not isinstance(user_id, int):
+        return {"status": -1, "message": "Invalid user_id"}
+    if not isinstance(job_type, JobType):
+        return {"status": -2, "message": "Invalid job_type"}
+    if not isinstance(payload, dict):
+        return {"status": -3, "message": "Payload must be a dict"}
+    if max_attempts is None:
+        max_attempts = int(os.getenv("JOB_MAX_ATTEMPTS") or 3)
+
+    with session() as db:
+        try:
+            stmt = (
+                insert(Job)
+                .values(
+                    job_type=job_type,
+                    user_id=user_id,
+                    fr_id=fr_id,
+                    payload=payload,
+                    dedup_key=dedup_key,
+                    status=JobStatus.PENDING,
+                    attempts=0,
+                    max_attempts=max(1, max_attempts),
+                    run_after=_utcNow(),
+                    created_at=_utcNow(),
+                )
+                .on_conflict_do_nothing(
+                    index_elements=[Job.dedup_key],
+                    index_where=text("status = 'PENDING'"),
+                )
+                .returning(Job.id)
+            )
+            job_id = None
+            deduplicated = False
+            # 冲突后再查询已有任务之间，该任务可能已被 worker 领取（不再是 PENDING），此时重新插入
+            for _ in range(2):
+                job_id = db.execute(stmt).scalar()
+                if job_id is not None:
+                    deduplicated = False
+                    break
+                job_id = db.execute(
+                    select(Job.id).where(
+                        Job.dedup_key == dedup_key,
+                        Job.status == JobStatus.PENDING,
+                    )
+                ).scalar()
+                if job_id is not None:
+                    deduplicated = True
+                    break
+            if job_id is None:
+                db.rollback()
+                return {"status": -4, "message": "Enqueue job failed"}
+            # 排在该任务之前的待执行任务数
+            queue_position = db.execute(
+                select(func.count(Job.id)).where(
+                    Job.status == JobStatus.PENDING,
+                    Job.id < job_id,
+                )
+            ).scalar()
+            db.commit()
+        except Exception as e:
+            db.rollback()
+            logger.error(f"Enqueue job failed: {str(e)}")
+            return {"status": -4, "message": "Enqueue job failed"}
+
+    return {
+        "status": 200,
+        "message": "Job already pending" if deduplicated else "Enqueue job success",
+        "job_id": job_id,
+        "deduplicated": deduplicated,
+        "queue_position": queue_position,
+    }
+
+
+def getJob(user_id: int, job_id: int) -> dict[str, Any]:
+    """
+    获取任务详情
+    """
+    if not isinstance(user_id, int):
+        return {"status": -1, "message": "Invalid user_id"}
+    if not isinstance(job_id, int):
+        return {"status": -2, "message": "Invalid job_id"}
+
+    with session() as db:
+        job = (
+            db.query(Job)
+            .filter(
+                Job.id == job_id,
+                Job.user_id == user_id,
+            )
+            .first()
+        )
+        if not job:
+            return {"status": -3, "message": "Job not found"}
+        return {
+            "status": 200,
+            "message": "Get job success",
+            "job": job.toJson(),
+        }
+
+
+def listJobs(
+    user_id: int,
+    status: JobStatus | None = None,
+    limit: int = 20,
+) -> dict[str, Any]:
+    """
+    获取当前用户的任务列表（按创建时间倒序，不包含 payload / result）
+    """
+    if not isinstance(user_id, int):
+        return {"status": -1, "message": "Invalid user_id"}
+    if limit <= 0:
+        return {"status": -2, "message": "Limit must be greater than 0"}
+
+    with session() as db:
+        query = db.query(Job).filter(Job.user_id == user_id)
+        if status is not None:
+            query = query.filter(Job.status == status)
+        jobs = query.order_by(Job.id.desc()).limit(limit).all()
+        return {
+            "status": 200,
+            "message": "List jobs success",
+            "jobs": [job.toJson(exclude=["payload", "result"]) for job in jobs],
+        }
+
+
+def cancelJob(user_id: int, job_id: int) -> dict[str, Any]:
+    """
+    取消待执行任务（执行中的任务不可取消）
+    """
+    if not isinstance(user_id, int):
+        return {"status": -1, "message": "Invalid user_id"}
+    if not isinstance(job_id, int):
+        return {"status": -2, "message": "Invalid job_id"}
+
+    with session() as db:
+        try:
+            canceled_id = db.execute(
+                update(Job)
+                .where(
+                    Job.id == job_id,
+                    Job.user_id == user_id,
+                    Job.status == JobStatus.PENDING,
+                )
+                .values(status=JobStatus.CANCELED, finished_at=_utcNow())
+                .returning(Job.id)
+            ).scalar()
+            db.commit()
+        except Exception as e:
+            db.rollback()
+            logger.error(f"Cancel job failed: {str(e)}")
+            return {"status": -4, "message": "Cancel job failed"}
+        if canceled_id is None:
+            return {"status": -3, "message": "Job not found or not pending"}
+        return {"status": 200, "message": "Cancel job success"}
+
+
+async def claimJob(worker_id: str) -> dict[str, Any] | None:
+    """
+    领取一个到期的待执行任务（FOR UPDATE SKIP LOCKED，多 worker / 多机器安全）；
+    同一 FR 已有执行中的任务时跳过该 FR 的其他任务，保证同一 FR 顺序执行；
+    NOT EXISTS 看不到其他 worker 尚未提交的领取，由部分唯一索引 uq_job_running_fr_id 兜底，冲突时视为未领取到
+    """
+    pending = aliased(Job, name="pending")
+    running = aliased(Job, name="running")
+    candidate = (
+        select(pending.id)
+        .where(
+            pending.status == JobStatus.PENDING,
+            pending.run_after <= _dbUtcNow(),
+            ~exists().where(
+                running.fr_id == pending.fr_id,
+                running.status == JobStatus.RUNNING,
+            ),
+        )
+        .order_by(pending.run_after.asc(), pending.id.asc())
+        .limit(1)
+        .with_for_update(skip_locked=True)
+        .scalar_subquery()
+    )
+    async with asession() as db:
+        try:
+            job = (
+                await db.execute(
+                    update(Job)
+                    .where(Job.id == candidate)
+                    .values(
+                        status=JobStatus.RUNNING,
+                        attempts=Job.attempts + 1,
+                        locked_by=worker_id,
+                        locked_at=_dbUtcNow(),
+                    )
+                    .returning(Job)
+                )
+            ).scalar()
+            await db.commit()
+        except IntegrityError:
+            # 同一 FR 的另一个任务刚被其他 worker 领取，下次轮询时会被 NOT EXISTS 跳过
+            await db.rollback()
+            logger.info("Claim job skipped: FR already has a running job")
+            return None
+        except Exception as e:
+            await db.rollback()
+            logger.error(f"Claim job failed: {str(e)}")
+            return None
+        return job.toJson() if job is not None else None
+
+
+async def heartbeatJob(job_id: int, worker_id: str) -> None:
+    """
+    刷新执行中任务的心跳，避免长任务被当作失联任务回收
+    """
+    async with asession() as db:
+        try:
+            await db.execute(
+                update(Job)
+                .where(
+                    Job.id == job_id,
+                    Job.locked_by == worker_id,
+                    Job.status == JobStatus.RUNNING,
+                )
+                .values(locked_at=_dbUtcNow())
+            )
+            await db.commit()
+        except Exception as e:
+            await db.rollback()
+            logger.warning(f"Heartbeat job failed: {str(e)}")
+
+
+async def completeJob(job_id: int, result: dict[str, Any] | None) -> None:
+    """
+    标记任务成功
+    """
+    async with asession() as db:
+        try:
+            await db.execute(
+                update(Job)
+                .where(Job.id == job_id)
+                .values(
+                    status=JobStatus.SUCCEEDED,
+                    result=result,
+                    last_error=None,
+                    locked_by=None,
+                    finished_at=_dbUtcNow(),
+                )
+            )
+            await db.commit()
+        except Exception as e:
+            await db.rollback()
+            logger.error(f"Complete job failed: {str(e)}")
+
+
+async def _settleFailedAttempt(db, job: Job, error: str, run_after) -> str:
+    """
+    结束一次失败的执行（需在事务内调用，由调用方提交）：
+    未达到最大尝试次数时重新入队，返回 "retry"；
+    同 dedup_key 已有待执行任务（部分唯一索引 uq_job_pending_dedup_key 冲突）时不再入队，置为 FAILED，返回 "superseded"；
+    达到最大尝试次数时置为 FAILED，返回 "failed"
+    """
+    values = {"last_error": (error or "")[:2000], "locked_by": None}
+    if job.attempts < job.max_attempts:
+        try:
+            async with db.begin_nested():
+                await db.execute(
+                    update(Job)
+                    .where(Job.id == job.id)
+                    .values(status=JobStatus.PENDING, run_after=run_after, **values)
+                )
+            return "retry"
+        except IntegrityError:
+            values["last_error"] = (
+                f"Superseded by a pending job with the same dedup_key; {error or ''}"
+            )[:2000]
+            outcome = "superseded"
+    else:
+        outcome = "failed"
+    await db.execute(
+        update(Job)
+        .where(Job.id == job.id)
+        .values(status=JobStatus.FAILED, finished_at=_dbUtcNow(), **values)
+    )
+    return outcome
+
+
+async def failJob(job_id: int, error: str) -> dict[str, Any]:
+    """
+    标记任务失败：未达到最大尝试次数时按指数退避重新入队，否则置为 FAILED；
+    已有同 dedup_key 的待执行任务时由该任务接替，本任务置为 FAILED
+    """
+    base_seconds = float(os.getenv("JOB_RETRY_BASE_SECONDS") or 10)
+    max_seconds = float(os.getenv("JOB_RETRY_MAX_SECONDS") or 600)
+    async with asession() as db:
+        try:
+            job = await db.get(Job, job_id)
+            if job is None:
+                return {"status": -1, "message": "Job not found"}
+            delay = min(max_seconds, base_seconds * 2 ** max(0, job.attempts - 1))
+            outcome = await _settleFailedAttempt(
+                db, job, error, _utcNow() + timedelta(seconds=delay)
+            )
+            await db.commit()
+        except Exception as e:
+            await db.rollback()
+            logger.error(f"Fail job failed: {str(e)}")
+            return {"status": -2, "message": "Fail job failed"}
+    return {
+        "status": 200,
+        "message": "Fail job success",
+        "will_retry": outcome == "retry",
+        "superseded": outcome == "superseded",
+    }
+
+
+async def recoverStaleJobs() -> int:
+    """
+    回收心跳超时的执行中任务（worker 崩溃 / 重启）：逐个重新置为待执行，
+    已达最大尝试次数或已有同 dedup_key 待执行任务的置为 FAILED
+    """
+    timeout_seconds = int(os.getenv("JOB_LOCK_TIMEOUT_SECONDS") or 90)
+    outcomes: dict[int, str] = {}
+    async with asession() as db:
+        try:
+            stale_jobs = (
+                (
+                    await db.execute(
+                        select(Job)
+                        .where(
+                            Job.status == JobStatus.RUNNING,
+                            Job.locked_at
+                            < _dbUtcNow() - timedelta(seconds=timeout_seconds),
+                        )
+                        .with_for_update(skip_locked=True)
+                    )
+                )
+                .scalars()
+                .all()
+            )
+            for job in stale_jobs:
+                outcomes[job.id] = await _settleFailedAttempt(
+                    db, job, "Worker lost, job recovered", _dbUtcNow()
+                )
+            await db.commit()
+        except Exception as e:
+            await db.rollback()
+            logger.error(f"Recover stale jobs failed: {str(e)}")
+            return 0
+    if outcomes:
+        logger.warning(f"Recovered stale jobs: {outcomes}")
+    return len(outcomes)
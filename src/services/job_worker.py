@@ -0,0 +1,205 @@
+import asyncio
+import logging
+import os
+import socket
+import time
+import uuid
+from typing import Any, Awaitable, Callable
+
+from src.database.enums import JobType
+from src.services.job import (
+    claimJob,
+    completeJob,
+    failJob,
+    heartbeatJob,
+    recoverStaleJobs,
+)
+
+logger = logging.getLogger(__name__)
+
+
+class JobError(Exception):
+    """
+    任务执行失败（会按退避策略重试）
+    """
+
+
+async def _notifyLark(
+    payload: dict[str, Any],
+    title: str,
+    content: str,
+    theme: str,
+) -> None:
+    """
+    任务由飞书发起时（payload 带 open_id）回传通知；通知失败不影响任务状态
+    """
+    open_id = payload.get("open_id")
+    if not open_id:
+        return
+    try:
+        # 延迟导入：CLI worker 不依赖飞书配置
+        from src.channels.lark.integration.utils import sendCard2OpenId
+
+        delivered = await asyncio.wrap_future(
+            sendCard2OpenId(
+                open_id=open_id,
+                title=title,
+                content=content,
+                theme=theme,
+            )
+        )
+        if not delivered:
+            logger.warning(f"Fail to notify lark, open_id={open_id}")
+    except Exception as e:
+        logger.warning(f"Fail to notify lark: {e}", exc_info=True)
+
+
+async def _runFRBuildingJob(job: dict[str, Any]) -> dict[str, Any]:
+    """
+    完善人物画像任务
+    """
+    from src.agents.graphs.FRBuildingGraph.graph import getFRBuildingGraph
+
+    payload = job.get("payload") or {}
+    figure_name = payload.get("figure_name") or f"fr_id={job.get('fr_id')}"
+
+    async def _onQueued(position: int, reason: str) -> None:
+        if reason == "fr":
+            content = f"**{figure_name}** 前面还有 `{position}` 个画像完善任务，已进入排队，轮到后自动开始"
+        else:
+            content = f"当前画像完善任务较多，已进入排队（第 `{position}` 位），轮到后自动开始"
+        await _notifyLark(payload, "任务排队中", content, "yellow")
+
+    init_state = {
+        "request": {
+            "user_id": job.get("user_id"),
+            "fr_id": job.get("fr_id"),
+            "raw_content": payload.get("raw_content") or "",
+        },
+    }
+    start_time = time.perf_counter()
+    async with getFRBuildingGraph(job.get("fr_id"), on_queued=_onQueued) as graph:
+        res = await graph.ainvoke(init_state)
+    end_time = time.perf_counter()
+
+    logger.info(f"Successfully build persona for {figure_name}")
+    await _notifyLark(
+        payload,
+        "人物画像完善成功",
+        f"已完成 **{figure_name}** 人物画像完善，耗时 `{end_time - start_time:.2f}s`",
+        "green",
+    )
+    # 发送完善报告
+    fr_building_report = res.get("fr_building_report")
+    report_text = (
+        fr_building_report.strip() if isinstance(fr_building_report, str) else ""
+    )
+    if report_text:
+        await _notifyLark(payload, f"{figure_name} 画像完善报告", report_text, "violet")
+    return {"fr_building_report": report_text}
+
+
+async def _runSyncFeedsToFRCoreJob(job: dict[str, Any]) -> dict[str, Any]:
+    """
+    同步细粒度信息到 FR core 字段任务
+    """
+    from src.services.figure_and_relation import syncFeedsToFRCore
+
+    payload = job.get("payload") or {}
+    res = await syncFeedsToFRCore(
+        user_id=job.get("user_id"),
+        fr_id=job.get("fr_id"),
+        force=bool(payload.get("force", False)),
+    )
+    if res.get("status") != 200:
+        raise JobError(f"{res.get('status')}: {res.get('message')}")
+    return res
+
+
+_JOB_HANDLERS: dict[str, Callable[[dict[str, Any]], Awaitable[dict[str, Any]]]] = {
+    JobType.FR_BUILDING.value: _runFRBuildingJob,
+    JobType.SYNC_FEEDS_TO_FR_CORE.value: _runSyncFeedsToFRCoreJob,
+}
+
+
+async def _heartbeatLoop(job_id: int, worker_id: str) -> None:
+    interval = float(os.getenv("JOB_HEARTBEAT_SECONDS") or 30)
+    while True:
+        await asyncio.sleep(interval)
+        await heartbeatJob(job_id, worker_id)
+
+
+async def _executeJob(job: dict[str, Any], worker_id: str) -> None:
+    """
+    执行单个任务：执行期间定期心跳，结束后记录成功 / 失败（失败按退避重试）
+    """
+    job_id = job.get("id")
+    job_type = job.get("job_type")
+    handler = _JOB_HANDLERS.get(job_type)
+    logger.info(
+        f"Job {job_id} ({job_type}) started, attempt={job.get('attempts')}, worker={worker_id}"
+    )
+
+    heartbeat_task = asyncio.create_task(_heartbeatLoop(job_id, worker_id))
+    try:
+        if handler is None:
+            raise JobError(f"Unsupported job type: {job_type}")
+        result = await handler(job)
+    except Exception as e:
+        logger.warning(f"Job {job_id} ({job_type}) failed: {e}", exc_info=True)
+        fail_res = await failJob(job_id, f"{type(e).__name__}: {e}")
+        # 被同 dedup_key 的待执行任务接替时不通知，由接替任务继续执行
+        if not fail_res.get("will_retry", True) and not fail_res.get("superseded"):
+            await _notifyLark(
+                job.get("payload") or {},
+                "出错啦",
+                f"后台任务 `#{job_id}` 执行失败，请稍后重试",
+                "red",
+            )
+        return
+    finally:
+        heartbeat_task.cancel()
+
+    await completeJob(job_id, result)
+    logger.info(f"Job {job_id} ({job_type}) succeeded")
+
+
+async def runJobWorker(
+    concurrency: int | None = None,
+    stop_event: asyncio.Event | None = None,
+) -> None:
+    """
+    启动任务 worker：concurrency 个协程并发领取、执行任务，直到 stop_event 被设置；
+    多个进程 / 机器可同时运行，领取时通过 SKIP LOCKED 互斥
+    """
+    if concurrency is None:
+        concurrency = int(os.getenv("JOB_WORKER_CONCURRENCY") or 2)
+    concurrency = max(1, concurrency)
+    stop_event = stop_event or asyncio.Event()
+    poll_interval = float(os.getenv("JOB_POLL_INTERVAL_SECONDS") or 2)
+    recover_interval = int(os.getenv("JOB_LOCK_TIMEOUT_SECONDS") or 90) / 2
+    worker_id = f"{socket.gethostname()}:{os.getpid()}:{uuid.uuid4().hex[:6]}"
+
+    async def _waitOrStop(seconds: float) -> None:
+        try:
+            await asyncio.wait_for(stop_event.wait(), timeout=seconds)
+        except asyncio.TimeoutError:
+            pass
+
+    async def _recoverLoop() -> None:
+        # 启动时先回收一次：上次重启前执行中的任务重新入队
+        while not stop_event.is_set():
+            await recoverStaleJobs()
+            await _waitOrStop(recover_interval)
+
+    async def _slot() -> None:
+        while not stop_event.is_set():
+            job = await claimJob(worker_id)
+            if job is None:
+                await _waitOrStop(poll_interval)
+                continue
+            await _executeJob(job, worker_id)
+
+    logger.info(f"Job worker {worker_id} started with concurrency={concurrency}")
+    await asyncio.gather(_recoverLoop(), *[_slot() for _ in range(concurrency)])
+    logger.info(f"Job worker {worker_id} stopped")
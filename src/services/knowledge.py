@@ -1,14 +1,38 @@
 import os
 import logging
 
+from sqlalchemy import select
+
 from src.agents.embedding import vectorizeText
-from src.database.index import session
+from src.database.index import asession, session
 from src.database.models import Knowledge
-from src.utils.index import timeDecay
+from src.utils.index import (
+    applyVectorSearchOptions,
+    checkVectorSearchOptions,
+    projectionToJson,
+    semanticScoreSQL,
+    timeDecaySQL,
+)
+from src.utils.recall_cache import (
+    bumpRecallGeneration,
+    getCachedRecall,
+    getRecallGeneration,
+    queryFingerprint,
+    setCachedRecall,
+)
 
 
 logger = logging.getLogger(__name__)
 
+# 召回结果只投影这些列，不回传 embedding
+_RECALL_PROJECTION_KEYS = [
+    column.key
+    for column in Knowledge.__table__.columns
+    if column.key not in ("embedding", "embedding_model_name")
+]
+# 召回缓存命名空间，代数按 user_id 计
+_RECALL_CACHE_NAMESPACE = "knowledge"
+
 
 async def addKnowledgePiece(
     user_id: int,
@@ -41,14 +65,15 @@ async def addKnowledgePiece(
     knowledge.embedding = vector
     knowledge.embedding_model_name = os.getenv("EMBEDDING_MODEL_NAME") or ""
 
-    with session() as db:
+    async with asession() as db:
         try:
             db.add(knowledge)
-            db.commit()
+            await db.commit()
         except Exception as e:
-            db.rollback()
+            await db.rollback()
             logger.error(f"Add knowledge failed: {str(e)}")
             return {"status": -5, "message": "Add knowledge failed"}
+        bumpRecallGeneration(_RECALL_CACHE_NAMESPACE, user_id)
 
         return {
             "status": 200,
@@ -60,14 +85,32 @@ async def recallKnowledgePieces(
     user_id: int,
     query: str,
     top_k: int = 10,
+    ef_search: int | None = None,
+    iterative_scan: str | None = None,
 ) -> dict:
     """
     召回知识
+    ef_search / iterative_scan 为 HNSW 检索参数，未传入时取环境变量配置
     """
     if not query or query.strip() == "":
         return {"status": -1, "message": "Query is empty"}
     if top_k <= 0:
         return {"status": -2, "message": "Top_k must be greater than 0"}
+    vector_search_error = checkVectorSearchOptions(ef_search, iterative_scan)
+    if vector_search_error is not None:
+        return {"status": -6, "message": vector_search_error}
+
+    # 召回缓存：同一用户、top_k 与 query 命中时跳过向量化与 SQL；知识增删后代数变化即失效
+    cache_key = (top_k, queryFingerprint(query), ef_search, iterative_scan)
+    generation = getRecallGeneration(_RECALL_CACHE_NAMESPACE, user_id)
+    cached_results = getCachedRecall(_RECALL_CACHE_NAMESPACE, user_id, cache_key)
+    if cached_results is not None:
+        return {
+            "status": 200,
+            "message": "Recall success",
+            "items": cached_results,
+        }
+
     try:
         vector = await vectorizeText(query)
     except Exception as e:
@@ -78,47 +121,59 @@ async def recallKnowledgePieces(
 
     distance = Knowledge.embedding.cosine_distance(vector)
 
-    with session() as db:
+    # 候选扫描（向量距离排序，可走 HNSW），只投影非 embedding 列
+    candidates = (
+        select(
+            *[Knowledge.__table__.c[key] for key in _RECALL_PROJECTION_KEYS],
+            distance.label("distance"),
+        )
+        .where(
+            Knowledge.user_id == user_id,
+            # 排除软删除的知识；同时匹配部分 HNSW 索引 ix_knowledge_embedding_hnsw_active 的条件
+            Knowledge.is_deleted == False,
+        )
+        .order_by(distance.asc())
+        .limit(max(int(os.getenv("VECTOR_CANDIDATES") or 100), top_k))
+        .subquery("candidates")
+    )
+    # 语义、权重、时间衰减在库内计算 score
+    semantic_score = semanticScoreSQL(candidates.c.distance)
+    decay = timeDecaySQL(candidates.c.created_at)
+    score = (semantic_score * 0.8 + candidates.c.weight * 0.2) * decay
+
+    async with asession() as db:
         try:
-            # 向量距离排序
-            candidates: list[tuple[Knowledge, float]] = (
-                db.query(Knowledge, distance.label("distance"))
-                .filter(Knowledge.user_id == user_id)
-                .order_by(distance.asc())
-                .limit(int(os.getenv("VECTOR_CANDIDATES")) or 100)
-                .all()
-            )
+            await applyVectorSearchOptions(db, ef_search, iterative_scan)
+            rows = (
+                await db.execute(
+                    select(
+                        candidates,
+                        semantic_score.label("semantic_score"),
+                        decay.label("time_decay"),
+                        score.label("score"),
+                    )
+                    .order_by(score.desc())
+                    .limit(top_k)
+                )
+            ).mappings()
+            results = [
+                {
+                    "distance": float(row["distance"]),
+                    "score": float(row["score"]),
+                    "semantic_score": float(row["semantic_score"]),
+                    "weight": row["weight"],
+                    "time_decay": float(row["time_decay"]),
+                    "knowledge": projectionToJson(row, _RECALL_PROJECTION_KEYS),
+                }
+                for row in rows
+            ]
         except Exception as e:
             logger.error(f"Recall knowledge failed: {str(e)}")
             return {"status": -5, "message": f"Recall knowledge failed"}
+        setCachedRecall(
+            _RECALL_CACHE_NAMESPACE, user_id, cache_key, generation, results
+        )
 
-        results = []
-
-        for knowledge, dist in candidates:
-            # 语义、权重、时间衰减计算 score
-            semantic_score = max(0.0, min(1.0, 1 - float(dist) / 2))
-            weight = knowledge.weight
-            created_at = knowledge.created_at
-
-            time_decay = timeDecay(created_at) if created_at else 1.0
-            raw_score = semantic_score * 0.8 + weight * 0.2
-            score = raw_score * time_decay
-
-            results.append(
-                {
-                    "distance": float(dist),
-                    "score": score,
-                    "semantic_score": semantic_score,
-                    "weight": weight,
-                    "time_decay": time_decay,
-                    "knowledge": knowledge.toJson(
-                        exclude=["embedding", "embedding_model_name"]
-                    ),
-                }
-            )
-
-        results.sort(key=lambda x: x["score"], reverse=True)
-        results = results[:top_k]
         return {
             "status": 200,
             "message": "Recall success",
@@ -152,6 +207,7 @@ def deleteKnowledgePiece(
             db.rollback()
             logger.error(f"Delete knowledge failed: {str(e)}")
             return {"status": -2, "message": "Delete knowledge failed"}
+        bumpRecallGeneration(_RECALL_CACHE_NAMESPACE, user_id)
         return {
             "status": 200,
             "message": "Delete knowledge success",
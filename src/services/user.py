@@ -9,10 +9,18 @@ from datetime import datetime, timedelta, timezone
 from src.database.index import session
 from src.database.models import User
 from src.database.enums import Gender, parseEnum
+from src.utils.identity_cache import (
+    getCachedIdentity,
+    invalidateIdentity,
+    setCachedIdentity,
+)
 
 
 logger = logging.getLogger(__name__)
 
+# 身份缓存命名空间：飞书 open_id -> user_id，只缓存已绑定的结果
+_OPEN_ID_CACHE_NAMESPACE = "lark_open_id"
+
 
 def createAccessToken(
     data: dict, expires_delta: timedelta | None = timedelta(hours=24)
@@ -114,8 +122,16 @@ def getUserIdByOpenId(
     open_id: str,
 ) -> dict:
     """
-    根据飞书 openid 获取用户 id
+    根据飞书 openid 获取用户 id（进程内 TTL 缓存，绑定飞书时主动失效）
     """
+    cached_user_id = getCachedIdentity(_OPEN_ID_CACHE_NAMESPACE, open_id)
+    if cached_user_id is not None:
+        return {
+            "status": 200,
+            "message": "Get user success",
+            "user_id": cached_user_id,
+        }
+
     with session() as db:
         user = db.query(User).filter(User.lark_open_id == open_id).first()
         if user is None:
@@ -123,11 +139,14 @@ def getUserIdByOpenId(
                 "status": -1,
                 "message": "User not found",
             }
-        return {
-            "status": 200,
-            "message": "Get user success",
-            "user_id": user.id,
-        }
+        user_id = user.id
+
+    setCachedIdentity(_OPEN_ID_CACHE_NAMESPACE, open_id, user_id)
+    return {
+        "status": 200,
+        "message": "Get user success",
+        "user_id": user_id,
+    }
 
 
 def userLogin(
@@ -311,6 +330,13 @@ def userBindLark(
             db.rollback()
             logger.error(f"Bind Lark failed, user_id={user_id}: {str(e)}")
             return {"status": -3, "message": "Bind Lark failed"}
+        # 该 open_id 或该用户原绑定的 open_id 都不再指向原用户
+        invalidateIdentity(
+            _OPEN_ID_CACHE_NAMESPACE,
+            predicate=lambda cached_open_id, cached_user_id: (
+                cached_open_id == lark_open_id or cached_user_id == user_id
+            ),
+        )
         return {
             "status": 200,
             "message": "Bind Lark success",
@@ -0,0 +1,62 @@
+"""
+身份缓存：飞书 open_id -> 用户、(用户, FR) 归属校验等读多写少的身份查询结果
+进程内 LRU + TTL，各命名空间共用条目上限，数据变更时由调用方主动失效
+"""
+
+import os
+import threading
+import time
+from collections import OrderedDict
+from typing import Any, Callable, Hashable
+
+# 进程内 LRU：(命名空间, key) -> (值, 过期时间)
+_identity_cache: "OrderedDict[tuple[str, Hashable], tuple[Any, float]]" = (
+    OrderedDict()
+)
+_identity_cache_lock = threading.Lock()
+
+
+def getCachedIdentity(namespace: str, key: Hashable) -> Any | None:
+    """
+    命中且未过期时返回缓存值，否则返回 None
+    """
+    cache_key = (namespace, key)
+    with _identity_cache_lock:
+        entry = _identity_cache.get(cache_key)
+        if entry is None:
+            return None
+        if entry[1] <= time.monotonic():
+            del _identity_cache[cache_key]
+            return None
+        _identity_cache.move_to_end(cache_key)
+        return entry[0]
+
+
+def setCachedIdentity(namespace: str, key: Hashable, value: Any) -> None:
+    ttl_seconds = float(os.getenv("IDENTITY_CACHE_TTL_SECONDS") or 300)
+    max_entries = int(os.getenv("IDENTITY_CACHE_MAX_ENTRIES") or 4096)
+    if ttl_seconds <= 0 or max_entries <= 0:
+        return
+    cache_key = (namespace, key)
+    with _identity_cache_lock:
+        _identity_cache[cache_key] = (value, time.monotonic() + ttl_seconds)
+        _identity_cache.move_to_end(cache_key)
+        while len(_identity_cache) > max_entries:
+            _identity_cache.popitem(last=False)
+
+
+def invalidateIdentity(
+    namespace: str,
+    key: Hashable | None = None,
+    predicate: Callable[[Hashable, Any], bool] | None = None,
+) -> None:
+    """
+    失效指定 key；传 predicate 时失效该命名空间下 predicate(key, 值) 为真的全部条目
+    """
+    with _identity_cache_lock:
+        if predicate is None:
+            _identity_cache.pop((namespace, key), None)
+            return
+        for cache_key, (value, _) in list(_identity_cache.items()):
+            if cache_key[0] == namespace and predicate(cache_key[1], value):
+                del _identity_cache[cache_key]
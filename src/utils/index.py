@@ -1,14 +1,19 @@
 from datetime import datetime, timezone
 from enum import Enum
 import json
+import logging
 import math
 import os
 from typing import Any, Awaitable, Callable
 from langchain_core.messages import AIMessage, BaseMessage, HumanMessage
+from sqlalchemy import Float, cast, func, select
+from sqlalchemy.ext.asyncio import AsyncSession
 from sqlalchemy.orm import Session
 
 from src.database.models import FigureAndRelation, OriginalSource
 
+logger = logging.getLogger(__name__)
+
 
 def timeDecay(created_at: datetime) -> float:
     """
@@ -22,6 +27,95 @@ def timeDecay(created_at: datetime) -> float:
     return math.exp(-delta_days / int(os.getenv("HALF_LIFE_DAYS")))
 
 
+def timeDecaySQL(created_at_column):
+    """
+    时间衰减函数的 SQL 表达式版本，口径与 timeDecay 一致（created_at 按 UTC 存储）
+    """
+    half_life_days = int(os.getenv("HALF_LIFE_DAYS"))
+    delta_days = func.floor(
+        func.extract("epoch", func.timezone("UTC", func.now()) - created_at_column)
+        / 86400
+    )
+    return cast(func.coalesce(func.exp(-delta_days / half_life_days), 1.0), Float)
+
+
+def semanticScoreSQL(distance):
+    """
+    余弦距离 -> [0, 1] 语义分的 SQL 表达式
+    """
+    return func.greatest(0.0, func.least(1.0, 1 - distance / 2))
+
+
+# pgvector hnsw.iterative_scan 可选值（pgvector >= 0.8）
+HNSW_ITERATIVE_SCAN_MODES = ("off", "relaxed_order", "strict_order")
+
+
+def checkVectorSearchOptions(
+    ef_search: int | None, iterative_scan: str | None
+) -> str | None:
+    """
+    校验 HNSW 检索参数，非法时返回错误信息
+    """
+    if ef_search is not None and (
+        not isinstance(ef_search, int) or not 1 <= ef_search <= 1000
+    ):
+        return "ef_search must be between 1 and 1000"
+    if iterative_scan is not None and iterative_scan not in HNSW_ITERATIVE_SCAN_MODES:
+        return f"iterative_scan must be one of {', '.join(HNSW_ITERATIVE_SCAN_MODES)}"
+    return None
+
+
+async def applyVectorSearchOptions(
+    db: AsyncSession,
+    ef_search: int | None = None,
+    iterative_scan: str | None = None,
+) -> None:
+    """
+    在当前事务内设置 HNSW 检索参数（set_config is_local，事务结束即恢复）；
+    未传入时取 HNSW_EF_SEARCH / HNSW_ITERATIVE_SCAN，均未配置则保持数据库默认；
+    环境变量取值非法时记录日志并忽略，不影响召回
+    """
+    if ef_search is None:
+        env_ef_search = os.getenv("HNSW_EF_SEARCH")
+        if env_ef_search:
+            try:
+                ef_search = int(env_ef_search)
+            except ValueError:
+                ef_search = -1
+            if checkVectorSearchOptions(ef_search, None) is not None:
+                logger.warning(f"Ignore invalid HNSW_EF_SEARCH: {env_ef_search}")
+                ef_search = None
+    if iterative_scan is None:
+        iterative_scan = os.getenv("HNSW_ITERATIVE_SCAN") or None
+        if checkVectorSearchOptions(None, iterative_scan) is not None:
+            logger.warning(f"Ignore invalid HNSW_ITERATIVE_SCAN: {iterative_scan}")
+            iterative_scan = None
+    settings = []
+    if ef_search is not None:
+        settings.append(func.set_config("hnsw.ef_search", str(ef_search), True))
+    if iterative_scan is not None:
+        settings.append(func.set_config("hnsw.iterative_scan", iterative_scan, True))
+    if settings:
+        await db.execute(select(*settings))
+
+
+def projectionToJson(row, keys: list[str]) -> dict:
+    """
+    将列投影查询结果转为与 SerializableMixin.toJson 一致的 dict
+    """
+    data = {}
+    for key in keys:
+        value = row[key]
+        # 处理 datetime 类型
+        if isinstance(value, datetime):
+            value = value.isoformat()
+        # 处理 Enum 类型
+        if hasattr(value, "value"):
+            value = (str(value.value)).strip()
+        data[key] = value
+    return data
+
+
 def checkFigureAndRelationOwnership(
     db: Session, user_id: int, fr_id: int
 ) -> FigureAndRelation | None:
@@ -64,6 +158,45 @@ def checkOriginalSourceOwnership(
     return original_source
 
 
+async def acheckFigureAndRelationOwnership(
+    db: AsyncSession, user_id: int, fr_id: int
+) -> FigureAndRelation | None:
+    """
+    FigureAndRelation 归属校验（异步）
+    """
+    return await db.scalar(
+        select(FigureAndRelation)
+        .where(
+            FigureAndRelation.id == fr_id,
+            FigureAndRelation.user_id == user_id,
+            FigureAndRelation.is_deleted == False,
+        )
+        .limit(1)
+    )
+
+
+async def acheckOriginalSourceOwnership(
+    db: AsyncSession,
+    user_id: int,
+    fr_id: int,
+    original_source_id: int,
+) -> OriginalSource | None:
+    """
+    OriginalSource 归属校验（异步，异步 session 不支持懒加载关系，直接 join 校验）
+    """
+    return await db.scalar(
+        select(OriginalSource)
+        .join(FigureAndRelation, OriginalSource.fr_id == FigureAndRelation.id)
+        .where(
+            OriginalSource.id == original_source_id,
+            OriginalSource.fr_id == fr_id,
+            OriginalSource.is_deleted == False,
+            FigureAndRelation.user_id == user_id,
+        )
+        .limit(1)
+    )
+
+
 def cleanList(items: list):
     """
     清理列表中的重复字符串项，保留首次出现的项。
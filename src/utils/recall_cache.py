@@ -0,0 +1,95 @@
+"""
+召回结果缓存：按 (召回对象, scope 配置, query 指纹) 缓存召回结果
+每个召回对象（FR / 用户知识库）一个代数计数器，写入时 +1，旧代数的缓存项不再命中
+"""
+
+import array
+import copy
+import hashlib
+import os
+import threading
+import time
+from collections import OrderedDict
+from typing import Any
+
+# 进程内 LRU：(命名空间, 对象 id, 缓存 key) -> (代数, 写入时间, 召回结果)
+_recall_cache: "OrderedDict[tuple, tuple[int, float, Any]]" = OrderedDict()
+# (命名空间, 对象 id) -> 代数
+_recall_generations: dict[tuple[str, int], int] = {}
+_recall_cache_lock = threading.Lock()
+
+
+def queryFingerprint(
+    query: str | None = None,
+    query_vector: list[float] | None = None,
+) -> str:
+    """
+    query 指纹：有向量时取向量哈希，否则取 query 文本哈希（空 query 为固定值）
+    """
+    if query_vector is not None:
+        payload = b"vector:" + array.array("d", query_vector).tobytes()
+    else:
+        payload = b"text:" + (query or "").strip().encode("utf-8")
+    return hashlib.sha256(payload).hexdigest()
+
+
+def getRecallGeneration(namespace: str, owner_id: int) -> int:
+    with _recall_cache_lock:
+        return _recall_generations.get((namespace, owner_id), 0)
+
+
+def bumpRecallGeneration(namespace: str, owner_id: int) -> None:
+    """
+    召回对象数据变更后调用，使其全部缓存结果失效
+    """
+    with _recall_cache_lock:
+        generation_key = (namespace, owner_id)
+        _recall_generations[generation_key] = (
+            _recall_generations.get(generation_key, 0) + 1
+        )
+
+
+def getCachedRecall(namespace: str, owner_id: int, key: tuple) -> Any | None:
+    """
+    命中且代数未变、未过期时返回召回结果副本，否则返回 None
+    """
+    ttl_seconds = float(os.getenv("RECALL_CACHE_TTL_SECONDS") or 120)
+    cache_key = (namespace, owner_id, key)
+    with _recall_cache_lock:
+        entry = _recall_cache.get(cache_key)
+        if entry is None:
+            return None
+        generation, created, value = entry
+        if (
+            generation != _recall_generations.get((namespace, owner_id), 0)
+            or time.monotonic() - created >= ttl_seconds
+        ):
+            del _recall_cache[cache_key]
+            return None
+        _recall_cache.move_to_end(cache_key)
+    # 返回副本，调用方修改结果不影响缓存
+    return copy.deepcopy(value)
+
+
+def setCachedRecall(
+    namespace: str,
+    owner_id: int,
+    key: tuple,
+    generation: int,
+    value: Any,
+) -> None:
+    """
+    写入召回结果；generation 为召回开始前读取的代数，召回期间发生写入则不缓存
+    """
+    max_entries = int(os.getenv("RECALL_CACHE_MAX_ENTRIES") or 2048)
+    if max_entries <= 0:
+        return
+    cache_key = (namespace, owner_id, key)
+    value = copy.deepcopy(value)
+    with _recall_cache_lock:
+        if generation != _recall_generations.get((namespace, owner_id), 0):
+            return
+        _recall_cache[cache_key] = (generation, time.monotonic(), value)
+        _recall_cache.move_to_end(cache_key)
+        while len(_recall_cache) > max_entries:
+            _recall_cache.popitem(last=False)
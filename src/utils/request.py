@@ -42,3 +42,37 @@ async def fetch(
                     "headers": {},
                     "body": await resp.text(),
                 }
+
+
+class FetchTextRes(TypedDict):
+    status_code: int
+    headers: dict[str, str]
+    body: str
+
+
+async def fetchText(
+    url,
+    method="GET",
+    query_params=None,
+    headers=None,
+    timeout=30,
+    raise_for_status=True,
+) -> FetchTextRes:
+    """
+    以纯文本形式请求，保留真实 status_code 与响应头（用于 ETag / 304 协商缓存）
+    """
+    timeout_config = aiohttp.ClientTimeout(total=timeout) if timeout else None
+    async with aiohttp.ClientSession(timeout=timeout_config) as session:
+        async with session.request(
+            method,
+            url,
+            params=query_params,
+            headers=headers,
+        ) as resp:
+            if raise_for_status:
+                resp.raise_for_status()
+            return {
+                "status_code": resp.status,
+                "headers": dict(resp.headers),
+                "body": await resp.text(),
+            }
@@ -0,0 +1,110 @@
+import uuid
+from datetime import timedelta
+
+from dotenv import load_dotenv
+
+load_dotenv()
+
+from sqlalchemy import update
+
+from src.database.enums import JobStatus, JobType
+from src.database.index import asession, runWithAsyncDB
+from src.database.models import Job
+from src.services.job import (
+    _utcNow,
+    claimJob,
+    enqueueJob,
+    failJob,
+    getJob,
+    recoverStaleJobs,
+)
+
+
+def _enqueueTwin(dedup_key: str):
+    res = enqueueJob(
+        user_id=1,
+        job_type=JobType.SYNC_FEEDS_TO_FR_CORE,
+        payload={"test": True},
+        dedup_key=dedup_key,
+    )
+    assert res["status"] == 200, res
+    return res["job_id"]
+
+
+async def _claim(job_id: int):
+    claimed = await claimJob("test-worker")
+    assert claimed is not None and claimed["id"] == job_id, claimed
+
+
+async def _expireLock(job_id: int):
+    async with asession() as db:
+        await db.execute(
+            update(Job)
+            .where(Job.id == job_id)
+            .values(locked_at=_utcNow() - timedelta(days=1))
+        )
+        await db.commit()
+
+
+async def testFailJobWithPendingTwin():
+    """
+    执行中的任务失败重试时已有同 dedup_key 的待执行任务：不应违反唯一索引，由待执行任务接替
+    """
+    dedup_key = f"test-job-{uuid.uuid4()}"
+    running_id = _enqueueTwin(dedup_key)
+    await _claim(running_id)
+    pending_id = _enqueueTwin(dedup_key)
+    assert pending_id != running_id
+
+    res = await failJob(running_id, "test error")
+    assert res["status"] == 200, res
+    assert res["will_retry"] is False and res["superseded"] is True, res
+    assert getJob(1, running_id)["job"]["status"] == JobStatus.FAILED.value
+    assert getJob(1, pending_id)["job"]["status"] == JobStatus.PENDING.value
+    return res
+
+
+async def testRecoverStaleJobWithPendingTwin():
+    """
+    回收心跳超时的任务时已有同 dedup_key 的待执行任务：不应回滚整批回收
+    """
+    dedup_key = f"test-job-{uuid.uuid4()}"
+    stale_id = _enqueueTwin(dedup_key)
+    await _claim(stale_id)
+    pending_id = _enqueueTwin(dedup_key)
+    await _expireLock(stale_id)
+
+    recovered = await recoverStaleJobs()
+    assert recovered >= 1, recovered
+    assert getJob(1, stale_id)["job"]["status"] == JobStatus.FAILED.value
+    assert getJob(1, pending_id)["job"]["status"] == JobStatus.PENDING.value
+    return recovered
+
+
+async def testRecoverStaleJobAtMaxAttempts():
+    """
+    已达最大尝试次数的超时任务回收后置为 FAILED，不再重新入队
+    """
+    res = enqueueJob(
+        user_id=1,
+        job_type=JobType.SYNC_FEEDS_TO_FR_CORE,
+        payload={"test": True},
+        dedup_key=f"test-job-{uuid.uuid4()}",
+        max_attempts=1,
+    )
+    await _claim(res["job_id"])
+    await _expireLock(res["job_id"])
+
+    await recoverStaleJobs()
+    assert getJob(1, res["job_id"])["job"]["status"] == JobStatus.FAILED.value
+    return res
+
+
+async def _main():
+    print(await testFailJobWithPendingTwin())
+    print(await testRecoverStaleJobWithPendingTwin())
+    print(await testRecoverStaleJobAtMaxAttempts())
+
+
+if __name__ == "__main__":
+    runWithAsyncDB(_main())
@@ -157,7 +157,7 @@ async def main():
             # "raw_images": [],
         },
     }
-    async with getFRBuildingGraph() as graph:
+    async with getFRBuildingGraph(init_state["request"]["fr_id"]) as graph:
         result = await graph.ainvoke(init_state)
     return result
 